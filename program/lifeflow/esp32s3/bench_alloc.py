@@ -0,0 +1,93 @@
+# 稳态堆分配检查：预热后模拟1000次定时器节拍和同样数量的二进制消息（浏览器每秒发送的progress，
+# 每10条夹一条状态查询），每次都解码消息、更新会话、编码确认帧和状态帧、重绘倒计时并刷新屏幕。
+# 期间关闭垃圾回收，比较前后的gc.mem_alloc()：稳态循环不应分配任何堆内存。
+# asyncio每次等待时创建的协程对象和JSON消息的解析不在检查范围内（二进制协议的路径没有这些分配）
+# 板子上先停止main.py，再用Thonny运行（接好OLED时同时检查绘制和I2C刷新）；桌面上：
+#   python -c "from esp32s3 import host; host.install(realtime=True, trace_alloc=True); import esp32s3.bench_alloc as b; b.main()"
+# 桌面上mem_alloc()由tracemalloc模拟，只能看到留存下来的内存；仿真环境本身（时钟线程、CPython的整数对象、
+# 没有viper时的回退实现）会留下与轮数无关的几百字节，所以桌面上的判定是每轮留存不到1字节（总量小于TICKS），
+# 用来确认流程能跑通和找出新增的留存对象；是否完全没有分配以板子上的结果为准
+import gc
+import sys
+import time
+
+import esp32s3.binproto as binproto
+import esp32s3.main as firmware
+import esp32s3.metrics as metrics
+import esp32s3.wsframe as wsframe
+
+TICKS = 1000
+# 预热到计数器都超过256，桌面上计数器在测量期间不再从小整数变成新的整数对象
+WARMUP = 300
+# 足够1000次每次减少2秒的进度消息
+START_SECONDS = 3 * 3600
+ON_DEVICE = sys.implementation.name == "micropython"
+STATUS_EVERY = 10
+
+
+# 把剩余秒数写进预分配的progress消息（操作码后4字节大端）
+def set_remaining(payload, seconds):
+    payload[1] = (seconds >> 24) & 0xFF
+    payload[2] = (seconds >> 16) & 0xFF
+    payload[3] = (seconds >> 8) & 0xFF
+    payload[4] = seconds & 0xFF
+
+
+def step(i, progress, status):
+    if i % STATUS_EVERY == 0:
+        payload = status
+    else:
+        # 与设备相差2秒，每条消息都会重新校准截止时间并重绘
+        set_remaining(progress, START_SECONDS - 2 * i)
+        payload = progress
+    message = binproto.decode(payload, firmware.bin_message)
+    firmware.handle_message(message)
+    firmware.ws_out.frame(wsframe.OP_BINARY, binproto.encode_ack(firmware.bin_ack, message["type"]))
+    focus = firmware.focus
+    binproto.encode_state(firmware.bin_state, focus.state, focus.remaining, focus.total, focus.is_break)
+    firmware.ws_out.frame(wsframe.OP_BINARY, firmware.bin_state)
+    firmware.update_timer()
+    firmware.render_pending()
+
+
+def main():
+    if firmware.oled is None:
+        firmware.init_display()
+    progress = bytearray(binproto.encode({"type": "progress", "remainingSeconds": START_SECONDS,
+                                          "elapsedSeconds": 0, "progressPercent": 0}))
+    status = binproto.encode({"type": "status"})
+    start = binproto.encode({"type": "start", "totalSeconds": START_SECONDS})
+    firmware.handle_message(binproto.decode(start, firmware.bin_message))
+    for i in range(WARMUP):
+        step(i, progress, status)
+
+    handled = metrics.handling.count
+    frames = firmware.frames_rendered
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        t0 = time.ticks_us()
+        for i in range(WARMUP, WARMUP + TICKS):
+            step(i, progress, status)
+        elapsed = time.ticks_diff(time.ticks_us(), t0)
+        after = gc.mem_alloc()
+    finally:
+        gc.enable()
+    firmware.handle_message({"type": "stop"})
+    firmware.update_ticker()
+
+    allocated = after - before
+    print("节拍/消息: {}，处理消息{}条，绘制{}帧（OLED: {}）".format(
+        TICKS, metrics.handling.count - handled, firmware.frames_rendered - frames,
+        "已连接" if firmware.OLED_INITIALIZED else "未连接"))
+    print("每轮耗时: {} us".format(elapsed // TICKS))
+    print("堆分配: {}字节（每轮{}字节）".format(allocated, allocated // TICKS))
+    passed = allocated == 0 if ON_DEVICE else allocated < TICKS
+    print("结果: {}（{}）".format("通过" if passed else "未通过",
+                               "要求没有分配" if ON_DEVICE else "桌面仿真，要求每轮留存不到1字节"))
+    return passed
+
+
+if __name__ == "__main__":
+    main()
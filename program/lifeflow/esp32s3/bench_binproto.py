@@ -0,0 +1,84 @@
+# 二进制协议与JSON的对比基准测试（板子上用Thonny运行，桌面上先执行host.install(realtime=True)）
+# 统计每秒progress消息及其确认在线路上的字节数，以及设备端解码耗时
+import gc
+import json
+import time
+
+import esp32s3.binproto as binproto
+
+MESSAGES = 500
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+def mem_alloc():
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
+
+# 浏览器到设备的帧带4字节掩码，设备到浏览器的帧不带
+def client_frame_size(n):
+    return n + (6 if n < 126 else 8)
+
+
+def server_frame_size(n):
+    return n + (2 if n < 126 else 4)
+
+
+def progress_json(i):
+    return json.dumps({
+        "type": "progress",
+        "remainingSeconds": 1500 - i,
+        "progressPercent": i * 100 // 1500,
+        "elapsedSeconds": i,
+        "timestamp": 1760000000000 + i * 1000,
+    })
+
+
+def main():
+    json_msgs = [progress_json(i).encode() for i in range(MESSAGES)]
+    bin_msgs = [binproto.encode({
+        "type": "progress",
+        "remainingSeconds": 1500 - i,
+        "progressPercent": i * 100 // 1500,
+        "elapsedSeconds": i,
+    }) for i in range(MESSAGES)]
+    json_ack = json.dumps({"status": "received", "type": "progress"}).encode()
+    bin_ack = binproto.encode_ack(bytearray(2), "progress")
+
+    gc.collect()
+    a0 = mem_alloc()
+    t0 = ticks_us()
+    for payload in json_msgs:
+        message = json.loads(payload.decode())
+        json.dumps({"status": "received", "type": message.get("type")})
+    json_us = ticks_us() - t0
+    json_alloc = mem_alloc() - a0
+
+    message = binproto.new_message()
+    ack = bytearray(2)
+    gc.collect()
+    a0 = mem_alloc()
+    t0 = ticks_us()
+    for payload in bin_msgs:
+        binproto.decode(payload, message)
+        binproto.encode_ack(ack, message["type"])
+    bin_us = ticks_us() - t0
+    bin_alloc = mem_alloc() - a0
+
+    print("{:<8} {:>10} {:>10} {:>14} {:>14}".format("格式", "上行字节", "下行字节", "解码+应答(us)", "堆分配(字节)"))
+    for name, up, down, us, alloc in (
+            ("JSON", client_frame_size(len(json_msgs[0])), server_frame_size(len(json_ack)), json_us, json_alloc),
+            ("二进制", client_frame_size(len(bin_msgs[0])), server_frame_size(len(bin_ack)), bin_us, bin_alloc)):
+        print("{:<8} {:>10} {:>10} {:>14.1f} {:>14.0f}".format(name, up, down, us / MESSAGES, alloc / MESSAGES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# 字形图集的内存占用和渲染耗时测试（板子上用Thonny运行，桌面上先执行host.install(realtime=True)）
+import gc
+import os
+import time
+
+import framebuf
+import esp32s3.glyphs as glyphs
+
+ATLAS_PATH = "esp32s3/glyphs.bin"
+STRINGS = ("专注中", "已暂停", "休息中", "休息暂停", "休息完成", "准备就绪", "专注完成!",
+           "恭喜你!", "休息一下吧", "已连接!", "等待指令...", "设备在线", "12:34")
+ROUNDS = 20
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+def mem_alloc():
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
+
+def main():
+    fb = framebuf.FrameBuffer(bytearray(128 * 64 // 8), 128, 64, framebuf.MONO_VLSB)
+
+    gc.collect()
+    before = mem_alloc()
+    atlas = glyphs.GlyphAtlas(ATLAS_PATH)
+    gc.collect()
+    ram = mem_alloc() - before
+    print("Flash占用: {} 字节, {}个字形 ({}x{})".format(os.stat(ATLAS_PATH)[6], atlas.count, atlas.width, atlas.height))
+    print("内存占用: {} 字节 (索引 {} + 缓存 {}槽 x {} 字节)".format(
+        ram, atlas.count * 2, atlas.cache_size, atlas.glyph_bytes))
+
+    print("{:<12} {:>10} {:>10} {:>12}".format("字符串", "首次(us)", "缓存(us)", "fb.text(us)"))
+    for text in STRINGS:
+        t0 = ticks_us()
+        atlas.draw_text(fb, text, 0, 0)
+        cold = ticks_us() - t0
+        t0 = ticks_us()
+        for _ in range(ROUNDS):
+            atlas.draw_text(fb, text, 0, 0)
+        warm = (ticks_us() - t0) / ROUNDS
+        t0 = ticks_us()
+        for _ in range(ROUNDS):
+            fb.text(text, 0, 0)
+        plain = (ticks_us() - t0) / ROUNDS
+        print("{:<12} {:>10} {:>10.0f} {:>12.0f}".format(text, cold, warm, plain))
+    print("缓存命中 {}, 未命中 {}".format(atlas.hits, atlas.misses))
+    atlas.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# HTTP请求处理对比：请求行/请求头解析+路由表+预编码响应 vs 原来的子串匹配和字符串拼接
+# 板子上用Thonny运行，桌面上先执行host.install(realtime=True, trace_alloc=True)。
+# 请求从内存中的流读取，不经过网络，只比较解析、路由和构造响应本身
+import gc
+import time
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+import esp32s3.httpd as httpd
+
+REQUESTS = 300
+ALLOC_SAMPLES = 20
+
+# 浏览器fetch发出的典型请求
+CASES = (
+    ("GET /ping", b"GET /ping HTTP/1.1\r\nHost: 192.168.4.1\r\nConnection: keep-alive\r\n"
+                  b"User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36\r\n"
+                  b"Accept: */*\r\nOrigin: http://localhost:8000\r\nReferer: http://localhost:8000/\r\n"
+                  b"Accept-Encoding: gzip, deflate\r\nAccept-Language: zh-CN,zh;q=0.9\r\n\r\n"),
+    ("OPTIONS", b"OPTIONS /ping HTTP/1.1\r\nHost: 192.168.4.1\r\nAccess-Control-Request-Method: GET\r\n"
+                b"Origin: http://localhost:8000\r\n\r\n"),
+    ("GET /", b"GET / HTTP/1.1\r\nHost: 192.168.4.1\r\n\r\n"),
+)
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+# 板子上GC之前mem_alloc只增不减，差值就是分配的字节数；
+# 桌面上对象立即释放，用tracemalloc的峰值代替
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def alloc_start():
+    gc.collect()
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
+
+def alloc_end(start):
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] - start
+    try:
+        return gc.mem_alloc() - start
+    except AttributeError:
+        return 0
+
+
+class MemoryReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    async def readline(self):
+        i = self.data.find(b"\n", self.pos)
+        end = len(self.data) if i < 0 else i + 1
+        line = self.data[self.pos:end]
+        self.pos = end
+        return line
+
+    async def read(self, n=-1):
+        end = len(self.data) if n < 0 else min(len(self.data), self.pos + n)
+        data = self.data[self.pos:end]
+        self.pos = end
+        return data
+
+
+class NullWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+    async def drain(self):
+        pass
+
+
+# 原来main.py中的读取和处理方式（只保留这里用到的分支）
+async def legacy_read_request(reader):
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line or line == b"\r\n":
+            break
+        lines.append(line)
+    return b"".join(lines).decode()
+
+
+async def legacy_handle(reader, writer):
+    request = await legacy_read_request(reader)
+    if "/ping" in request and "OPTIONS" not in request:
+        response = "HTTP/1.1 200 OK\r\n"
+        response += "Content-Type: application/json\r\n"
+        response += "Access-Control-Allow-Origin: *\r\n"
+        response += "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+        response += "Access-Control-Allow-Headers: *\r\n\r\n"
+        response += '{"status": "online", "message": "ESP32在线"}'
+        writer.write(response.encode())
+    elif "OPTIONS" in request:
+        response = "HTTP/1.1 200 OK\r\n"
+        response += "Access-Control-Allow-Origin: *\r\n"
+        response += "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+        response += "Access-Control-Allow-Headers: *\r\n\r\n"
+        writer.write(response.encode())
+    else:
+        response = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
+        response += "<h1>ESP32 Focus Timer</h1><p>WebSocket服务运行中</p>"
+        writer.write(response.encode())
+    await writer.drain()
+
+
+PING = httpd.response(200, '{"status": "online", "message": "ESP32在线"}', b"application/json")
+PREFLIGHT = httpd.response(204)
+INDEX = httpd.response(200, "<h1>ESP32 Focus Timer</h1><p>WebSocket服务运行中</p>", b"text/html; charset=utf-8", b"")
+ROUTES = {(b"GET", b"/ping"): PING, (b"GET", b"/"): INDEX}
+
+
+# 与main.handle_client()一样经过LineReader读取，包含有长度上限的行读取的开销
+async def parsed_handle(reader, writer):
+    reader = httpd.LineReader(reader)
+    request = await httpd.read_request(reader)
+    if b"content-length" in request.headers:
+        await httpd.discard_body(reader, request)
+    if request.method == b"OPTIONS":
+        route = PREFLIGHT
+    else:
+        route = ROUTES.get((request.method, request.path))
+    writer.write(route if route is not None else httpd.error_response(404))
+    await writer.drain()
+    return request.keep_alive()
+
+
+# 先计时，再逐个请求单独统计分配（统计前的gc.collect()不计入耗时）
+async def run(handler, data):
+    writer = NullWriter()
+    readers = [MemoryReader(data) for _ in range(REQUESTS)]
+    t0 = ticks_us()
+    for reader in readers:
+        await handler(reader, writer)
+    us = ticks_us() - t0
+    alloc = 0
+    for _ in range(ALLOC_SAMPLES):
+        reader = MemoryReader(data)
+        a0 = alloc_start()
+        await handler(reader, writer)
+        alloc += alloc_end(a0)
+    return us / REQUESTS, alloc / ALLOC_SAMPLES
+
+
+def main():
+    print("{:<10} {:>12} {:>10} {:>12} {:>10} {:>10}".format(
+        "请求", "原实现(us)", "新(us)", "原分配(字节)", "新分配", "每秒请求"))
+    for name, data in CASES:
+        legacy_us, legacy_alloc = asyncio.run(run(legacy_handle, data))
+        new_us, new_alloc = asyncio.run(run(parsed_handle, data))
+        print("{:<10} {:>12.1f} {:>10.1f} {:>12.0f} {:>10.0f} {:>10.0f}".format(
+            name, legacy_us, new_us, legacy_alloc, new_alloc, 1000000 / new_us if new_us else 0))
+
+
+if __name__ == "__main__":
+    main()
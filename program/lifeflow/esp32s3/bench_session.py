@@ -0,0 +1,144 @@
+# 消息分派耗时对比：转换表状态机 vs 原来的if/elif链（板子上用Thonny运行，桌面上先执行host.install(realtime=True)）
+# 两边都去掉显示和日志，只比较分派和状态修改本身（每轮包含一次重置状态的赋值）
+# 原来的实现不记录时间；转换表的start/pause/resume要读一次时钟计算截止时间或剩余毫秒数，
+# 最后一行单独列出读时钟的耗时（桌面上ticks_ms()等由仿真器用Python实现，比板子上的内置函数慢得多）
+import time
+
+import esp32s3.session as session
+
+ROUNDS = 2000
+
+# 每种消息类型都从能接受它的状态出发
+CASES = (
+    ("start", "idle", {"type": "start", "totalSeconds": 1500, "duration": 25}),
+    ("progress", "running", {"type": "progress", "remainingSeconds": 1200, "progressPercent": 20}),
+    ("pause", "running", {"type": "pause", "remainingSeconds": 1200}),
+    ("resume", "paused", {"type": "resume", "totalSeconds": 1500, "remainingSeconds": 1200}),
+    ("stop", "running", {"type": "stop"}),
+    ("complete", "running", {"type": "complete"}),
+    ("break_start", "completed", {"type": "break_start", "totalSeconds": 300}),
+    ("break_progress", "break_running", {"type": "break_progress", "remainingSeconds": 200}),
+    ("break_pause", "break_running", {"type": "break_pause"}),
+    ("break_resume", "break_paused", {"type": "break_resume"}),
+    ("break_complete", "break_running", {"type": "break_complete"}),
+)
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+# 原来main.py中的handle_message()，显示和日志调用已去掉
+current_state = "idle"
+focus_duration = 0
+remaining_seconds = 0
+is_paused = False
+pause_remaining = 0
+is_break = False
+
+
+def legacy_handle_message(message):
+    global remaining_seconds, current_state, is_paused, focus_duration, is_break, pause_remaining
+    if not isinstance(message, dict):
+        return
+    msg_type = message.get("type")
+    if msg_type == "start":
+        total_seconds = message.get("totalSeconds", 25 * 60)
+        if isinstance(total_seconds, (int, float)):
+            current_state = "running"
+            focus_duration = total_seconds / 60 * 60
+            remaining_seconds = focus_duration
+            is_paused = False
+    elif msg_type == "pause":
+        if current_state == "running":
+            is_paused = True
+            current_state = "paused"
+            pause_remaining = remaining_seconds
+    elif msg_type == "resume":
+        if current_state == "paused":
+            is_paused = False
+            current_state = "running"
+    elif msg_type == "stop":
+        current_state = "idle"
+        remaining_seconds = 0
+        is_paused = False
+        is_break = False
+    elif msg_type == "progress":
+        remaining = message.get("remainingSeconds", 0)
+        if remaining > 0:
+            remaining_seconds = remaining
+            current_state = "running"
+            is_paused = False
+            is_break = False
+    elif msg_type == "complete":
+        current_state = "completed"
+    elif msg_type == "break_start":
+        break_total_seconds = message.get("totalSeconds", 5 * 60)
+        if isinstance(break_total_seconds, (int, float)):
+            focus_duration = int(break_total_seconds)
+            remaining_seconds = focus_duration
+            current_state = "break_running"
+            is_paused = False
+            is_break = True
+    elif msg_type == "break_progress":
+        remaining = message.get("remainingSeconds", 0)
+        if remaining > 0:
+            remaining_seconds = remaining
+            current_state = "break_running"
+            is_paused = False
+            is_break = True
+    elif msg_type == "break_pause":
+        if current_state == "break_running":
+            is_paused = True
+            current_state = "break_paused"
+            pause_remaining = remaining_seconds
+    elif msg_type == "break_resume":
+        if current_state == "break_paused":
+            is_paused = False
+            current_state = "break_running"
+    elif msg_type == "break_complete":
+        current_state = "break_completed"
+        is_break = False
+    elif msg_type == "status":
+        pass
+
+
+def run_legacy(state, message):
+    global current_state
+    t0 = ticks_us()
+    for _ in range(ROUNDS):
+        current_state = state
+        legacy_handle_message(message)
+    return (ticks_us() - t0) / ROUNDS
+
+
+def run_table(state, message):
+    focus = session.FocusSession()
+    t0 = ticks_us()
+    for _ in range(ROUNDS):
+        focus.state = state
+        focus.dispatch(message["type"], message)
+    return (ticks_us() - t0) / ROUNDS
+
+
+def main():
+    print("{:<16} {:>12} {:>12}".format("消息类型", "if/elif(us)", "转换表(us)"))
+    total_legacy = total_table = 0
+    for name, state, message in CASES:
+        legacy = run_legacy(state, message)
+        table = run_table(state, message)
+        total_legacy += legacy
+        total_table += table
+        print("{:<16} {:>12.2f} {:>12.2f}".format(name, legacy, table))
+    print("{:<16} {:>12.2f} {:>12.2f}".format("平均", total_legacy / len(CASES), total_table / len(CASES)))
+    t0 = ticks_us()
+    for _ in range(ROUNDS):
+        time.ticks_add(time.ticks_ms(), 1000)
+    print("{:<16} {:>25.2f}".format("其中读时钟", (ticks_us() - t0) / ROUNDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# SSD1315驱动I2C传输基准测试
+# 在板子上通过Thonny运行，对比旧的逐字节命令/拼接数据写法与批量、零拷贝写法
+# 输出每帧的I2C传输次数、字节数、堆分配量和耗时
+import gc
+import time
+from machine import Pin, I2C
+import esp32s3.ssd1315 as ssd1315
+
+FRAMES = 50
+
+
+class CountingI2C:
+    # 包装真实I2C总线，统计传输次数和字节数
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.transactions = 0
+        self.bytes = 0
+
+    def scan(self):
+        return self.i2c.scan()
+
+    def writeto(self, addr, buf, stop=True):
+        self.transactions += 1
+        self.bytes += len(buf)
+        return self.i2c.writeto(addr, buf, stop)
+
+    def writevto(self, addr, vector, stop=True):
+        self.transactions += 1
+        for buf in vector:
+            self.bytes += len(buf)
+        return self.i2c.writevto(addr, vector, stop)
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+
+
+class LegacySSD1315(ssd1315.SSD1315):
+    # 优化前的传输方式：每条命令一次传输并新建bytearray，数据先拼接控制字节再发送，每帧整屏刷新
+    def write_cmd(self, cmd):
+        self.i2c.writeto(self.addr, bytearray([0x80, cmd]))
+
+    def write_data(self, buf):
+        self.i2c.writeto(self.addr, b'\x40' + buf)
+
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+    def show(self, force=False):
+        self.write_cmd(ssd1315.SET_COL_ADDR)
+        self.write_cmd(0)
+        self.write_cmd(self.width - 1)
+        self.write_cmd(ssd1315.SET_PAGE_ADDR)
+        self.write_cmd(0)
+        self.write_cmd(self.pages - 1)
+        self.write_data(self.buffer)
+
+
+def mem_alloc():
+    # MicroPython提供gc.mem_alloc；桌面CPython上返回0，仅统计传输数据
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        return 0
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+def draw_tick(oled, remaining, total):
+    # 模拟display_timer()每秒的绘制内容
+    oled.fill(0)
+    oled.text("running", 0, 0)
+    oled.text("{:02d}:{:02d}".format(remaining // 60, remaining % 60), 20, 20)
+    bar = (total - remaining) * 128 // total
+    oled.fill_rect(0, 40, bar, 10, 1)
+    oled.rect(0, 40, 128, 10, 1)
+    oled.text("{}%".format((total - remaining) * 100 // total), 45, 55)
+
+
+def run_case(name, cls, bus):
+    bus.reset()
+    oled = cls(128, 64, bus)
+    init_tx = bus.transactions
+    init_bytes = bus.bytes
+
+    total = 25 * 60
+    draw_tick(oled, total, total)
+    oled.show()
+
+    bus.reset()
+    gc.collect()
+    alloc_before = mem_alloc()
+    t0 = ticks_us()
+    for i in range(FRAMES):
+        draw_tick(oled, total - 1 - i, total)
+        oled.show()
+    elapsed = ticks_us() - t0
+    alloc = mem_alloc() - alloc_before
+
+    print("{}:".format(name))
+    print("  init_display: {} 次传输, {} 字节".format(init_tx, init_bytes))
+    print("  每帧: {:.1f} 次传输, {:.0f} 字节, {:.0f} 字节堆分配, {:.0f} us".format(
+        bus.transactions / FRAMES, bus.bytes / FRAMES, alloc / FRAMES, elapsed / FRAMES))
+    return bus.transactions / FRAMES, bus.bytes / FRAMES
+
+
+def main(i2c=None):
+    if i2c is None:
+        i2c = I2C(0, scl=Pin(18), sda=Pin(17), freq=400000)
+    bus = CountingI2C(i2c)
+    before = run_case("优化前", LegacySSD1315, bus)
+    after = run_case("优化后", ssd1315.SSD1315, bus)
+    print("传输次数减少 {:.0f}%, 字节数减少 {:.0f}%".format(
+        100 - after[0] * 100 / before[0], 100 - after[1] * 100 / before[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# 屏幕绘制耗时对比：原来每帧fill(0)后重画整屏 vs 部件只重绘值变化的区域，
+# 以及提示画面每次重画文字 vs 从缓存的帧缓冲复制（板子上用Thonny运行，桌面上先执行host.install(realtime=True)）
+# 只比较绘制到帧缓冲的耗时，不含I2C传输（传输量由ssd1315.show()的逐列比较决定，两种方式相同）
+import time
+
+import framebuf
+import esp32s3.glyphs as glyphs
+import esp32s3.widgets as widgets
+
+ATLAS_PATH = "esp32s3/glyphs.bin"
+TOTAL = 1500
+ROUNDS = 20
+SCREENS = (
+    (("专注时钟", 0, 0), ("等待连接...", 0, 20)),
+    (("设备在线", 20, 20), ("等待指令", 5, 35)),
+    (("专注完成!", 10, 20), ("恭喜你!", 30, 35), ("休息一下吧", 15, 50)),
+)
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+# 原来main.py中的draw_timer()：每帧清屏后重画状态、时间、进度条和百分比
+def draw_full(fb, font, status_text, remaining, total):
+    fb.fill(0)
+    font.draw_text(fb, status_text, 0, 0)
+    x = widgets.draw_number(fb, remaining // 60, 2, 20, 20)
+    fb.text(":", x, 20)
+    widgets.draw_number(fb, remaining % 60, 2, x + widgets.CHAR_W, 20)
+    elapsed = total - remaining
+    fb.fill_rect(0, 40, elapsed * 128 // total, 10, 1)
+    fb.rect(0, 40, 128, 10, 1)
+    fb.text("%", widgets.draw_number(fb, (elapsed * 200 + total) // (total * 2), 1, 45, 55), 55)
+
+
+def main():
+    buf = bytearray(128 * 64 // 8)
+    fb = framebuf.FrameBuffer(buf, 128, 64, framebuf.MONO_VLSB)
+    try:
+        font = glyphs.GlyphAtlas(ATLAS_PATH)
+    except OSError:
+        font = widgets.ASCII
+        print("没有字形图集，使用ASCII字体")
+
+    t0 = ticks_us()
+    for remaining in range(TOTAL, -1, -1):
+        draw_full(fb, font, "专注中", remaining, TOTAL)
+    full = (ticks_us() - t0) / (TOTAL + 1)
+
+    status = widgets.Label(0, 0, 128, 20, font)
+    countdown = widgets.Countdown(20, 20, 108, widgets.CHAR_H)
+    bar = widgets.ProgressBar(0, 40, 128, 10)
+    percent = widgets.Percent(45, 55, 83, widgets.CHAR_H)
+    screen = widgets.Screen(status, countdown, bar, percent)
+    t0 = ticks_us()
+    for remaining in range(TOTAL, -1, -1):
+        elapsed = TOTAL - remaining
+        status.set("专注中")
+        countdown.set(remaining)
+        bar.set(elapsed * 128 // TOTAL)
+        percent.set((elapsed * 200 + TOTAL) // (TOTAL * 2))
+        screen.draw(fb)
+    retained = (ticks_us() - t0) / (TOTAL + 1)
+    print("计时画面({}帧): 整屏重画 {:.0f} us/帧, 部件 {:.0f} us/帧, 平均每帧重绘{:.2f}个部件".format(
+        TOTAL + 1, full, retained, screen.widget_draws / (TOTAL + 1)))
+
+    t0 = ticks_us()
+    for _ in range(ROUNDS):
+        for lines in SCREENS:
+            fb.fill(0)
+            for text, x, y in lines:
+                font.draw_text(fb, text, x, y)
+    redraw = (ticks_us() - t0) / (ROUNDS * len(SCREENS))
+    cache = widgets.StaticScreens(128, 64, len(SCREENS), font)
+    t0 = ticks_us()
+    for _ in range(ROUNDS):
+        for lines in SCREENS:
+            cache.show(buf, lines)
+    copied = (ticks_us() - t0) / (ROUNDS * len(SCREENS))
+    print("提示画面: 重画文字 {:.0f} us, 从缓存复制 {:.0f} us（缓存命中 {}, 未命中 {}）".format(
+        redraw, copied, cache.hits, cache.misses))
+    if font is not widgets.ASCII:
+        font.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# WebSocket帧解码吞吐量基准测试（板子上用Thonny运行，桌面上先执行host.install(realtime=True)）
+# 模拟浏览器每秒发送一次progress，以及断线重连后一次性补发的一串命令，
+# 数据按随机大小分块送入解码器（一次读取可能包含多个帧，也可能只有半个帧）
+import json
+import random
+import time
+
+import esp32s3.wsframe as wsframe
+
+SECONDS = 300
+BURST_EVERY = 60
+BURST_COMMANDS = ("start", "pause", "resume", "progress", "break_start", "break_pause",
+                  "break_resume", "break_progress", "stop", "status")
+
+
+def ticks_us():
+    try:
+        return time.ticks_us()
+    except AttributeError:
+        return int(time.perf_counter() * 1000000)
+
+
+def ticks_diff(a, b):
+    try:
+        return time.ticks_diff(a, b)
+    except AttributeError:
+        return a - b
+
+
+def masked_frame(payload):
+    mask = bytes(random.getrandbits(8) for _ in range(4))
+    n = len(payload)
+    if n < 126:
+        head = bytes((0x81, 0x80 | n))
+    else:
+        head = bytes((0x81, 0x80 | 126, n >> 8, n & 0xFF))
+    body = bytearray(n)
+    for i in range(n):
+        body[i] = payload[i] ^ mask[i & 3]
+    return head + mask + bytes(body)
+
+
+def build_stream():
+    frames = []
+    for sec in range(SECONDS):
+        remaining = 1500 - sec
+        frames.append(masked_frame(json.dumps({
+            "type": "progress",
+            "remainingSeconds": remaining,
+            "progressPercent": sec * 100 // 1500,
+            "elapsedSeconds": sec,
+            "timestamp": 1760000000000 + sec * 1000,
+        }).encode()))
+        if sec % BURST_EVERY == BURST_EVERY - 1:
+            for cmd in BURST_COMMANDS:
+                frames.append(masked_frame(json.dumps({
+                    "type": cmd, "duration": 25, "totalSeconds": 1500,
+                    "remainingSeconds": remaining, "taskId": "task-0001",
+                    "timestamp": 1760000000000 + sec * 1000,
+                }).encode()))
+    return frames
+
+
+# 优化前的解析方式：假设一次读取正好是一个完整帧，逐字节解掩码
+def legacy_decode(data):
+    payload_len = data[1] & 127
+    if payload_len == 126:
+        payload_len = (data[2] << 8) | data[3]
+        mask = data[4:8]
+        encrypted_data = data[8:8 + payload_len]
+    else:
+        mask = data[2:6]
+        encrypted_data = data[6:6 + payload_len]
+    decoded = bytearray()
+    for i in range(payload_len):
+        decoded.append(encrypted_data[i] ^ mask[i % 4])
+    return decoded
+
+
+def run_legacy(frames):
+    t0 = ticks_us()
+    count = 0
+    for frame in frames:
+        legacy_decode(frame)
+        count += 1
+    return count, ticks_diff(ticks_us(), t0)
+
+
+def run_decoder(frames):
+    stream = b"".join(frames)
+    # 预先切好随机大小的块，计时只包含解码
+    chunks = []
+    i = 0
+    while i < len(stream):
+        n = random.randint(1, 400)
+        chunks.append(stream[i:i + n])
+        i += n
+    decoder = wsframe.FrameDecoder(2048, 1024)
+    t0 = ticks_us()
+    count = 0
+    for chunk in chunks:
+        decoder.feed(chunk)
+        while decoder.next() is not None:
+            count += 1
+    return count, ticks_diff(ticks_us(), t0)
+
+
+def main():
+    random.seed(2024)
+    frames = build_stream()
+    total_bytes = sum(len(f) for f in frames)
+    print("{}个帧, 共{}字节".format(len(frames), total_bytes))
+    for name, func in (("优化前(每次读取一个帧, 逐字节解掩码)", run_legacy),
+                       ("流式解码器(随机分块)", run_decoder)):
+        count, elapsed = func(frames)
+        rate = count * 1000000 / elapsed if elapsed else 0
+        print("{}: {}条消息, {:.1f} ms, {:.0f} 条/秒".format(name, count, elapsed / 1000, rate))
+
+
+if __name__ == "__main__":
+    main()
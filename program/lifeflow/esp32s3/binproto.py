@@ -0,0 +1,168 @@
+# 紧凑二进制命令协议（WebSocket子协议 lifeflow.bin.v1）
+# 每条消息为1字节操作码加固定宽度的大端字段，解码结果写入复用的dict，
+# 与JSON消息走同一个handle_message()处理流程
+import struct
+
+SUBPROTOCOL = "lifeflow.bin.v1"
+JSON_SUBPROTOCOL = "lifeflow.json"
+
+# 任务标题位图：128x12像素的MONO_VLSB（每字节为一列中纵向的8个像素，每8行一页），由浏览器渲染后推送
+TITLE_WIDTH = 128
+TITLE_HEIGHT = 12
+TITLE_BYTES = TITLE_WIDTH * ((TITLE_HEIGHT + 7) // 8)
+
+# 操作码 -> (消息类型, 字段格式, 字段名)
+LAYOUTS = {
+    0x01: ("start", ">III", ("totalSeconds", "remainingSeconds", "taskHash")),
+    0x02: ("pause", ">I", ("remainingSeconds",)),
+    0x03: ("resume", ">III", ("totalSeconds", "remainingSeconds", "taskHash")),
+    0x04: ("stop", "", ()),
+    0x05: ("progress", ">IIB", ("remainingSeconds", "elapsedSeconds", "progressPercent")),
+    0x06: ("complete", "", ()),
+    0x11: ("break_start", ">I", ("totalSeconds",)),
+    0x12: ("break_pause", ">I", ("remainingSeconds",)),
+    0x13: ("break_resume", "", ()),
+    0x15: ("break_progress", ">IIB", ("remainingSeconds", "elapsedSeconds", "progressPercent")),
+    0x16: ("break_complete", "", ()),
+    0x20: ("status", "", ()),
+    0x21: ("subscribe", ">B", ("events",)),
+    0x22: ("task_title", ">I", ("taskHash",)),
+}
+# 固定字段之后带一段定长字节的消息：操作码 -> (字段名, 字节数)；解码出的字节引用接收缓冲区，处理前有效
+BLOBS = {
+    0x22: ("bitmap", TITLE_BYTES),
+}
+FIELDS = ("totalSeconds", "remainingSeconds", "elapsedSeconds", "progressPercent", "taskHash", "events")
+OPCODES = {}
+for _op, _layout in LAYOUTS.items():
+    OPCODES[_layout[0]] = _op
+SIZES = {}
+for _op, _layout in LAYOUTS.items():
+    SIZES[_op] = struct.calcsize(_layout[1]) if _layout[1] else 0
+    if _op in BLOBS:
+        SIZES[_op] += BLOBS[_op][1]
+# 操作码 -> 各字段的(字段名, 偏移, 字节数)；解码时逐字节拼出整数，不经过struct.unpack创建元组
+FIELD_OFFSETS = {}
+for _op, _layout in LAYOUTS.items():
+    _fields = []
+    _offset = 1
+    for _name, _code in zip(_layout[2], _layout[1][1:]):
+        _size = 4 if _code == "I" else 1
+        _fields.append((_name, _offset, _size))
+        _offset += _size
+    FIELD_OFFSETS[_op] = tuple(_fields)
+
+# 设备发出的消息
+OP_ACK = 0x80
+OP_ERROR = 0x81
+# 开始/继续计时的任务在设备的标题缓存中没有：OP_TITLE_REQUEST | taskHash(u32)
+OP_TITLE_REQUEST = 0x82
+TITLE_REQUEST_FORMAT = ">BI"
+TITLE_REQUEST_SIZE = struct.calcsize(TITLE_REQUEST_FORMAT)
+OP_STATE = 0x90
+# 设备推送的事件，与状态广播使用相同的字段格式
+EVENT_OPCODES = {
+    "state_changed": OP_STATE,
+    "completed": 0x91,
+    "break_completed": 0x92,
+    "heartbeat": 0x93,
+}
+STATE_FORMAT = ">BBIIB"
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+STATE_CODES = {
+    "idle": 0,
+    "running": 1,
+    "paused": 2,
+    "completed": 3,
+    "break_running": 4,
+    "break_paused": 5,
+    "break_completed": 6,
+}
+
+
+def new_message():
+    message = {"type": None}
+    for name in FIELDS:
+        message[name] = 0
+    message["bitmap"] = None
+    return message
+
+
+# 解码一条二进制消息到message（new_message()创建的dict），格式错误时抛出ValueError；
+# 字段值小于2**30（秒数、百分比）时不分配堆内存，taskHash等更大的值由MicroPython按大整数保存
+def decode(payload, message):
+    if len(payload) < 1:
+        raise ValueError("empty message")
+    op = payload[0]
+    layout = LAYOUTS.get(op)
+    if layout is None:
+        raise ValueError("unknown opcode")
+    if len(payload) < 1 + SIZES[op]:
+        raise ValueError("short message")
+    for name in FIELDS:
+        message[name] = 0
+    message["bitmap"] = None
+    message["type"] = layout[0]
+    for name, offset, size in FIELD_OFFSETS[op]:
+        value = payload[offset]
+        for i in range(offset + 1, offset + size):
+            value = (value << 8) | payload[i]
+        message[name] = value
+    blob = BLOBS.get(op)
+    if blob is not None:
+        end = 1 + SIZES[op]
+        message[blob[0]] = payload[end - blob[1]:end]
+    return message
+
+
+# 编码一条命令（dict）为二进制消息，供主机侧工具和测试使用
+def encode(message):
+    op = OPCODES[message["type"]]
+    fmt, names = LAYOUTS[op][1], LAYOUTS[op][2]
+    values = []
+    for name in names:
+        if name == "taskHash" and "taskHash" not in message:
+            values.append(task_hash(message.get("taskId", "")))
+        else:
+            values.append(int(message.get(name, 0)))
+    data = bytes((op,)) + (struct.pack(fmt, *values) if fmt else b"")
+    blob = BLOBS.get(op)
+    if blob is not None:
+        value = bytes(message.get(blob[0]) or bytes(blob[1]))
+        if len(value) != blob[1]:
+            raise ValueError("{} must be {} bytes".format(blob[0], blob[1]))
+        data += value
+    return data
+
+
+# 写入确认消息到预分配的2字节缓冲区
+def encode_ack(buf, msg_type):
+    buf[0] = OP_ACK
+    buf[1] = OPCODES.get(msg_type, 0)
+    return buf
+
+
+def encode_error(buf):
+    buf[0] = OP_ERROR
+    buf[1] = 0
+    return buf
+
+
+# 写入标题请求到预分配的缓冲区
+def encode_title_request(buf, key):
+    struct.pack_into(TITLE_REQUEST_FORMAT, buf, 0, OP_TITLE_REQUEST, key)
+    return buf
+
+
+def encode_state(buf, state, remaining, total, is_break, op=OP_STATE):
+    struct.pack_into(STATE_FORMAT, buf, 0, op, STATE_CODES.get(state, 0),
+                     int(remaining), int(total), 1 if is_break else 0)
+    return buf
+
+
+# 任务ID的32位FNV-1a哈希，与前端encodeDeviceCommand()保持一致
+def task_hash(task_id):
+    h = 0x811C9DC5
+    for b in str(task_id).encode():
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h
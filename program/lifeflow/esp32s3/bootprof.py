@@ -0,0 +1,28 @@
+# 启动耗时记录：main.py第一个导入本模块，之后每个启动阶段结束时调用mark(名称)，
+# 记录从导入本模块到该时刻的微秒数；第一个连接被接受时记录accept。GET /boot 返回完整记录，
+# 用于比较启动顺序的调整和.mpy预编译的效果
+import time
+
+# 导入本模块时的ticks_us；板子上ticks_us从复位开始计数，这个值约等于复位到开始执行main.py的时间
+started_us = time.ticks_us()
+phases = []
+first_accept_us = None
+
+
+def mark(name):
+    phases.append((name, time.ticks_diff(time.ticks_us(), started_us)))
+
+
+# 每个新连接调用，只记录第一次
+def accepted():
+    global first_accept_us
+    if first_accept_us is None:
+        first_accept_us = time.ticks_diff(time.ticks_us(), started_us)
+
+
+def report():
+    return {
+        "startedUs": started_us,
+        "phases": [[name, us] for name, us in phases],
+        "firstAcceptUs": first_accept_us,
+    }
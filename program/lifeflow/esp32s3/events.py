@@ -0,0 +1,50 @@
+# 设备主动推送的事件，以及每个WebSocket连接的订阅和心跳状态
+# 客户端默认订阅全部事件，可以发送 {"type": "subscribe", "events": [...]} 只接收其中一部分
+import time
+
+STATE_CHANGED = "state_changed"
+COMPLETED = "completed"
+BREAK_COMPLETED = "break_completed"
+HEARTBEAT = "heartbeat"
+
+BITS = {
+    STATE_CHANGED: 0x01,
+    COMPLETED: 0x02,
+    BREAK_COMPLETED: 0x04,
+    HEARTBEAT: 0x08,
+}
+ALL = 0x0F
+
+
+# 订阅的事件：JSON中为事件名列表，二进制协议中为位掩码；未知的事件名忽略
+def mask(events):
+    if isinstance(events, int):
+        return events & ALL
+    bits = 0
+    for name in events:
+        bits |= BITS.get(name, 0)
+    return bits
+
+
+class Client:
+    __slots__ = ("writer", "binary", "events", "last_seen", "task", "dropped")
+
+    def __init__(self, writer, binary=False):
+        self.writer = writer
+        self.binary = binary
+        self.events = ALL
+        self.last_seen = time.ticks_ms()
+        # 处理该连接的任务，心跳超时时取消它来断开连接
+        self.task = None
+        # 心跳任务断开连接的原因；为None时任务的取消来自别处（例如关机）
+        self.dropped = None
+
+    # 收到任何帧（包括pong）都说明连接仍然有效
+    def seen(self):
+        self.last_seen = time.ticks_ms()
+
+    def idle_ms(self):
+        return time.ticks_diff(time.ticks_ms(), self.last_seen)
+
+    def wants(self, event):
+        return self.events & BITS[event]
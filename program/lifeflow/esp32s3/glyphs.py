@@ -0,0 +1,115 @@
+# 中文字形图集的运行时渲染
+# 图集文件由 tools/build_glyph_atlas.py 生成，放在flash文件系统中；
+# 只把码位索引读入内存，字形位图按需用readinto读到固定数量的缓存槽里再blit到屏幕
+import struct
+import framebuf
+
+MAGIC = b"LFGA"
+HEADER = "<4sBBBH"
+HEADER_SIZE = struct.calcsize(HEADER)
+# ASCII字符使用framebuf自带的8x8字体
+ASCII_ADVANCE = 8
+
+
+class GlyphAtlas:
+    def __init__(self, path, cache_size=16):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(HEADER_SIZE)
+        magic, version, self.width, self.height, self.count = struct.unpack(HEADER, header)
+        if magic != MAGIC:
+            raise ValueError("bad glyph atlas")
+        self.glyph_bytes = self.width * ((self.height + 7) // 8)
+        # 码位索引（升序uint16）
+        self._index = bytearray(self.count * 2)
+        self._file.readinto(self._index)
+        self._data_offset = HEADER_SIZE + self.count * 2
+        # 缓存槽：每个槽一块位图缓冲区和对应的FrameBuffer，全部预先分配
+        self.cache_size = cache_size
+        self._slots = []
+        self._slot_bufs = []
+        for _ in range(cache_size):
+            buf = bytearray(self.glyph_bytes)
+            self._slot_bufs.append(buf)
+            self._slots.append(framebuf.FrameBuffer(buf, self.width, self.height, framebuf.MONO_VLSB))
+        self._slot_code = [-1] * cache_size
+        self._slot_used = [0] * cache_size
+        self._cached = {}
+        self._clock = 0
+        self._missing = framebuf.FrameBuffer(bytearray(self.glyph_bytes), self.width, self.height, framebuf.MONO_VLSB)
+        self._missing.rect(1, 1, self.width - 2, self.height - 2, 1)
+        # 2色调色板：字形的1映射为绘制颜色，0映射为相反颜色并作为透明色跳过
+        self._palette = framebuf.FrameBuffer(bytearray(2), 2, 1, framebuf.MONO_VLSB)
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self._file.close()
+
+    def _find(self, code):
+        index = self._index
+        lo = 0
+        hi = self.count - 1
+        while lo <= hi:
+            mid = (lo + hi) >> 1
+            value = index[mid * 2] | (index[mid * 2 + 1] << 8)
+            if value == code:
+                return mid
+            if value < code:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return -1
+
+    # 返回字形的FrameBuffer；不在图集中的字符返回一个空心方框
+    def glyph(self, code):
+        self._clock += 1
+        slot = self._cached.get(code)
+        if slot is not None:
+            self.hits += 1
+            self._slot_used[slot] = self._clock
+            return self._slots[slot]
+        pos = self._find(code)
+        if pos < 0:
+            return self._missing
+        self.misses += 1
+        # 淘汰最久未使用的槽
+        slot = 0
+        oldest = self._slot_used[0]
+        for i in range(1, self.cache_size):
+            if self._slot_used[i] < oldest:
+                oldest = self._slot_used[i]
+                slot = i
+        old = self._slot_code[slot]
+        if old >= 0:
+            del self._cached[old]
+        self._file.seek(self._data_offset + pos * self.glyph_bytes)
+        self._file.readinto(self._slot_bufs[slot])
+        self._slot_code[slot] = code
+        self._slot_used[slot] = self._clock
+        self._cached[code] = slot
+        return self._slots[slot]
+
+    def text_width(self, text):
+        w = 0
+        for ch in text:
+            w += ASCII_ADVANCE if ord(ch) < 0x80 else self.width + 1
+        return w
+
+    # 在fb上绘制混合中英文的文本，ASCII字符在行内垂直居中；中文字形以透明背景按颜色c blit
+    def draw_text(self, fb, text, x, y, c=1):
+        ascii_dy = (self.height - 8) // 2
+        key = 1 - c
+        palette = self._palette
+        palette.pixel(0, 0, key)
+        palette.pixel(1, 0, c)
+        for ch in text:
+            code = ord(ch)
+            if code < 0x80:
+                fb.text(ch, x, y + ascii_dy, c)
+                x += ASCII_ADVANCE
+            else:
+                fb.blit(self.glyph(code), x, y, key, palette)
+                x += self.width + 1
+        return x
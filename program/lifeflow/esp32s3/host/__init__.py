@@ -0,0 +1,88 @@
+# 在桌面CPython上运行ESP32固件的仿真环境
+# install()把lib目录中的machine/network/framebuf/micropython/ubinascii放到导入路径最前面，
+# 并给time、gc、asyncio补上MicroPython特有的函数，固件代码无需修改即可导入运行
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from esp32s3.host.clock import clock, ticks_add, ticks_diff
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
+# 仿真的堆大小，对应ESP32-S3-N16R8开启PSRAM后MicroPython的可用堆
+HEAP_SIZE = 8 * 1024 * 1024
+
+_installed = False
+
+
+def _mem_alloc():
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+def _mem_free():
+    return HEAP_SIZE - _mem_alloc()
+
+
+async def _sleep_ms(ms):
+    await asyncio.sleep(ms / 1000)
+
+
+# asyncio.ThreadSafeFlag：定时器回调（实时模式下在时钟线程中运行）调用set()唤醒等待的任务
+class ThreadSafeFlag:
+    def __init__(self):
+        self._flag = False
+        self._loop = None
+        self._event = None
+
+    def set(self):
+        self._flag = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._flag = False
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._event = asyncio.Event()
+        while not self._flag:
+            await self._event.wait()
+            self._event.clear()
+        self._flag = False
+
+
+def install(realtime=False, trace_alloc=False):
+    global _installed
+    clock.realtime = realtime
+    if not _installed:
+        if LIB_DIR not in sys.path:
+            sys.path.insert(0, LIB_DIR)
+        time.ticks_ms = clock.ticks_ms
+        time.ticks_us = clock.ticks_us
+        time.ticks_cpu = clock.ticks_cpu
+        time.ticks_diff = ticks_diff
+        time.ticks_add = ticks_add
+        time.sleep_ms = clock.sleep_ms
+        time.sleep_us = clock.sleep_us
+        gc.mem_alloc = _mem_alloc
+        gc.mem_free = _mem_free
+        if not hasattr(asyncio, "ThreadSafeFlag"):
+            asyncio.ThreadSafeFlag = ThreadSafeFlag
+        if not hasattr(asyncio, "sleep_ms"):
+            asyncio.sleep_ms = _sleep_ms
+        _installed = True
+    if trace_alloc and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if realtime:
+        clock.start()
+    return clock
+
+
+__all__ = ["install", "clock", "ticks_add", "ticks_diff", "HEAP_SIZE", "LIB_DIR"]
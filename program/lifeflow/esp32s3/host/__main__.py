@@ -0,0 +1,83 @@
+# 在本机运行ESP32固件：python -m esp32s3.host --port 8080
+# 需要在program/lifeflow目录下执行，固件通过 import esp32s3.xxx 导入自己的模块
+# --instances N 在同一进程中运行N份固件（端口从--port开始依次递增），用于网关和负载测试；
+# 各份固件的main.py是独立的模块对象，会话状态和连接互不影响，log/power/journal等模块共用
+# 在线更新写入--ota-root目录（默认ota/）而不是源码目录，--ota-key把密钥写入该目录以启用更新；
+# 运行多份固件时每份使用独立的ota、metrics模块和ota-root/端口号目录，像各自独立的设备
+import argparse
+import asyncio
+import importlib.util
+import os
+
+from esp32s3 import host
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在桌面CPython上运行LifeFlow ESP32固件")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认只监听本机）")
+    parser.add_argument("--port", type=int, default=8080, help="监听端口（板子上是80）")
+    parser.add_argument("--no-oled", action="store_true", help="仿真未接OLED的情况")
+    parser.add_argument("--instances", type=int, default=1, help="同一进程中运行的固件份数")
+    parser.add_argument("--log-level", choices=("debug", "info", "warning", "error"), default="info",
+                        help="运行时日志级别（板子上默认warning）")
+    parser.add_argument("--ota-root", default="ota", help="在线更新写入的目录")
+    parser.add_argument("--ota-key", default=None, help="在线更新的密钥（写入ota-root下的ota.key）")
+    args = parser.parse_args()
+
+    host.install(realtime=True)
+    if args.no_oled:
+        import machine
+        machine.i2c_devices = lambda bus_id: {}
+
+    import esp32s3.log as log
+    log.set_level(getattr(log, args.log_level.upper()))
+
+    import esp32s3.main as firmware
+    firmware.SERVER_HOST = args.host
+    firmware.SERVER_PORT = args.port
+    if args.instances <= 1:
+        setup_ota(firmware.ota, args.ota_root, args.ota_key)
+        print("仿真固件监听 http://{}:{}".format(args.host, args.port))
+        firmware.main()
+        return
+
+    firmwares = [firmware]
+    for i in range(1, args.instances):
+        copy = load_copy("esp32s3.main_{}".format(i), firmware.__file__)
+        copy.SERVER_HOST = args.host
+        copy.SERVER_PORT = args.port + i
+        firmwares.append(copy)
+    for i, copy in enumerate(firmwares):
+        if i:
+            copy.ota = load_copy("esp32s3.ota_{}".format(i), firmware.ota.__file__)
+            copy.metrics = load_copy("esp32s3.metrics_{}".format(i), firmware.metrics.__file__)
+        setup_ota(copy.ota, os.path.join(args.ota_root, str(copy.SERVER_PORT)), args.ota_key)
+    print("{}份仿真固件监听 http://{}:{}-{}".format(
+        args.instances, args.host, args.port, args.port + args.instances - 1))
+    try:
+        asyncio.run(serve_all(firmwares))
+    except KeyboardInterrupt:
+        pass
+
+
+def load_copy(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def setup_ota(ota, root, key):
+    ota.ROOT = root
+    if key:
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, ota.KEY_PATH), "w") as f:
+            f.write(key)
+
+
+async def serve_all(firmwares):
+    await asyncio.gather(*[firmware.serve() for firmware in firmwares])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# 主机仿真用的时钟：为time.ticks_*和machine.Timer提供统一的时间源
+# 虚拟模式下时间只在advance()时前进，用于可重复的测试；实时模式下跟随系统时钟
+import threading
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+class Clock:
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self._now_us = 0
+        self._base_ns = time.monotonic_ns()
+        self._timers = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # 当前时间（微秒，不回绕）
+    def now_us(self):
+        if self.realtime:
+            return (time.monotonic_ns() - self._base_ns) // 1000
+        return self._now_us
+
+    def ticks_ms(self):
+        return (self.now_us() // 1000) & TICKS_MAX
+
+    def ticks_us(self):
+        return self.now_us() & TICKS_MAX
+
+    def ticks_cpu(self):
+        return self.ticks_us()
+
+    def sleep_us(self, us):
+        if self.realtime:
+            time.sleep(us / 1000000)
+        else:
+            self.advance_us(us)
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+    # 虚拟模式：推进时间并按到期顺序触发定时器
+    def advance(self, ms):
+        self.advance_us(int(ms * 1000))
+
+    def advance_us(self, us):
+        if self.realtime:
+            raise RuntimeError("实时模式下不能手动推进时钟")
+        target = self._now_us + us
+        while True:
+            timer = self._next_due(target)
+            if timer is None:
+                break
+            self._now_us = max(self._now_us, timer.due_us)
+            self._fire(timer)
+        self._now_us = target
+
+    def add_timer(self, timer):
+        with self._lock:
+            if timer not in self._timers:
+                self._timers.append(timer)
+        self._wakeup.set()
+
+    def remove_timer(self, timer):
+        with self._lock:
+            if timer in self._timers:
+                self._timers.remove(timer)
+        self._wakeup.set()
+
+    def pending_timers(self):
+        with self._lock:
+            return list(self._timers)
+
+    def _next_due(self, limit_us):
+        with self._lock:
+            due = None
+            for timer in self._timers:
+                if timer.due_us <= limit_us and (due is None or timer.due_us < due.due_us):
+                    due = timer
+            return due
+
+    def _fire(self, timer):
+        with self._lock:
+            if timer.periodic:
+                timer.due_us += timer.period_us
+            else:
+                self._timers.remove(timer)
+        timer.fire()
+
+    # 实时模式：后台线程在定时器到期时调用回调，相当于板子上的软中断
+    def start(self):
+        if not self.realtime or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="host-clock", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            now = self.now_us()
+            timer = self._next_due(now)
+            if timer is not None:
+                self._fire(timer)
+                continue
+            with self._lock:
+                upcoming = min((t.due_us for t in self._timers), default=None)
+            self._wakeup.clear()
+            timeout = None if upcoming is None else max(0, upcoming - now) / 1000000
+            self._wakeup.wait(timeout)
+
+
+def ticks_diff(a, b):
+    return ((a - b + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+clock = Clock()
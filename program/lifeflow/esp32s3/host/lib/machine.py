@@ -0,0 +1,180 @@
+# machine模块的主机仿真：Pin、I2C（统计传输次数和字节数）、由仿真时钟驱动的Timer
+import errno
+
+from esp32s3.host.clock import clock
+from esp32s3.host.panel import SSD1315Panel
+
+
+def _default_i2c_devices(bus_id):
+    # 默认在0x3C挂一块128x64的SSD1315面板；测试可以替换这个函数模拟其他接线
+    return {0x3C: SSD1315Panel(128, 64)}
+
+
+i2c_devices = _default_i2c_devices
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self._value = value or 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        return None
+
+    __call__ = value
+
+
+class I2C:
+    def __init__(self, id=0, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.scl = scl
+        self.sda = sda
+        self.freq = freq
+        self.devices = i2c_devices(id)
+        self.transactions = 0
+        self.bytes_written = 0
+
+    def _device(self, addr):
+        dev = self.devices.get(addr)
+        if dev is None:
+            raise OSError(errno.ENODEV)
+        return dev
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def writeto(self, addr, buf, stop=True):
+        dev = self._device(addr)
+        self.transactions += 1
+        self.bytes_written += len(buf)
+        dev.write(bytes(buf))
+        return 1
+
+    def writevto(self, addr, vector, stop=True):
+        dev = self._device(addr)
+        payload = b"".join(bytes(buf) for buf in vector)
+        self.transactions += 1
+        self.bytes_written += len(payload)
+        dev.write(payload)
+        return 1
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self._device(addr)
+        self.transactions += 1
+        return bytes(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self._device(addr)
+        self.transactions += 1
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes_written = 0
+
+
+SoftI2C = I2C
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self.callback = None
+        self.periodic = False
+        self.period_us = 0
+        self.due_us = 0
+        self.fired = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, callback=None, freq=None):
+        if freq is not None:
+            period = 1000 // freq
+        clock.remove_timer(self)
+        self.callback = callback
+        self.periodic = mode == Timer.PERIODIC
+        self.period_us = max(1, period) * 1000
+        self.due_us = clock.now_us() + self.period_us
+        clock.add_timer(self)
+
+    def deinit(self):
+        clock.remove_timer(self)
+
+    def fire(self):
+        self.fired += 1
+        if self.callback is not None:
+            self.callback(self)
+
+
+class ResetError(SystemExit):
+    pass
+
+
+def reset():
+    raise ResetError("machine.reset()")
+
+
+def soft_reset():
+    raise ResetError("machine.soft_reset()")
+
+
+def freq(hz=None):
+    return 240000000
+
+
+def unique_id():
+    return b"\x24\x0a\xc4\x00\x00\x01"
+
+
+def idle():
+    clock.sleep_us(0)
+
+
+# 浅睡眠：仿真中只让时钟前进（实时模式下阻塞等待），记录次数和时长
+lightsleeps = 0
+lightsleep_ms = 0
+
+
+def lightsleep(time_ms=None):
+    global lightsleeps, lightsleep_ms
+    if time_ms is None:
+        raise ValueError("仿真中lightsleep必须指定时长")
+    lightsleeps += 1
+    lightsleep_ms += time_ms
+    clock.sleep_ms(time_ms)
+
+
+def reset_cause():
+    return 1
+
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
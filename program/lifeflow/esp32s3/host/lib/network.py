@@ -0,0 +1,52 @@
+# network模块的主机仿真：WLAN不操作真实网卡，只记录配置
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 1010
+
+
+class WLAN:
+    PM_NONE = 0
+    PM_PERFORMANCE = 1
+    PM_POWERSAVE = 2
+
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._config = {"essid": "", "password": "", "pm": WLAN.PM_PERFORMANCE}
+        self._ifconfig = ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._config.get(args[0])
+        self._config.update(kwargs)
+
+    # 记录固件设置的地址，但服务实际监听在本机回环地址上
+    def ifconfig(self, config=None):
+        if config is None:
+            return self._ifconfig
+        self._ifconfig = tuple(config)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self._config["essid"] = ssid
+
+    def disconnect(self):
+        pass
+
+    def isconnected(self):
+        return self._active
+
+    def status(self, param=None):
+        if param == "stations":
+            return []
+        return STAT_GOT_IP if self._active else STAT_IDLE
+
+    def scan(self):
+        return []
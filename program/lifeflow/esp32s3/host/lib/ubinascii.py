@@ -0,0 +1,2 @@
+# ubinascii模块的主机仿真，直接使用CPython的binascii
+from binascii import a2b_base64, b2a_base64, crc32, hexlify, unhexlify
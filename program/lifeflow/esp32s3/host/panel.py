@@ -0,0 +1,100 @@
+# SSD1315 OLED面板的行为模型，挂在仿真I2C总线上
+# 解析控制字节、命令和GDDRAM写入，用于验证驱动的局部刷新结果与帧缓冲一致
+
+# 带参数命令及其参数个数
+_CMD_ARGS = {
+    0x20: 1,  # 内存寻址模式
+    0x21: 2,  # 列地址窗口
+    0x22: 2,  # 页地址窗口
+    0x81: 1,  # 对比度
+    0x8D: 1,  # 电荷泵
+    0xA8: 1,  # 复用比
+    0xD3: 1,  # 显示偏移
+    0xD5: 1,  # 时钟分频
+    0xD9: 1,  # 预充电周期
+    0xDA: 1,  # COM引脚配置
+    0xDB: 1,  # VCOMH电平
+}
+
+
+class SSD1315Panel:
+    def __init__(self, width=128, height=64):
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.gddram = bytearray(self.pages * width)
+        self.display_on = False
+        self.contrast = 0x7F
+        self.col_start, self.col_end = 0, width - 1
+        self.page_start, self.page_end = 0, self.pages - 1
+        self.col = 0
+        self.page = 0
+        self.commands = 0
+        self.data_bytes = 0
+        self._cmd = []
+
+    # I2C写入：按控制字节拆分命令和数据
+    def write(self, payload):
+        i = 0
+        n = len(payload)
+        while i < n:
+            control = payload[i]
+            i += 1
+            continuation = control & 0x80
+            is_data = control & 0x40
+            if continuation:
+                if i < n:
+                    self._byte(payload[i], is_data)
+                    i += 1
+                continue
+            while i < n:
+                self._byte(payload[i], is_data)
+                i += 1
+
+    def _byte(self, value, is_data):
+        if is_data:
+            self._data(value)
+        else:
+            self._command(value)
+
+    def _command(self, value):
+        self._cmd.append(value)
+        need = _CMD_ARGS.get(self._cmd[0], 0)
+        if len(self._cmd) <= need:
+            return
+        cmd = self._cmd
+        self._cmd = []
+        self.commands += 1
+        op = cmd[0]
+        if op == 0x21:
+            self.col_start, self.col_end = cmd[1], cmd[2]
+            self.col = self.col_start
+        elif op == 0x22:
+            self.page_start, self.page_end = cmd[1] & 0x07, cmd[2] & 0x07
+            self.page = self.page_start
+        elif op == 0x81:
+            self.contrast = cmd[1]
+        elif op == 0xAE:
+            self.display_on = False
+        elif op == 0xAF:
+            self.display_on = True
+
+    # 水平寻址模式：列到达窗口末尾后换到下一页，页到达末尾后回到窗口起点
+    def _data(self, value):
+        self.data_bytes += 1
+        self.gddram[self.page * self.width + self.col] = value
+        if self.col < self.col_end:
+            self.col += 1
+            return
+        self.col = self.col_start
+        self.page = self.page + 1 if self.page < self.page_end else self.page_start
+
+    def pixel(self, x, y):
+        return (self.gddram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+
+    # 以字符画形式输出当前屏幕内容，方便在终端查看
+    def render_text(self, on="#", off="."):
+        rows = []
+        for y in range(self.height):
+            rows.append("".join(on if self.pixel(x, y) else off for x in range(self.width)))
+        return "\n".join(rows)
@@ -0,0 +1,213 @@
+# 最小HTTP/1.1请求解析和响应构造
+# 只读取请求行和请求头（不按固定大小读取整个请求），只保留路由和WebSocket握手需要的几个头；
+# 静态响应在导入时编码为bytes常量，带Content-Length，便于同一连接上连续处理多个请求（keep-alive）
+
+# 单行最大长度和请求头最大行数，超出时返回错误并关闭连接
+MAX_LINE = 512
+MAX_HEADERS = 32
+# 请求体最大长度（除在线更新外没有路由需要请求体，读出后丢弃）
+MAX_BODY = 1024
+
+# 需要保留的请求头（小写）；先按首字母过滤，其余请求头不切片、不转小写
+HEADERS = (b"connection", b"upgrade", b"content-length",
+           b"sec-websocket-key", b"sec-websocket-protocol", b"x-update-token")
+_INITIALS = b"cusx"
+
+CORS = (b"Access-Control-Allow-Origin: *\r\n"
+        b"Access-Control-Allow-Methods: GET, POST, PUT, OPTIONS\r\n"
+        b"Access-Control-Allow-Headers: *\r\n")
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "version", "headers")
+
+    def __init__(self, method, path, query, version):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = {}
+
+    # HTTP/1.1默认保持连接，除非客户端要求关闭；HTTP/1.0按关闭处理
+    def keep_alive(self):
+        if self.version != b"HTTP/1.1":
+            return False
+        return self.headers.get(b"connection", b"").lower() != b"close"
+
+    def is_websocket(self):
+        return self.headers.get(b"upgrade", b"").lower() == b"websocket"
+
+
+# 有长度上限的行读取：asyncio的readline()会一直读到换行为止，客户端可以让设备缓存任意长的一行。
+# 这里每次最多读到缓冲MAX_LINE字节为止，一行超过MAX_LINE（含换行）时立即拒绝；读请求头时多读到的数据
+# （请求体、紧跟在后面的下一个请求）留在缓冲区里，由read()/readinto()先返回
+class LineReader:
+    def __init__(self, stream, size=MAX_LINE):
+        self.stream = stream
+        self.size = size
+        self._data = b""
+        self._pos = 0
+
+    async def readline(self):
+        scan = self._pos
+        while True:
+            i = self._data.find(b"\n", scan)
+            if i >= 0:
+                line = self._data[self._pos:i + 1]
+                self._pos = i + 1
+                return line
+            buffered = len(self._data) - self._pos
+            if buffered >= self.size:
+                raise HttpError(431)
+            # 最多再读到缓冲满为止，超过上限的数据留在流里
+            chunk = await self.stream.read(self.size - buffered)
+            if not chunk:
+                line = self._data[self._pos:]
+                self._data = b""
+                self._pos = 0
+                return line
+            scan = buffered
+            self._data = self._data[self._pos:] + chunk if buffered else chunk
+            self._pos = 0
+
+    async def read(self, n=-1):
+        if self._pos < len(self._data):
+            end = len(self._data) if n < 0 else min(len(self._data), self._pos + n)
+            data = self._data[self._pos:end]
+            self._pos = end
+            return data
+        return await self.stream.read(n)
+
+    async def readinto(self, mv):
+        if self._pos < len(self._data):
+            n = min(len(mv), len(self._data) - self._pos)
+            mv[:n] = self._data[self._pos:self._pos + n]
+            self._pos += n
+            return n
+        if hasattr(self.stream, "readinto"):
+            return await self.stream.readinto(mv)
+        data = await self.stream.read(len(mv))
+        mv[:len(data)] = data
+        return len(data)
+
+    # 没有缓冲的数据时返回原来的流，之后（例如WebSocket连接）直接从流读取，不再多一层协程
+    def detach(self):
+        if self._pos < len(self._data):
+            return self
+        return self.stream
+
+
+# 读取一个请求的请求行和请求头；连接已关闭（或请求前只有空行）时返回None，格式错误时抛出HttpError。
+# 连接上的读取应经过LineReader，行长度在读取过程中就受到限制；这里的长度检查只是兜底
+async def read_request(reader):
+    line = await reader.readline()
+    while line == b"\r\n" or line == b"\n":
+        line = await reader.readline()
+    if not line:
+        return None
+    if len(line) > MAX_LINE:
+        raise HttpError(431)
+    parts = line.split()
+    if len(parts) != 3:
+        raise HttpError(400)
+    target = parts[1]
+    q = target.find(b"?")
+    if q >= 0:
+        request = Request(parts[0], target[:q], target[q + 1:], parts[2])
+    else:
+        request = Request(parts[0], target, b"", parts[2])
+    count = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        if line == b"\r\n" or line == b"\n":
+            break
+        count += 1
+        if count > MAX_HEADERS or len(line) > MAX_LINE:
+            raise HttpError(431)
+        if (line[0] | 0x20) not in _INITIALS:
+            continue
+        i = line.find(b":")
+        if i <= 0:
+            continue
+        name = line[:i].strip().lower()
+        if name in HEADERS:
+            request.headers[name] = line[i + 1:].strip()
+    return request
+
+
+# 查询字符串中的参数值（bytes），没有该参数时返回None
+def param(query, name):
+    for item in query.split(b"&"):
+        i = item.find(b"=")
+        if i == len(name) and item.startswith(name):
+            return item[i + 1:]
+    return None
+
+
+# 读出并丢弃请求体，保证下一个请求从正确的位置开始
+async def discard_body(reader, request):
+    length = request.headers.get(b"content-length")
+    if not length:
+        return
+    try:
+        n = int(length)
+    except ValueError:
+        raise HttpError(400)
+    if n < 0 or n > MAX_BODY:
+        raise HttpError(413)
+    while n > 0:
+        chunk = await reader.read(n)
+        if not chunk:
+            return
+        n -= len(chunk)
+
+
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    409: "Conflict",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+def _status_line(status):
+    return "HTTP/1.1 {} {}\r\n".format(status, REASONS.get(status, "")).encode()
+
+
+# 构造完整的响应（状态行、响应头和正文），用于在导入时生成静态响应常量
+def response(status, body=b"", content_type=None, headers=CORS):
+    if isinstance(body, str):
+        body = body.encode()
+    head = _status_line(status)
+    if content_type:
+        head += b"Content-Type: " + content_type + b"\r\n"
+    return head + headers + "Content-Length: {}\r\n\r\n".format(len(body)).encode() + body
+
+
+# 不带Content-Length、发送完后关闭连接的响应头，用于流式输出
+def stream_header(status, content_type, headers=CORS):
+    return (_status_line(status) +
+            b"Content-Type: " + content_type + b"\r\n" + headers + b"Connection: close\r\n\r\n")
+
+
+ERRORS = {}
+for _status in (400, 401, 404, 413, 431, 500):
+    ERRORS[_status] = response(_status, REASONS[_status], b"text/plain")
+
+
+def error_response(status):
+    return ERRORS.get(status) or ERRORS[500]
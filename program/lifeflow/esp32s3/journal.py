@@ -0,0 +1,241 @@
+# 专注/休息会话日志：每个结束的会话（完成、停止或被新一轮替换）追加一条固定长度的二进制记录到Flash
+# 记录先攒在内存中，攒够FLUSH_RECORDS条或最早一条等待超过FLUSH_AFTER_MS后一次写入，减少Flash擦写；
+# 文件按段轮转，每段最多SEGMENT_RECORDS条，文件名是段内第一条记录的序号（8位十六进制），
+# 超过MAX_SEGMENTS段时删除最旧的一段。
+# 导出时按序号游标从段文件中分块读取，不会把整个日志读进内存
+import os
+import struct
+import time
+
+DIR = "journal"
+# 序号、开始时间、计划秒数、实际计时秒数、任务哈希、暂停次数、标志位、保留
+RECORD_FORMAT = ">IIIIIHBB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+SEGMENT_RECORDS = 256
+MAX_SEGMENTS = 8
+FLUSH_RECORDS = 8
+FLUSH_AFTER_MS = 10 * 60 * 1000
+# 写入失败后第一次重试的等待时间，之后每次失败加倍，最长FLUSH_AFTER_MS
+RETRY_MS = 1000
+# 导出时每次读取的记录数
+CHUNK_RECORDS = 21
+
+FLAG_COMPLETED = 0x01
+FLAG_BREAK = 0x02
+# 开始时间已按浏览器时间校准为Unix秒；未设置时为设备上电后的time.time()
+FLAG_WALLCLOCK = 0x04
+
+segments = []  # 各段第一条记录的序号，从旧到新
+next_seq = 1
+_segment_count = 0  # 最新一段中已写入的记录数
+_pending = bytearray(RECORD_SIZE * FLUSH_RECORDS)
+_pending_count = 0
+_pending_since = 0
+_retry_ms = 0
+_retry_at = None
+_scratch = bytearray(RECORD_SIZE)
+_chunk = bytearray(RECORD_SIZE * CHUNK_RECORDS)
+_clock_offset = None
+_exporting = 0
+
+# 统计计数
+appended = 0
+flushes = 0
+dropped = 0
+failures = 0
+
+
+def _path(first):
+    return "{}/{:08x}.bin".format(DIR, first)
+
+
+# 启动时扫描已有的段，恢复下一个序号；最后一段末尾有不完整的记录时从新的一段开始写
+def open_journal():
+    global segments, next_seq, _segment_count
+    try:
+        names = os.listdir(DIR)
+    except OSError:
+        os.mkdir(DIR)
+        names = []
+    segments = sorted(int(name[:8], 16) for name in names if len(name) == 12 and name.endswith(".bin"))
+    next_seq = 1
+    _segment_count = 0
+    if segments:
+        size = os.stat(_path(segments[-1]))[6]
+        _segment_count = size // RECORD_SIZE
+        next_seq = segments[-1] + _segment_count
+        if size % RECORD_SIZE:
+            _segment_count = SEGMENT_RECORDS
+    return len(segments)
+
+
+# 用浏览器发来的Unix毫秒时间戳校准开始时间
+def set_clock(timestamp_ms):
+    global _clock_offset
+    _clock_offset = int(timestamp_ms) // 1000 - int(time.time())
+
+
+def now():
+    return int(time.time()) + (_clock_offset or 0)
+
+
+# 会话状态改变前记下当前这一轮的数据（计划时长、已计时长、暂停次数等）
+def capture(s, is_break):
+    flags = FLAG_BREAK if is_break else 0
+    started = s.started
+    if _clock_offset is not None:
+        started += _clock_offset
+        flags |= FLAG_WALLCLOCK
+    actual = (s.total * 1000 - s.remaining_ms()) // 1000
+    struct.pack_into(RECORD_FORMAT, _scratch, 0, 0, started & 0xFFFFFFFF, s.total,
+                     actual if actual > 0 else 0, s.task, s.pauses, flags, 0)
+
+
+# 确认这一轮已经结束，把capture()记下的数据加入待写入的记录；
+# 可以在定时器回调中调用，只复制到内存缓冲区，不写Flash
+def commit(completed):
+    global next_seq, _pending_count, _pending_since, appended, dropped
+    if _pending_count >= FLUSH_RECORDS:
+        # 缓冲区已满（Flash写入一直失败），丢弃这条记录；不占用序号，段内序号保持连续
+        dropped += 1
+        return
+    struct.pack_into(">I", _scratch, 0, next_seq)
+    if completed:
+        _scratch[RECORD_SIZE - 2] |= FLAG_COMPLETED
+    offset = _pending_count * RECORD_SIZE
+    _pending[offset:offset + RECORD_SIZE] = _scratch
+    if _pending_count == 0:
+        _pending_since = time.ticks_ms()
+    _pending_count += 1
+    next_seq += 1
+    appended += 1
+
+
+# 距离需要写入Flash还有多少毫秒；没有待写入的记录时返回None。上一次写入失败时等到重试时间
+def flush_in_ms():
+    if _pending_count == 0:
+        return None
+    if _retry_at is not None:
+        ms = time.ticks_diff(_retry_at, time.ticks_ms())
+        return ms if ms > 0 else 0
+    if _pending_count >= FLUSH_RECORDS:
+        return 0
+    ms = FLUSH_AFTER_MS - time.ticks_diff(time.ticks_ms(), _pending_since)
+    return ms if ms > 0 else 0
+
+
+# 把内存中的记录追加到最新一段，写满后新建一段，并删除超出数量的旧段。
+# 每写完一段就把这些记录移出缓冲区，后面的段写入失败时重试不会重复写入已经写好的序号；
+# 失败时记下重试时间（指数退避）并把异常抛给调用者
+def flush():
+    global _segment_count, _pending_count, flushes, failures, _retry_ms, _retry_at
+    if _pending_count == 0:
+        return 0
+    written = 0
+    try:
+        while _pending_count:
+            first = next_seq - _pending_count
+            if not segments or _segment_count >= SEGMENT_RECORDS:
+                segments.append(first)
+                _segment_count = 0
+            n = min(_pending_count, SEGMENT_RECORDS - _segment_count)
+            with open(_path(segments[-1]), "ab") as f:
+                f.write(memoryview(_pending)[:n * RECORD_SIZE])
+            _segment_count += n
+            written += n
+            _pending[:(_pending_count - n) * RECORD_SIZE] = _pending[n * RECORD_SIZE:_pending_count * RECORD_SIZE]
+            _pending_count -= n
+    except Exception:
+        failures += 1
+        _abandon_segment(next_seq - _pending_count)
+        _retry_ms = min(_retry_ms * 2 if _retry_ms else RETRY_MS, FLUSH_AFTER_MS)
+        _retry_at = time.ticks_add(time.ticks_ms(), _retry_ms)
+        raise
+    _retry_ms = 0
+    _retry_at = None
+    flushes += 1
+    _rotate()
+    return written
+
+
+# 写入失败的段末尾可能留下不完整的记录，之后从新的一段开始写；
+# 这一段本来就从失败的记录开始（刚新建）时删掉它，重试时用同样的文件名重新创建
+def _abandon_segment(first):
+    global _segment_count
+    if segments and segments[-1] == first:
+        segments.pop()
+        try:
+            os.remove(_path(first))
+        except OSError:
+            pass
+    _segment_count = SEGMENT_RECORDS
+
+
+def _rotate():
+    # 导出过程中不删除段文件，等下一次写入时再删
+    while len(segments) > MAX_SEGMENTS and not _exporting:
+        os.remove(_path(segments.pop(0)))
+
+
+# 依次产生序号大于since的记录（memoryview，指向复用的缓冲区，下一次迭代前需要用完），
+# 先读Flash中的段，再读内存中尚未写入的记录
+def chunks(since=0):
+    global _exporting
+    _exporting += 1
+    try:
+        cursor = since
+        for i in range(len(segments)):
+            first = segments[i]
+            end = segments[i + 1] if i + 1 < len(segments) else next_seq - _pending_count
+            if end <= cursor + 1:
+                continue
+            skip = cursor + 1 - first if cursor >= first else 0
+            try:
+                f = open(_path(first), "rb")
+            except OSError:
+                continue
+            try:
+                f.seek(skip * RECORD_SIZE)
+                while True:
+                    n = f.readinto(_chunk)
+                    n -= n % RECORD_SIZE
+                    if not n:
+                        break
+                    cursor = struct.unpack_from(">I", _chunk, n - RECORD_SIZE)[0]
+                    yield memoryview(_chunk)[:n]
+            finally:
+                f.close()
+        for i in range(_pending_count):
+            offset = i * RECORD_SIZE
+            if struct.unpack_from(">I", _pending, offset)[0] > cursor:
+                _chunk[0:RECORD_SIZE] = _pending[offset:offset + RECORD_SIZE]
+                yield memoryview(_chunk)[:RECORD_SIZE]
+    finally:
+        _exporting -= 1
+
+
+def decode(record):
+    seq, started, planned, actual, task, pauses, flags, _ = struct.unpack(RECORD_FORMAT, record)
+    return {
+        "seq": seq,
+        "startedAt": started,
+        "plannedSeconds": planned,
+        "actualSeconds": actual,
+        "taskHash": task,
+        "pauses": pauses,
+        "completed": bool(flags & FLAG_COMPLETED),
+        "isBreak": bool(flags & FLAG_BREAK),
+        "wallClock": bool(flags & FLAG_WALLCLOCK),
+    }
+
+
+def stats():
+    return {
+        "segments": len(segments),
+        "nextSeq": next_seq,
+        "pending": _pending_count,
+        "appended": appended,
+        "flushes": flushes,
+        "dropped": dropped,
+        "failures": failures,
+    }
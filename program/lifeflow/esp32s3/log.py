@@ -0,0 +1,90 @@
+# 轻量日志：按级别过滤，未启用的级别直接返回，不格式化参数
+# 最近的日志行保存在内存环形缓冲区中，可以通过HTTP /logs 获取，不必一直输出到串口
+import sys
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_NAMES = {DEBUG: "D", INFO: "I", WARNING: "W", ERROR: "E"}
+
+# 生产固件默认只记录警告和错误
+level = WARNING
+# 是否同时输出到串口（REPL）：板子上默认不输出，日志只进环形缓冲区，通过 /logs 查看；
+# 桌面仿真时输出到终端。接串口调试时设置 log.echo = True
+echo = sys.implementation.name != "micropython"
+
+RING_SIZE = 64
+_ring = [None] * RING_SIZE
+_ring_pos = 0
+dropped = 0
+
+
+def set_level(new_level):
+    global level
+    level = new_level
+
+
+def enabled(lvl):
+    return lvl >= level
+
+
+def _ticks_ms():
+    try:
+        return time.ticks_ms()
+    except AttributeError:
+        return int(time.time() * 1000)
+
+
+def _emit(lvl, msg, args):
+    global _ring_pos, dropped
+    if args:
+        try:
+            msg = msg.format(*args)
+        except Exception:
+            msg = "{} {}".format(msg, args)
+    line = "{} {} {}".format(_ticks_ms(), _NAMES.get(lvl, "?"), msg)
+    if _ring[_ring_pos] is not None:
+        dropped += 1
+    _ring[_ring_pos] = line
+    _ring_pos = (_ring_pos + 1) % RING_SIZE
+    if echo:
+        print(line)
+
+
+def debug(msg, *args):
+    if level <= DEBUG:
+        _emit(DEBUG, msg, args)
+
+
+def info(msg, *args):
+    if level <= INFO:
+        _emit(INFO, msg, args)
+
+
+def warning(msg, *args):
+    if level <= WARNING:
+        _emit(WARNING, msg, args)
+
+
+def error(msg, *args):
+    if level <= ERROR:
+        _emit(ERROR, msg, args)
+
+
+# 按时间顺序返回环形缓冲区中的日志行
+def lines():
+    for i in range(RING_SIZE):
+        line = _ring[(_ring_pos + i) % RING_SIZE]
+        if line is not None:
+            yield line
+
+
+def clear():
+    global _ring_pos, dropped
+    for i in range(RING_SIZE):
+        _ring[i] = None
+    _ring_pos = 0
+    dropped = 0
@@ -1,668 +1,1093 @@
+import esp32s3.bootprof as bootprof
 import network
-import socket
 import json
 import time
+from micropython import const
 from machine import Pin, Timer
+import esp32s3.log as log
 import esp32s3.ssd1315 as ssd1315
+import esp32s3.wsframe as wsframe
+import esp32s3.binproto as binproto
+import esp32s3.glyphs as glyphs
+import esp32s3.widgets as widgets
+import esp32s3.titles as titles
+import esp32s3.session as session
+import esp32s3.power as power
+import esp32s3.httpd as httpd
+import esp32s3.events as events
+import esp32s3.journal as journal
+import esp32s3.ota as ota
+import esp32s3.metrics as metrics
 from machine import I2C
-import hashlib
-import ubinascii
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+bootprof.mark("imports")
+
+# 编译期日志开关：为0时每秒刷新、每条消息的调试日志在编译时被整体去掉，不占用运行时间
+# 其余日志按 esp32s3/log.py 中的运行时级别过滤（生产固件默认只记录警告和错误）
+LOG_DEBUG = const(0)
 
 # OLED屏幕配置（ESP32-S3 GPIO18=SCL, GPIO17=SDA）
+OLED_ADDR = 0x3C
 OLED_INITIALIZED = False
-try:
-    # 初始化I2C总线
-    i2c = I2C(0, scl=Pin(18), sda=Pin(17), freq=400000)
-    print("✅ I2C总线初始化成功")
-    
-    # 扫描I2C设备
-    devices = i2c.scan()
-    print(f"🔍 扫描到{len(devices)}个I2C设备")
-    for addr in devices:
-        print(f"   设备地址: 0x{addr:02X}")
-    
-    # 尝试使用默认地址0x3C初始化OLED
-    OLED_ADDR = 0x3C
-    if OLED_ADDR in devices:
+oled = None
+
+# 中文字形图集（由 tools/build_glyph_atlas.py 生成并与固件一起上传），缺失时退回framebuf的ASCII字体
+GLYPH_ATLAS_PATH = "esp32s3/glyphs.bin"
+atlas = None
+# 绘制文字的字体：图集加载成功时为atlas，否则为framebuf的ASCII字体
+font = widgets.ASCII
+# 静态提示画面的缓存槽数（每个槽一块128x64的帧缓冲，1KB）
+STATIC_SCREEN_SLOTS = 5
+static_screens = None
+# 任务标题缓存的槽数（每个槽一块128x12的位图，256字节）
+TITLE_CACHE_SLOTS = 8
+task_titles = None
+
+# 初始化I2C、OLED和字形图集；在服务器开始监听之后执行，屏幕不影响连接就绪的时间
+def init_display():
+    global i2c, oled, OLED_INITIALIZED, atlas, font, static_screens, task_titles
+    try:
+        i2c = I2C(0, scl=Pin(18), sda=Pin(17), freq=400000)
+        # 不扫描整条总线，直接按默认地址初始化；地址上没有设备时第一条命令就会抛出OSError
         oled = ssd1315.SSD1315(128, 64, i2c, addr=OLED_ADDR)
-        print("✅ OLED初始化成功")
+        log.info("✅ OLED初始化成功")
         OLED_INITIALIZED = True
-    else:
-        print(f"❌ 未找到OLED设备（期望地址: 0x{OLED_ADDR:02X}）")
-except Exception as e:
-    print(f"❌ OLED初始化失败: {e}")
-
-# 状态变量
-current_state = "idle"  # idle, running, paused, completed, break_running, break_paused, break_completed
-focus_duration = 0  # 总秒数（专注或休息）
-remaining_seconds = 0
-start_time = 0
-is_paused = False
-pause_remaining = 0
-is_break = False  # 是否处于休息模式
-
-# 初始化OLED
-def init_display():
+        power.attach(oled)
+    except OSError as e:
+        log.warning("❌ 未找到OLED设备（期望地址: 0x{:02X}）: {}", OLED_ADDR, e)
+    except Exception as e:
+        log.error("❌ OLED初始化失败: {}", e)
     if OLED_INITIALIZED:
         try:
-            oled.fill(0)
-            oled.text("专注时钟", 0, 0)
-            oled.text("等待连接...", 0, 20)
-            oled.show()
-            print("✅ 初始化OLED显示")
+            atlas = glyphs.GlyphAtlas(GLYPH_ATLAS_PATH)
+            log.info("✅ 字形图集已加载: {}个字形", atlas.count)
         except Exception as e:
-            print("❌ 初始化显示失败:", e)
+            log.warning("❌ 字形图集加载失败，中文将无法正确显示: {}", e)
+        if atlas is not None:
+            font = atlas
+        status_label.font = font
+        static_screens = widgets.StaticScreens(128, 64, STATIC_SCREEN_SLOTS, font)
+        task_titles = titles.TitleCache(binproto.TITLE_WIDTH, binproto.TITLE_HEIGHT, TITLE_CACHE_SLOTS)
+    return OLED_INITIALIZED
 
-# 显示倒计时
-def display_timer():
+# 服务器监听地址（主机仿真时改为本机回环地址和非特权端口）
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 80
+SERVER_BACKLOG = 5
+# HTTP keep-alive：同一连接上等待下一个请求的秒数和最多处理的请求数
+HTTP_KEEPALIVE_S = 5
+HTTP_MAX_REQUESTS = 100
+# WebSocket接收环形缓冲区大小和单条消息上限（字节）
+WS_BUFFER_SIZE = 2048
+WS_MAX_MESSAGE = 1024
+# 心跳：每隔WS_PING_INTERVAL_S秒向客户端发送ping帧（以及订阅了的heartbeat事件），
+# 超过WS_PONG_TIMEOUT_S秒没有收到任何帧（包括pong）则断开连接
+WS_PING_INTERVAL_S = 5
+WS_PONG_TIMEOUT_S = 12
+# 在线更新：等待下一块数据的最长秒数（超时放弃本次更新），重启命令回复后等待的秒数
+UPDATE_READ_TIMEOUT_S = 10
+REBOOT_DELAY_S = 1
+
+# 计时会话（状态、总秒数、剩余秒数、是否休息），所有状态变化都经过focus.dispatch()
+focus = session.FocusSession()
+
+# 渲染队列：状态变化只调用request_frame()标记需要重绘，由render_task()在主循环中绘制，
+# 两帧之间至少间隔FRAME_MS，期间的多次请求合并为一帧；定时器回调和消息处理中不做I2C传输
+FRAME_MS = 100
+frame_dirty = False
+frames_requested = 0
+frames_rendered = 0
+render_flag = asyncio.ThreadSafeFlag()
+# 提示画面的文字（(文字, x, y)元组），None时按会话状态绘制
+overlay = None
+# 屏幕上当前的提示画面，显示计时画面时为None
+shown_lines = None
+# 绘制时复制的会话状态：状态、剩余秒数、总秒数
+frame_state = [session.IDLE, 0, 0]
+
+IDLE_LINES = (("专注时钟", 0, 0), ("等待连接...", 0, 20))
+CONNECTED_LINES = (("已连接!", 20, 20), ("等待指令...", 5, 35))
+ONLINE_LINES = (("设备在线", 20, 20), ("等待指令", 5, 35))
+FOCUS_COMPLETED_LINES = (("专注完成!", 10, 20), ("恭喜你!", 30, 35), ("休息一下吧", 15, 50))
+BREAK_COMPLETED_LINES = (("休息完成!", 10, 20), ("准备开始", 25, 35), ("下一轮专注", 15, 50))
+
+# 请求重绘；lines为提示画面的文字，不传时显示会话状态对应的画面（可以在定时器回调中调用）
+def request_frame(lines=None):
+    global frame_dirty, frames_requested, overlay
+    overlay = lines
+    frames_requested += 1
+    frame_dirty = True
+    render_flag.set()
+
+# 有待绘制的请求时绘制一帧，返回是否绘制
+def render_pending():
+    global frame_dirty, frames_rendered
+    if not frame_dirty:
+        return False
+    frame_dirty = False
     if OLED_INITIALIZED:
-        try:
-            print(f"🎨 显示计时器 - 状态: {current_state}, 剩余: {remaining_seconds}秒, 休息模式: {is_break}")
-            oled.fill(0)
-            
-            # 显示状态
-            status_text = "准备就绪"
-            if current_state == "running":
-                status_text = "专注中"
-            elif current_state == "paused":
-                status_text = "已暂停"
-            elif current_state == "completed":
-                status_text = "完成!"
-            elif current_state == "break_running":
-                status_text = "休息中"
-            elif current_state == "break_paused":
-                status_text = "休息暂停"
-            elif current_state == "break_completed":
-                status_text = "休息完成"
-            
-            oled.text(status_text, 0, 0)
-            print(f"   状态文本: {status_text}")
-            
-            # 显示时间
-            minutes = remaining_seconds // 60
-            seconds = remaining_seconds % 60
-            time_str = "{:02d}:{:02d}".format(minutes, seconds)
-            
-            # 显示时间
-            oled.text(time_str, 20, 20)
-            print(f"   时间显示: {time_str}")
-            
-            # 显示进度条
-            if focus_duration > 0:
-                progress = ((focus_duration - remaining_seconds) / focus_duration) * 100
-                bar_width = int(progress * 128 / 100)  # 使用完整宽度128
-                oled.fill_rect(0, 40, bar_width, 10, 1)  # 进度条位置
-                oled.rect(0, 40, 128, 10, 1)  # 进度条边框
-                
-                # 显示百分比
-                percent_str = "{:.0f}%".format(progress)
-                oled.text(percent_str, 45, 55)
-                print(f"   进度显示: {progress:.0f}% (宽度: {bar_width})")
-            
-            oled.show()
-            print(f"✅ 显示更新完成")
-        except Exception as e:
-            print("❌ 显示计时器失败:", e)
+        frames_rendered += 1
+        metrics.rendering.begin()
+        render()
+        metrics.rendering.end()
+    return True
 
-# 更新计时器
-def update_timer():
-    global remaining_seconds
-    
+# 后台任务：被request_frame()唤醒后绘制，然后至少等待FRAME_MS再处理下一次请求
+async def render_task():
+    while True:
+        await render_flag.wait()
+        render_pending()
+        await asyncio.sleep_ms(FRAME_MS)
+
+# 提示画面从缓存复制，同一画面重复请求时不再复制；计时画面只重绘值变化的部件
+def render():
+    global shown_lines
+    focus.snapshot(frame_state)
+    state = frame_state[0]
+    lines = overlay
+    if lines is None:
+        if state == session.IDLE:
+            lines = IDLE_LINES
+        elif state == session.COMPLETED:
+            lines = FOCUS_COMPLETED_LINES
+        elif state == session.BREAK_COMPLETED:
+            lines = BREAK_COMPLETED_LINES
     try:
-        # 处理专注状态倒计时
-        if current_state == "running" and not is_paused:
-            if remaining_seconds > 0:
-                remaining_seconds -= 1
-                display_timer()
-                
-                # 检查是否完成
-                if remaining_seconds == 0:
-                    complete_focus()
-            else:
-                complete_focus()
-        # 处理休息状态倒计时
-        elif current_state == "break_running" and not is_paused:
-            if remaining_seconds > 0:
-                remaining_seconds -= 1
-                display_timer()
-                
-                # 检查休息是否完成
-                if remaining_seconds == 0:
-                    complete_break()
-            else:
-                complete_break()
+        if lines is not None:
+            if lines is not shown_lines:
+                static_screens.show(oled.buffer, lines)
+                shown_lines = lines
+                timer_screen.invalidate()
+        else:
+            update_timer_widgets(state, frame_state[1], frame_state[2])
+            timer_screen.draw(oled)
+            shown_lines = None
+        oled.show()
     except Exception as e:
-        print("更新计时器失败:", e)
+        log.error("❌ 显示失败: {}", e)
 
-# 开始专注
-def start_focus(duration_minutes):
-    global current_state, focus_duration, remaining_seconds, start_time, is_paused
-    
-    current_state = "running"
-    focus_duration = duration_minutes * 60
-    remaining_seconds = focus_duration
-    start_time = time.time()
-    is_paused = False
-    
-    display_timer()
-    print("开始专注: {}分钟".format(duration_minutes))
+# 计时画面上次请求绘制时的状态和秒数
+shown_state = None
+shown_seconds = -1
 
-# 暂停专注
-def pause_focus():
-    global is_paused, current_state, pause_remaining
-    
-    if current_state == "running":
-        is_paused = True
-        current_state = "paused"
-        pause_remaining = remaining_seconds
-        display_timer()
-        print("已暂停")
-
-# 继续专注
-def resume_focus():
-    global is_paused, current_state
-    
-    if current_state == "paused":
-        is_paused = False
-        current_state = "running"
-        display_timer()
-        print("继续专注")
-
-# 停止专注/休息
-def stop_focus():
-    global current_state, remaining_seconds, is_paused, is_break
-    
-    current_state = "idle"
-    remaining_seconds = 0
-    is_paused = False
-    is_break = False
-    
-    init_display()
-    print("已停止计时器，回到初始状态")
+# 计时画面的部件：状态文字、分:秒、任务标题、进度条和百分比，各占一块互不重叠的区域
+status_label = widgets.Label(0, 0, 128, 20)
+countdown = widgets.Countdown(20, 20, 108, widgets.CHAR_H)
+task_title = widgets.Bitmap(0, 28, binproto.TITLE_WIDTH, binproto.TITLE_HEIGHT)
+progress_bar = widgets.ProgressBar(0, 40, 128, 10)
+percent_label = widgets.Percent(45, 55, 83, widgets.CHAR_H)
+timer_screen = widgets.Screen(status_label, countdown, task_title, progress_bar, percent_label)
+# 任务标题部件对应的任务哈希，任务变化或收到新标题时重新查找缓存
+title_task = None
 
-# 延迟调用stop_focus函数
-def delayed_stop_focus(timer):
-    stop_focus()
+# 按会话状态更新计时画面的部件；进度全部用整数计算，稳态下每帧不分配堆内存（见bench_alloc.py）
+def update_timer_widgets(state, remaining, total):
+    global title_task
+    if LOG_DEBUG:
+        log.debug("🎨 显示计时器 - 状态: {}, 剩余: {}秒", state, remaining)
+    status_text = STATUS_LABELS.get(state, "准备就绪")
+    status_label.set(status_text)
+    countdown.set(remaining)
+    if focus.task != title_task:
+        title_task = focus.task
+        task_title.set(task_titles.get(title_task) if title_task else None)
+    if total > 0:
+        elapsed = total - remaining
+        # 使用完整宽度128
+        progress_bar.set(elapsed * 128 // total)
+        # 百分比与原来的"{:.0f}"一样，正好一半时取偶数
+        percent = elapsed * 100 // total
+        half = elapsed * 200 - percent * total * 2
+        if half > total or (half == total and percent & 1):
+            percent += 1
+        percent_label.set(percent)
+        if LOG_DEBUG:
+            log.debug("   进度: {}% (宽度: {})", percent, progress_bar.value)
+    else:
+        progress_bar.set(None)
+        percent_label.set(None)
 
-# 完成专注
-def complete_focus():
-    global current_state
-    
-    current_state = "completed"
-    print("🎉 专注完成")
-    
-    if OLED_INITIALIZED:
-        try:
-            oled.fill(0)
-            oled.text("专注完成!", 10, 20)
-            oled.text("恭喜你!", 30, 35)
-            oled.text("休息一下吧", 15, 50)
-            oled.show()
-            print("✅ 显示完成信息")
-        except Exception as e:
-            print("❌ 完成状态显示失败:", e)
-    
-    # 使用Timer在5秒后调用stop_focus，避免阻塞执行
+# 各状态在屏幕第一行显示的文字
+STATUS_LABELS = {
+    session.RUNNING: "专注中",
+    session.PAUSED: "已暂停",
+    session.COMPLETED: "完成!",
+    session.BREAK_RUNNING: "休息中",
+    session.BREAK_PAUSED: "休息暂停",
+    session.BREAK_COMPLETED: "休息完成",
+}
+
+# 计时中定时器最长的等待时间（毫秒）
+TICK_MS = 1000
+# 定时器只在倒计时进行时运行：单次定时器设在显示的剩余秒数下一次变化的时刻，每次回调后重新设定，
+# 计时中每秒只唤醒一次；剩余时间按截止时间计算，回调迟到不累积误差
+ticker = None
+# 当前这一次定时器的等待时间，以及设定时的截止时间（截止时间被progress重新校准时重新设定）
+tick_ms = TICK_MS
+ticker_deadline = None
+
+# 距离显示的剩余秒数下一次变化的毫秒数
+def next_tick_ms():
+    ms = focus.remaining_ms() % 1000
+    return ms if ms else TICK_MS
+
+def on_tick(timer):
+    update_timer()
+
+def arm_ticker():
+    global tick_ms, ticker_deadline
+    tick_ms = next_tick_ms()
+    ticker_deadline = focus.deadline
+    metrics.timer_started()
+    ticker.init(period=tick_ms, mode=Timer.ONE_SHOT, callback=on_tick)
+
+def update_ticker():
+    global ticker
+    if focus.running():
+        if ticker is None:
+            try:
+                ticker = Timer(0)
+                arm_ticker()
+                log.debug("⏱️ 定时器已启动，{}毫秒后回调", tick_ms)
+            except Exception as e:
+                ticker = None
+                log.error("❌ 初始化定时器失败: {}", e)
+        elif focus.deadline != ticker_deadline:
+            arm_ticker()
+    elif ticker is not None:
+        ticker.deinit()
+        ticker = None
+        log.debug("⏱️ 定时器已停止")
+
+# 更新计时器（由定时器回调调用），仍在计时时设定下一次回调
+def update_timer():
+    metrics.timer_tick(tick_ms)
+    power.wakeups += 1
+    power.ticks += 1
     try:
-        # 创建一次性定时器，5秒后执行stop_focus
-        complete_timer = Timer(-1)  # 使用虚拟定时器
-        complete_timer.init(period=5000, mode=Timer.ONE_SHOT, callback=delayed_stop_focus)
-        print("⏰ 已设置5秒后回到初始状态")
+        if focus.allows("tick") and dispatch("tick"):
+            refresh_timer()
+        if ticker is not None and focus.running():
+            arm_ticker()
     except Exception as e:
-        print("❌ 初始化完成定时器失败:", e)
-        # 如果定时器创建失败，仍然调用stop_focus以确保状态正确
-        stop_focus()
+        log.error("更新计时器失败: {}", e)
 
-# 完成休息
-def complete_break():
-    global current_state, is_break
-    
-    current_state = "break_completed"
-    is_break = False
-    print("🎉 休息完成")
-    
-    if OLED_INITIALIZED:
-        try:
-            oled.fill(0)
-            oled.text("休息完成!", 10, 20)
-            oled.text("准备开始", 25, 35)
-            oled.text("下一轮专注", 15, 50)
-            oled.show()
-            print("✅ 显示休息完成信息")
-        except Exception as e:
-            print("❌ 休息完成状态显示失败:", e)
-    
-    # 使用Timer在5秒后调用stop_focus，回到初始状态
+# 会结束当前这一轮的事件；tick只有到时才结束，在转换后记录
+ENDING_EVENTS = ("start", "break_start", "stop", "complete", "break_complete")
+
+# 分派会话事件；一轮计时结束（完成、停止或被新的一轮替换）时写入会话日志
+def dispatch(event, message=None):
+    ending = event in ENDING_EVENTS and focus.active()
+    if ending:
+        journal.capture(focus, focus.is_break)
+    is_break = focus.is_break
+    if not focus.dispatch(event, message):
+        return False
+    if event == "tick":
+        if not focus.active():
+            journal.capture(focus, is_break)
+            journal.commit(True)
+        return True
+    if ending:
+        journal.commit(focus.state == session.COMPLETED or focus.state == session.BREAK_COMPLETED)
+    if (event == "start" or event == "break_start") and message:
+        if "taskHash" in message:
+            focus.task = message["taskHash"]
+        elif message.get("taskId"):
+            focus.task = binproto.task_hash(message["taskId"])
+    return True
+
+# 把内存中的会话日志写入Flash（只在asyncio任务中调用）；失败时记录在journal.stats()的failures中
+def flush_journal():
+    try:
+        n = journal.flush()
+        log.debug("📒 会话日志写入{}条", n)
+    except Exception as e:
+        # journal.flush()已记下重试时间，state_monitor按flush_in_ms()等待，不会连续重试
+        log.error("❌ 会话日志写入失败: {}，{}毫秒后重试", e, journal.flush_in_ms())
+
+# 只在显示的秒数或状态变化时请求重绘（进度条和百分比都由剩余秒数算出）
+def refresh_timer():
+    if focus.state != shown_state or focus.remaining != shown_seconds:
+        show_state()
+
+# 完成画面停留时间（毫秒）
+COMPLETED_HOLD_MS = 5000
+
+# 完成画面停留5秒后回到初始状态
+def schedule_reset():
+    # 使用Timer在5秒后回到初始状态，避免阻塞执行
     try:
         complete_timer = Timer(-1)  # 使用虚拟定时器
-        complete_timer.init(period=5000, mode=Timer.ONE_SHOT, callback=delayed_stop_focus)
-        print("⏰ 已设置5秒后回到初始状态")
+        complete_timer.init(period=COMPLETED_HOLD_MS, mode=Timer.ONE_SHOT, callback=delayed_reset)
+        log.info("⏰ 已设置5秒后回到初始状态")
     except Exception as e:
-        print("❌ 初始化休息完成定时器失败:", e)
-        stop_focus()
+        log.error("❌ 初始化完成定时器失败: {}", e)
+        # 如果定时器创建失败，立即回到初始状态以确保状态正确
+        delayed_reset(None)
 
-# WebSocket服务器
-def start_websocket_server():
-    # 创建AP热点（这样手机/电脑可以直接连接）
+# 完成画面停留结束；如果期间已经开始了下一轮，状态机会拒绝这次重置
+def delayed_reset(timer):
+    if focus.dispatch("reset"):
+        show_state()
+
+# 状态转换后启停定时器并请求重绘
+def show_state():
+    global shown_state, shown_seconds
+    update_ticker()
+    power.touch()
+    state = focus.state
+    if state != shown_state:
+        if state == session.IDLE:
+            log.info("已停止计时器，回到初始状态")
+        elif state == session.COMPLETED:
+            log.info("🎉 专注完成")
+            schedule_reset()
+        elif state == session.BREAK_COMPLETED:
+            log.info("🎉 休息完成")
+            schedule_reset()
+    shown_state = state
+    shown_seconds = focus.remaining
+    request_frame()
+
+# 已建立WebSocket连接的客户端（events.Client列表），记录子协议、订阅的事件和最后收到帧的时间
+ws_clients = []
+# 二进制消息解码和应答复用的缓冲区
+bin_message = binproto.new_message()
+bin_ack = bytearray(2)
+bin_state = bytearray(binproto.STATE_SIZE)
+# 发送帧复用的缓冲区，帧头和负载一起写出
+ws_out = wsframe.FrameEncoder(WS_MAX_MESSAGE)
+# 会改变计时状态的消息类型，处理后向所有客户端广播最新状态
+STATE_EVENTS = ("start", "pause", "resume", "stop", "complete",
+                "break_start", "break_pause", "break_resume", "break_complete")
+last_broadcast_state = None
+
+# 创建AP热点（这样手机/电脑可以直接连接）
+ap = None
+
+def start_access_point():
+    global ap
     ap = network.WLAN(network.AP_IF)
     ap.active(True)
     ap.config(essid='LifeFlow-ESP32', password='12345678')  # 使用与前端配置一致的SSID
     ap.ifconfig(('192.168.4.1', '255.255.255.0', '192.168.4.1', '192.168.4.1'))  # 设置固定IP
     
-    print("AP模式已启动")
-    print("SSID: LifeFlow-ESP32")
-    print("密码: 12345678")
-    print("IP地址:", ap.ifconfig()[0])
+    log.info("AP模式已启动")
+    log.info("SSID: LifeFlow-ESP32")
+    log.info("密码: 12345678")
+    log.info("IP地址: {}", ap.ifconfig()[0])
+    return ap
+
+# 每个连接一个任务：WebSocket连接保持到断开，HTTP连接按keep-alive连续处理请求
+async def handle_client(reader, writer):
+    bootprof.accepted()
+    try:
+        client_addr = writer.get_extra_info('peername')
+        if LOG_DEBUG:
+            log.debug("客户端连接: {}", client_addr)
+        reader = httpd.LineReader(reader)
+        request = await httpd.read_request(reader)
+        served = 0
+        while request is not None:
+            if LOG_DEBUG:
+                log.debug("请求: {} {}", request.method, request.path)
+            if request.is_websocket():
+                await websocket_session(request, reader.detach(), writer)
+                break
+            served += 1
+            if not await handle_http(request, reader, writer) or served >= HTTP_MAX_REQUESTS:
+                break
+            try:
+                request = await asyncio.wait_for(httpd.read_request(reader), HTTP_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                break
+    except httpd.HttpError as e:
+        metrics.http_errors += 1
+        log.warning("HTTP请求格式错误: {}", e.status)
+        try:
+            writer.write(httpd.error_response(e.status))
+            await writer.drain()
+        except Exception:
+            pass
+    except Exception as e:
+        log.error("服务器错误: {}", e)
+    finally:
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+# WebSocket握手和消息循环
+async def websocket_session(request, reader, writer):
+    # 提取WebSocket Key
+    key = request.headers.get(b"sec-websocket-key")
+    if not key:
+        raise httpd.HttpError(400)
+    key = key.decode()
     
-    # 创建Socket服务器
-    addr = socket.getaddrinfo('0.0.0.0', 80)[0][-1]
-    server_socket = socket.socket()
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_socket.bind(addr)
-    server_socket.listen(1)
+    # 只有握手用到的模块在第一次握手时才导入，不占用启动时间
+    import hashlib
+    import ubinascii
     
-    print("WebSocket服务器已启动，等待连接...")
+    # 计算响应
+    magic = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    combined = (key + magic).encode()
+    sha1_hash = hashlib.sha1(combined).digest()
     
-    # 检查OLED是否已初始化成功
-    if OLED_INITIALIZED:
-        init_display()
+    # MicroPython中base64.b64encode可能不存在，使用ubinascii.b2a_base64替代
+    accept_key = ubinascii.b2a_base64(sha1_hash).decode().strip()
+    log.debug("🔑 WebSocket Key: {}", key)
+    log.debug("🔐 WebSocket Accept: {}", accept_key)
+    
+    # 协商子协议：浏览器提供lifeflow.bin.v1时使用二进制协议，否则保持JSON
+    subprotocol = select_subprotocol(request)
+    
+    # 发送握手响应
+    response = (
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Accept: " + accept_key + "\r\n"
+    )
+    if subprotocol:
+        response += "Sec-WebSocket-Protocol: " + subprotocol + "\r\n"
+    response += "Access-Control-Allow-Origin: *\r\n\r\n"
+    log.debug("发送WebSocket握手响应: {}", response)
+    writer.write(response.encode())
+    await writer.drain()
+    
+    client = events.Client(writer, subprotocol == binproto.SUBPROTOCOL)
+    client.task = asyncio.current_task()
+    ws_clients.append(client)
+    metrics.ws_connected()
+    user_activity()
+    log.info("WebSocket连接已建立，当前连接数: {}", len(ws_clients))
+    
+    # 更新显示（计时进行中时不覆盖倒计时画面）
+    if focus.state == session.IDLE:
+        request_frame(CONNECTED_LINES)
     
-    # 创建定时器用于更新显示
+    decoder = wsframe.FrameDecoder(WS_BUFFER_SIZE, WS_MAX_MESSAGE)
+    pinger = asyncio.create_task(heartbeat(client))
+    # 收到关闭帧才算正常断开，其余情况（心跳超时、出错、连接直接断掉）之后的新连接计为重连
+    clean = False
     try:
-        timer = Timer(0)
-        timer.init(period=1000, mode=Timer.PERIODIC, callback=lambda t: update_timer())
-        print("✅ 定时器已初始化，周期1秒")
+        # 处理消息：读取的数据进入环形缓冲区，每次取出一个完整的帧
+        while True:
+            n = await read_into(reader, decoder.writable())
+            if not n:
+                log.info("未收到数据，连接可能已关闭")
+                break
+            decoder.commit(n)
+            if not await process_frames(decoder, client):
+                clean = True
+                break
+    except asyncio.CancelledError:
+        # 只有心跳任务发起的取消在这里结束连接，其余的取消（关机、服务器停止）继续向上传递
+        if client.dropped is None:
+            raise
+        log.warning("💔 {}，断开WebSocket连接", client.dropped)
+    except wsframe.FrameError as e:
+        metrics.frame_errors += 1
+        log.error("❌ WebSocket帧错误: {}", e)
     except Exception as e:
-        print("❌ 初始化定时器失败:", e)
-    
+        log.warning("处理消息时出错: {}", e)
+    finally:
+        pinger.cancel()
+        metrics.ws_disconnected(clean)
+        if client in ws_clients:
+            ws_clients.remove(client)
+        log.info("WebSocket连接已断开，当前连接数: {}", len(ws_clients))
+
+# 从请求头Sec-WebSocket-Protocol中选择支持的子协议
+def select_subprotocol(request):
+    header = request.headers.get(b"sec-websocket-protocol")
+    if header:
+        offered = [p.strip() for p in header.decode().split(',')]
+        for name in (binproto.SUBPROTOCOL, binproto.JSON_SUBPROTOCOL):
+            if name in offered:
+                return name
+    return None
+
+# 从流中读取数据到给定缓冲区；板子上的Stream支持readinto，桌面asyncio没有则退回read
+async def read_into(reader, mv):
+    if hasattr(reader, "readinto"):
+        return await reader.readinto(mv)
+    data = await reader.read(len(mv))
+    mv[:len(data)] = data
+    return len(data)
+
+# 心跳任务：定期发送ping帧，客户端长时间没有任何响应时取消连接任务，由websocket_session清理
+async def heartbeat(client):
     while True:
+        await asyncio.sleep(WS_PING_INTERVAL_S)
+        if client.idle_ms() > WS_PONG_TIMEOUT_S * 1000:
+            metrics.heartbeat_timeouts += 1
+            client.dropped = "心跳超时"
+            client.task.cancel()
+            return
         try:
-            client_socket, client_addr = server_socket.accept()
-            print("客户端连接:", client_addr)
-            
-            # 处理WebSocket握手
-            request = client_socket.recv(1024).decode()
-            print("完整请求内容:", request)
-            
-            if "Upgrade: websocket" in request:
-                # 提取WebSocket Key
-                key_line = [line for line in request.split('\r\n') if 'Sec-WebSocket-Key:' in line][0]
-                key = key_line.split(': ')[1].strip()
-                
-                # 计算响应
-                magic = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
-                combined = (key + magic).encode()
-                sha1_hash = hashlib.sha1(combined).digest()
-                
-                # MicroPython中base64.b64encode可能不存在，使用ubinascii.b2a_base64替代
-                accept_key = ubinascii.b2a_base64(sha1_hash).decode().strip()
-                print(f"🔑 WebSocket Key: {key}")
-                print(f"🔐 WebSocket Accept: {accept_key}")
-                
-                # 发送握手响应
-                response = (
-                    "HTTP/1.1 101 Switching Protocols\r\n"
-                    "Upgrade: websocket\r\n"
-                    "Connection: Upgrade\r\n"
-                    "Sec-WebSocket-Accept: " + accept_key + "\r\n"
-                    "Access-Control-Allow-Origin: *\r\n\r\n"
-                )
-                print("发送WebSocket握手响应:", response)
-                client_socket.send(response.encode())
-                
-                print("WebSocket连接已建立")
-                
-                # 更新显示
-                if OLED_INITIALIZED:
-                    try:
-                        oled.fill(0)
-                        oled.text("已连接!", 20, 20)
-                        oled.text("等待指令...", 5, 35)
-                        oled.show()
-                        print("✅ 更新OLED连接状态")
-                    except Exception as e:
-                        print("❌ 更新显示失败:", e)
-                
-                # 处理消息
-                while True:
-                    try:
-                        data = client_socket.recv(1024)
-                        if not data:
-                            print("❌ 未收到数据，连接可能已关闭")
-                            break
-                            
-                        print(f"🔍 收到原始WebSocket数据: {data}")
-                        print(f"   数据长度: {len(data)}")
-                        
-                        # 简单的WebSocket消息解析
-                        if len(data) > 2:
-                            opcode = data[0] & 0x0F
-                            if opcode == 8:  # 关闭帧
-                                print("🔌 收到关闭帧，关闭连接")
-                                break
-                            
-                            payload_len = data[1] & 127
-                            print(f"   负载长度: {payload_len}")
-                            
-                            if payload_len == 126:
-                                payload_len = (data[2] << 8) | data[3]
-                                print(f"   扩展负载长度: {payload_len}")
-                                mask = data[4:8]
-                                encrypted_data = data[8:8+payload_len]
-                            elif payload_len == 127:
-                                # 大负载长度处理
-                                payload_len = (data[2] << 56) | (data[3] << 48) | (data[4] << 40) | (data[5] << 32) | (data[6] << 24) | (data[7] << 16) | (data[8] << 8) | data[9]
-                                print(f"   大负载长度: {payload_len}")
-                                mask = data[10:14]
-                                encrypted_data = data[14:14+payload_len]
-                            else:
-                                mask = data[2:6]
-                                encrypted_data = data[6:6+payload_len]
-                            
-                            print(f"   掩码: {mask}")
-                            print(f"   加密数据: {encrypted_data}")
-                            
-                            # 解密数据
-                            decoded = bytearray()
-                            for i in range(payload_len):
-                                decoded.append(encrypted_data[i] ^ mask[i % 4])
-                            
-                            try:
-                                decoded_str = decoded.decode()
-                                print(f"   解密后数据: {decoded_str}")
-                                
-                                message = json.loads(decoded_str)
-                                print("📩 解析后的WebSocket消息:", message)
-                                
-                                # 处理消息
-                                handle_message(message)
-                                
-                                # 发送确认
-                                response = json.dumps({"status": "received", "type": message.get("type")})
-                                print(f"📤 发送确认消息: {response}")
-                                send_websocket_message(client_socket, response)
-                            except Exception as e:
-                                print("❌ 解析消息失败:", e, "原始数据:", decoded)
-                                # 发送错误确认
-                                response = json.dumps({"status": "error", "type": "parse_error"})
-                                send_websocket_message(client_socket, response)
-                            
-                    except Exception as e:
-                        print("处理消息时出错:", e)
-                        # 移除traceback模块的使用，以提高MicroPython兼容性
-                        break
-                        
-            else:
-                # 普通HTTP请求
-                print("收到HTTP请求")
-                print("请求内容:", request)
-                
-                try:
-                    if "/ping" in request:
-                        # 处理/ping端点请求
-                        print("处理/ping请求")
-                        response = "HTTP/1.1 200 OK\r\n"
-                        response += "Content-Type: application/json\r\n"
-                        response += "Access-Control-Allow-Origin: *\r\n"
-                        response += "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
-                        response += "Access-Control-Allow-Headers: *\r\n\r\n"
-                        response += '{"status": "online", "message": "ESP32在线"}'
-                        print("发送/ping响应:", response)
-                        client_socket.send(response.encode())
-                    elif "/led/" in request:
-                        # 处理LED控制请求
-                        print("处理LED请求")
-                        response = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n\r\n"
-                        response += '{"status": "ok", "message": "LED命令已接收"}'
-                        
-                        led_status = ""
-                        # 这里可以添加实际的LED控制代码
-                        if "/led/green" in request:
-                            led_status = "绿色"
-                            print("LED: 绿色")
-                        elif "/led/yellow" in request:
-                            led_status = "黄色"
-                            print("LED: 黄色")
-                        elif "/led/off" in request:
-                            led_status = "关闭"
-                            print("LED: 关闭")
-                        elif "/led/rainbow" in request:
-                            led_status = "彩虹模式"
-                            print("LED: 彩虹模式")
-                        
-                        # 更新OLED显示LED状态
-                        if OLED_INITIALIZED and led_status:
-                            try:
-                                oled.fill(0)
-                                oled.text("LED控制", 0, 0)
-                                oled.text(f"状态: {led_status}", 0, 20)
-                                oled.text("来自前端", 0, 40)
-                                oled.show()
-                                print("✅ 更新OLED显示LED状态")
-                            except Exception as e:
-                                print("❌ LED状态显示失败:", e)
-                        
-                        client_socket.send(response.encode())
-                    elif "OPTIONS" in request:
-                        # 处理CORS预检请求
-                        print("处理OPTIONS请求")
-                        response = "HTTP/1.1 200 OK\r\n"
-                        response += "Access-Control-Allow-Origin: *\r\n"
-                        response += "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
-                        response += "Access-Control-Allow-Headers: *\r\n\r\n"
-                        client_socket.send(response.encode())
-                    else:
-                        # 其他HTTP请求
-                        print("处理其他HTTP请求")
-                        response = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
-                        response += "<h1>ESP32 Focus Timer</h1><p>WebSocket服务运行中</p>"
-                        client_socket.send(response.encode())
-                except Exception as e:
-                    print("HTTP请求处理错误:", e)
-                    client_socket.send(b"HTTP/1.1 500 Internal Server Error\r\nContent-Type: text/plain\r\n\r\nServer Error")
-                
-            client_socket.close()
-            
+            await send_websocket_frame(client.writer, wsframe.OP_PING, b"")
+            if client.wants(events.HEARTBEAT):
+                await send_event(client, events.HEARTBEAT)
         except Exception as e:
-            print("服务器错误:", e)
-            time.sleep(1)
+            log.warning("发送心跳失败: {}", e)
+            client.dropped = "发送心跳失败"
+            client.task.cancel()
+            return
 
-# 发送WebSocket消息
-def send_websocket_message(socket, message):
-    try:
-        # 检查message是否已经是字符串
-        if isinstance(message, str):
-            data = message
+# 处理缓冲区中所有完整的帧；返回False表示应关闭连接
+async def process_frames(decoder, client):
+    writer = client.writer
+    while True:
+        opcode = decoder.next()
+        if opcode is None:
+            return True
+        client.seen()
+        if opcode == wsframe.OP_CLOSE:
+            log.info("🔌 收到关闭帧，关闭连接")
+            await send_websocket_frame(writer, wsframe.OP_CLOSE, decoder.payload)
+            return False
+        if opcode == wsframe.OP_PING:
+            await send_websocket_frame(writer, wsframe.OP_PONG, decoder.payload)
+            continue
+        if opcode == wsframe.OP_PONG:
+            continue
+        if opcode == wsframe.OP_BINARY:
+            await handle_binary_message(decoder.payload, client)
         else:
-            data = json.dumps(message)
-        data_bytes = data.encode()
+            await handle_websocket_message(decoder.payload, client)
+
+# 处理一条完整的WebSocket消息
+async def handle_websocket_message(payload, client):
+    writer = client.writer
+    try:
+        decoded_str = bytes(payload).decode()
+        if LOG_DEBUG:
+            log.debug("   解密后数据: {}", decoded_str)
+        
+        message = json.loads(decoded_str)
+        if LOG_DEBUG:
+            log.debug("📩 解析后的WebSocket消息: {}", message)
         
-        # 简单的WebSocket帧
-        frame = bytearray()
-        frame.append(0x81)  # FIN + 文本帧
-        if len(data_bytes) < 126:
-            frame.append(len(data_bytes))
+        # 订阅只影响本连接，其余消息交给状态机
+        if message.get("type") == "subscribe":
+            metrics.message("subscribe")
+            client.events = events.mask(message.get("events", ()))
+            log.info("📬 订阅事件: {:#x}", client.events)
         else:
-            frame.append(126)
-            frame.append((len(data_bytes) >> 8) & 255)
-            frame.append(len(data_bytes) & 255)
+            handle_message(message)
+        
+        # 发送确认
+        response = ACKS.get(message.get("type"))
+        if response is None:
+            response = json.dumps({"status": "received", "type": message.get("type")})
+        if LOG_DEBUG:
+            log.debug("📤 发送确认消息: {}", response)
+        await send_websocket_message(client, response)
         
-        frame.extend(data_bytes)
-        socket.send(frame)
-        print("发送WebSocket消息:", message)
+        if title_missing(message.get("type")):
+            await request_title(client)
+        
+        # 状态变化广播给所有客户端
+        if message.get("type") in STATE_EVENTS:
+            await broadcast_state()
+    except Exception as e:
+        metrics.parse_errors += 1
+        log.error("❌ 解析消息失败: {} 原始数据: {}", e, bytes(payload))
+        # 发送错误确认
+        await send_websocket_message(client, PARSE_ERROR_ACK)
+
+# 处理一条二进制消息：解码到复用的dict后与JSON消息走同一个handle_message()
+async def handle_binary_message(payload, client):
+    writer = client.writer
+    try:
+        message = binproto.decode(payload, bin_message)
+    except ValueError as e:
+        metrics.parse_errors += 1
+        log.error("❌ 解析二进制消息失败: {}", e)
+        await send_websocket_frame(writer, wsframe.OP_BINARY, binproto.encode_error(bin_ack))
+        return
+    if message["type"] == "subscribe":
+        metrics.message("subscribe")
+        client.events = events.mask(message["events"])
+    else:
+        handle_message(message)
+    await send_websocket_frame(writer, wsframe.OP_BINARY, binproto.encode_ack(bin_ack, message["type"]))
+    if title_missing(message["type"]):
+        await request_title(client)
+    if message["type"] in STATE_EVENTS:
+        await broadcast_state()
+
+# 开始/继续计时后，当前任务的标题不在缓存中时请求发送命令的浏览器推送标题；
+# 浏览器不需要推算设备缓存的内容，多个浏览器、缓存淘汰或设备重启后都能补上
+TITLE_EVENTS = ("start", "resume")
+bin_title_request = bytearray(binproto.TITLE_REQUEST_SIZE)
+
+def title_missing(msg_type):
+    return (msg_type in TITLE_EVENTS and focus.task and focus.active()
+            and task_titles is not None and not task_titles.has(focus.task))
+
+async def request_title(client):
+    log.debug("🏷️ 请求任务标题: {:08x}", focus.task)
+    if client.binary:
+        await send_websocket_frame(client.writer, wsframe.OP_BINARY,
+                                   binproto.encode_title_request(bin_title_request, focus.task))
+    else:
+        await send_websocket_message(client, json.dumps({"type": "task_title_request", "taskHash": focus.task}))
+
+# 不经过会话状态机的消息类型
+LOCAL_MESSAGES = ("status", "subscribe", "task_title")
+
+# JSON确认消息按类型预先编码，处理每条消息时不再调用json.dumps
+ACKS = {}
+for _type in tuple(session.EVENTS) + LOCAL_MESSAGES:
+    ACKS[_type] = json.dumps({"status": "received", "type": _type}).encode()
+PARSE_ERROR_ACK = json.dumps({"status": "error", "type": "parse_error"}).encode()
+
+# 静态响应在导入时编码好，每次请求直接写出
+PING_RESPONSE = httpd.response(200, '{"status": "online", "message": "ESP32在线"}', b"application/json")
+LED_RESPONSE = httpd.response(200, '{"status": "ok", "message": "LED命令已接收"}', b"application/json")
+PREFLIGHT_RESPONSE = httpd.response(204)
+INDEX_RESPONSE = httpd.response(200, "<h1>ESP32 Focus Timer</h1><p>WebSocket服务运行中</p>", b"text/html; charset=utf-8", b"")
+LOGS_HEADER = httpd.stream_header(200, b"text/plain; charset=utf-8")
+
+# 返回内存中最近的日志，代替串口输出；逐行发送后关闭连接
+async def http_logs(request, writer):
+    writer.write(LOGS_HEADER)
+    for line in log.lines():
+        writer.write(line.encode())
+        writer.write(b"\n")
+        await writer.drain()
+    return False
+
+# 导出会话日志：GET /journal?since=序号，返回序号大于since的所有记录（每条24字节，格式见journal.py），
+# 按块从Flash读取并发送，同步程序把收到的最后一条序号作为下一次的since
+JOURNAL_HEADER = httpd.stream_header(200, b"application/octet-stream")
+
+async def http_journal(request, writer):
+    since = httpd.param(request.query, b"since")
+    try:
+        since = int(since) if since else 0
+    except ValueError:
+        raise httpd.HttpError(400)
+    writer.write(JOURNAL_HEADER)
+    records = journal.chunks(since)
+    try:
+        for chunk in records:
+            writer.write(chunk)
+            await writer.drain()
+    finally:
+        records.close()
+    return False
+
+# 在线更新：PUT /update?path=相对路径&sha256=十六进制摘要，请求头X-Update-Token携带密钥，
+# 请求体是文件内容（需要Content-Length）；按ota.CHUNK大小边收边写，返回字节数、耗时和吞吐量
+async def http_update(request, reader, writer):
+    if not ota.authorized(request.headers.get(b"x-update-token")):
+        raise httpd.HttpError(401)
+    path = httpd.param(request.query, b"path")
+    digest = httpd.param(request.query, b"sha256")
+    length = request.headers.get(b"content-length")
+    if path is None or digest is None or not length:
+        raise httpd.HttpError(400)
+    try:
+        length = int(length)
+    except ValueError:
+        raise httpd.HttpError(400)
+    path = path.decode()
+    mv = memoryview(ota.buffer)
+    # 开始失败（包括另一个更新正在进行）时不能调用abort，否则会中断别人的更新
+    try:
+        ota.begin(path, length, digest)
+    except ota.OtaError as e:
+        return update_failed(writer, path, e)
+    try:
+        remaining = length
+        while remaining > 0:
+            n = await asyncio.wait_for(read_into(reader, mv[:min(remaining, ota.CHUNK)]), UPDATE_READ_TIMEOUT_S)
+            if not n:
+                raise ota.OtaError(400, "连接在传输中断开")
+            ota.write(mv[:n])
+            remaining -= n
+        size, ms = ota.finish()
+    except ota.OtaError as e:
+        ota.abort()
+        return update_failed(writer, path, e)
+    except BaseException:
+        ota.abort()
+        raise
+    rate = size * 1000 // max(ms, 1)
+    log.info("📦 已更新{}: {}字节，{}ms，{}字节/秒", path, size, ms, rate)
+    writer.write(httpd.response(200, json.dumps({"status": "ok", "path": path, "bytes": size, "ms": ms,
+                                                 "bytesPerSecond": rate}), b"application/json"))
+    return True
+
+# 更新失败的回复；请求体可能没有读完，回复后关闭连接
+def update_failed(writer, path, e):
+    log.warning("⚠️ 更新{}失败: {}", path, e.reason)
+    writer.write(httpd.response(e.status, json.dumps({"status": "error", "path": path, "message": e.reason}),
+                                b"application/json"))
+    return False
+
+REBOOT_RESPONSE = httpd.response(200, '{"status": "ok", "message": "即将重启"}', b"application/json")
+
+# 更新完成后重启：POST /reboot，同样需要密钥；回复后写入会话日志再重启
+async def http_reboot(request, writer):
+    if not ota.authorized(request.headers.get(b"x-update-token")):
+        raise httpd.HttpError(401)
+    writer.write(REBOOT_RESPONSE)
+    asyncio.create_task(reboot_later())
+    return False
+
+async def reboot_later():
+    await asyncio.sleep(REBOOT_DELAY_S)
+    flush_journal()
+    log.info("🔄 在线更新后重启")
+    import machine
+    machine.reset()
+
+# 启动各阶段的耗时（微秒，从main.py开始导入算起）和第一个连接被接受的时间
+async def http_boot(request, writer):
+    writer.write(httpd.response(200, json.dumps(bootprof.report()), b"application/json"))
+    return True
+
+METRICS_HEADER = httpd.stream_header(200, b"text/plain; version=0.0.4; charset=utf-8")
+
+# 运行指标（Prometheus文本格式），逐行发送后关闭连接；指标说明见metrics.py
+async def http_metrics(request, writer):
+    gauges = (
+        ("ws_clients", len(ws_clients)),
+        ("session_running", focus.running()),
+        ("session_active", focus.active()),
+        ("frames_requested_total", frames_requested),
+        ("frames_rendered_total", frames_rendered),
+        ("i2c_bytes_total", oled.bytes_sent if OLED_INITIALIZED else 0),
+        ("widget_draws_total", timer_screen.widget_draws),
+        ("static_screen_misses_total", static_screens.misses if static_screens else 0),
+    )
+    sections = (("power", power.stats()), ("journal", journal.stats()), ("ota", ota.stats()),
+                ("titles", task_titles.stats() if task_titles else {}))
+    writer.write(METRICS_HEADER)
+    for line in metrics.lines(gauges, sections, bootprof.phases):
+        writer.write(line.encode())
+        writer.write(b"\n")
+        await writer.drain()
+    return False
+
+# LED控制请求：在OLED上显示LED状态（这里可以添加实际的LED控制代码）
+def led_handler(led_status):
+    led_lines = (("LED控制", 0, 0), ("状态: " + led_status, 0, 20), ("来自前端", 0, 40))
+    async def handler(request, writer):
+        log.debug("LED: {}", led_status)
+        user_activity()
+        request_frame(led_lines)
+        writer.write(LED_RESPONSE)
+        return True
+    return handler
+
+# 路由表：(方法, 路径) -> 静态响应bytes或处理函数；处理函数返回是否保持连接
+ROUTES = {
+    (b"GET", b"/"): INDEX_RESPONSE,
+    (b"GET", b"/ping"): PING_RESPONSE,
+    (b"GET", b"/logs"): http_logs,
+    (b"GET", b"/journal"): http_journal,
+    (b"GET", b"/boot"): http_boot,
+    (b"GET", b"/metrics"): http_metrics,
+    (b"POST", b"/reboot"): http_reboot,
+    (b"GET", b"/led/green"): led_handler("绿色"),
+    (b"GET", b"/led/yellow"): led_handler("黄色"),
+    (b"GET", b"/led/off"): led_handler("关闭"),
+    (b"GET", b"/led/rainbow"): led_handler("彩虹模式"),
+}
+
+# 自己读取请求体的路由：(方法, 路径) -> 处理函数(request, reader, writer)
+UPLOADS = {
+    (b"PUT", b"/update"): http_update,
+}
+
+# 处理一个普通HTTP请求，返回是否可以在同一连接上继续处理下一个请求
+async def handle_http(request, reader, writer):
+    metrics.http_requests += 1
+    upload = UPLOADS.get((request.method, request.path))
+    if upload is None and b"content-length" in request.headers:
+        await httpd.discard_body(reader, request)
+    keep_alive = request.keep_alive()
+    if request.method == b"OPTIONS":
+        # CORS预检请求，任意路径
+        route = PREFLIGHT_RESPONSE
+    else:
+        route = ROUTES.get((request.method, request.path))
+    try:
+        if upload is not None:
+            if not await upload(request, reader, writer):
+                keep_alive = False
+        elif route is None:
+            metrics.http_errors += 1
+            writer.write(httpd.error_response(404))
+        elif isinstance(route, bytes):
+            writer.write(route)
+        elif not await route(request, writer):
+            keep_alive = False
+    except httpd.HttpError:
+        # 由handle_client返回对应的状态码并关闭连接
+        raise
+    except Exception as e:
+        metrics.http_errors += 1
+        log.error("HTTP请求处理错误: {}", e)
+        writer.write(httpd.error_response(500))
+        keep_alive = False
+    await writer.drain()
+    return keep_alive
+
+# 向一个客户端发送事件：JSON客户端收到带type的状态对象，二进制客户端收到对应操作码的状态帧
+async def send_event(client, event):
+    if client.binary:
+        binproto.encode_state(bin_state, focus.state, focus.remaining, focus.total, focus.is_break,
+                              binproto.EVENT_OPCODES[event])
+        try:
+            await send_websocket_frame(client.writer, wsframe.OP_BINARY, bin_state)
+        except Exception as e:
+            log.error("发送WebSocket消息错误: {}", e)
+            if client in ws_clients:
+                ws_clients.remove(client)
+    else:
+        await send_websocket_message(client, json.dumps({
+            "type": event,
+            "state": focus.state,
+            "remainingSeconds": focus.remaining,
+            "totalSeconds": focus.total,
+            "isBreak": focus.is_break
+        }))
+
+# 把事件推送给所有订阅了它的客户端
+async def push_event(event):
+    for client in list(ws_clients):
+        if client.wants(event):
+            await send_event(client, event)
+
+# 向所有WebSocket客户端广播当前计时状态；进入完成状态时额外推送completed/break_completed
+async def broadcast_state():
+    global last_broadcast_state
+    last_broadcast_state = focus.state
+    await push_event(events.STATE_CHANGED)
+    if focus.state == session.COMPLETED:
+        await push_event(events.COMPLETED)
+    elif focus.state == session.BREAK_COMPLETED:
+        await push_event(events.BREAK_COMPLETED)
+
+# 用户操作：点亮屏幕，并唤醒后台任务重新计算下一次检查时间（只在asyncio任务中调用）
+power_event = asyncio.Event()
+
+def user_activity():
+    power.touch()
+    power_event.set()
+
+# 连接到热点的设备数；无法获取时按有设备处理，不进入浅睡眠
+def ap_stations():
+    try:
+        return len(ap.status('stations'))
+    except Exception:
+        return 1
+
+# 没有设备连接且没有倒计时时打开WiFi省电模式（不支持的固件忽略）
+wlan_power_save = False
+
+def set_wlan_power_save(enabled):
+    global wlan_power_save
+    if enabled == wlan_power_save or ap is None:
+        return
+    wlan_power_save = enabled
+    try:
+        ap.config(pm=network.WLAN.PM_POWERSAVE if enabled else network.WLAN.PM_PERFORMANCE)
+        log.debug("📶 WiFi省电模式: {}", enabled)
+    except Exception:
+        pass
+
+# 执行一次空闲省电检查，返回距下一次检查的毫秒数：
+# 倒计时进行中等到结束，完成画面期间等它结束，其余按屏幕调暗/关闭的时间
+def power_step():
+    stations = ap_stations()
+    running = focus.running()
+    set_wlan_power_save(stations == 0 and not running)
+    delay = power.step(running, focus.remaining_ms() + TICK_MS if running else 0, stations)
+    if focus.state == session.COMPLETED or focus.state == session.BREAK_COMPLETED:
+        delay = min(delay, TICK_MS)
+    due = journal.flush_in_ms()
+    if due is not None:
+        delay = min(delay, due)
+    return delay
+
+# 后台任务：定时器回调里不能发送网络数据，这里把定时器触发的完成/重置广播出去，并执行空闲省电策略。
+# 按power_step()给出的时间休眠，有用户操作时提前唤醒，而不是固定周期轮询
+async def state_monitor():
+    while True:
+        if focus.state != last_broadcast_state and ws_clients:
+            await broadcast_state()
+        if journal.flush_in_ms() == 0:
+            flush_journal()
+        metrics.sample()
+        delay = power_step()
+        power_event.clear()
+        if delay <= 0:
+            await asyncio.sleep(0)
+            continue
+        try:
+            await asyncio.wait_for(power_event.wait(), delay / 1000)
+        except asyncio.TimeoutError:
+            pass
+
+# WebSocket服务器：先开始监听并启动热点，其余初始化放在之后，各阶段之间让出事件循环，
+# 已经到达的连接可以先被处理；各阶段耗时记录在bootprof中，GET /boot 查看
+async def serve():
+    # 每个连接由独立任务处理，HTTP和WebSocket请求可以同时进行
+    server = await asyncio.start_server(handle_client, SERVER_HOST, SERVER_PORT, backlog=SERVER_BACKLOG)
+    bootprof.mark("listen")
+    start_access_point()
+    bootprof.mark("ap")
+    log.info("WebSocket服务器已启动，等待连接...")
+    await asyncio.sleep(0)
+    
+    try:
+        log.info("📒 会话日志: {}段，下一条序号{}", journal.open_journal(), journal.next_seq)
+    except Exception as e:
+        log.error("❌ 会话日志打开失败: {}", e)
+    if ota.load_key():
+        log.info("📦 在线更新已启用")
+    bootprof.mark("journal")
+    await asyncio.sleep(0)
+    
+    if init_display():
+        request_frame()
+        asyncio.create_task(render_task())
+    bootprof.mark("display")
+    
+    asyncio.create_task(state_monitor())
+    log.info("⏱️ 启动完成: {}ms", bootprof.phases[-1][1] // 1000)
+    while True:
+        await asyncio.sleep(3600)
+
+def start_websocket_server():
+    asyncio.run(serve())
+
+# 发送一个WebSocket帧
+async def send_websocket_frame(writer, opcode, payload):
+    writer.write(ws_out.frame(opcode, payload))
+    await writer.drain()
+
+# 发送WebSocket消息
+async def send_websocket_message(client, message):
+    writer = client.writer
+    try:
+        # 预先编码的bytes直接发送，字符串编码后发送，其余按JSON序列化
+        if isinstance(message, bytes):
+            data = message
+        elif isinstance(message, str):
+            data = message.encode()
+        else:
+            data = json.dumps(message).encode()
+        await send_websocket_frame(writer, wsframe.OP_TEXT, data)
+        if LOG_DEBUG:
+            log.debug("发送WebSocket消息: {}", message)
     except Exception as e:
-        print("发送WebSocket消息错误:", e)
+        log.error("发送WebSocket消息错误: {}", e)
+        if client in ws_clients:
+            ws_clients.remove(client)
 
-# 处理收到的消息
+# 处理收到的消息：按类型计数并统计耗时和分配的内存
 def handle_message(message):
-    global remaining_seconds, current_state, is_paused, focus_duration, is_break
-    print("📩 收到消息:", message)
+    msg_type = message.get("type") if isinstance(message, dict) else None
+    metrics.message(msg_type if msg_type in session.EVENTS or msg_type in LOCAL_MESSAGES else "unknown")
+    metrics.handling.begin()
+    try:
+        apply_message(message)
+    finally:
+        metrics.handling.end()
+
+# 状态查询直接显示，其余交给会话状态机，转换成功后刷新屏幕
+def apply_message(message):
+    if LOG_DEBUG:
+        log.debug("📩 收到消息: {}", message)
     
     # 确保message是一个字典
     if not isinstance(message, dict):
-        print("❌ 消息不是字典类型:", type(message))
+        log.warning("❌ 消息不是字典类型: {}", type(message))
         return
         
     msg_type = message.get("type")
-    print(f"🔍 解析消息类型: {msg_type}")
+    if msg_type == "status":
+        user_activity()
+        show_status()
+        return
+    if msg_type == "task_title":
+        store_task_title(message)
+        return
     
-    if msg_type == "start":
-        # 优先使用前端发送的totalSeconds，确保与前端同步
-        total_seconds = message.get("totalSeconds", 25 * 60)  # 默认25分钟
-        duration = message.get("duration", total_seconds // 60)
-        
-        print(f"⏰ 开始专注命令: {duration}分钟 (总秒数: {total_seconds})")
-        
-        # 确保total_seconds是数字
-        if isinstance(total_seconds, (int, float)):
-            duration_minutes = total_seconds / 60  # 转换为分钟，因为start_focus函数接受分钟数
-            start_focus(duration_minutes)
+    previous = focus.state
+    if msg_type in STATE_EVENTS and "timestamp" in message:
+        journal.set_clock(message["timestamp"])
+    if dispatch(msg_type, message):
+        if LOG_DEBUG:
+            log.debug("📋 {}: {} -> {}, 总时长={}秒, 剩余时间={}秒", msg_type, previous, focus.state, focus.total, focus.remaining)
+        if msg_type in STATE_EVENTS:
+            log.info("{}: {} -> {}", msg_type, previous, focus.state)
+            user_activity()
+            show_state()
         else:
-            try:
-                total_seconds_num = float(total_seconds)
-                duration_minutes = total_seconds_num / 60
-                start_focus(duration_minutes)
-            except ValueError:
-                print(f"❌ 无法将totalSeconds转换为数字: {total_seconds}")
-            except Exception as e:
-                print(f"❌ 调用start_focus时出错: {e}")
-        
-        print(f"📋 专注开始后状态: 当前状态={current_state}, 总时长={focus_duration}秒, 剩余时间={remaining_seconds}秒")
-        
-    elif msg_type == "pause":
-        print("⏸️  暂停专注命令")
-        pause_focus()
-        print("✅ 调用pause_focus函数成功")
-        
-    elif msg_type == "resume":
-        print("▶️  继续专注命令")
-        resume_focus()
-        print("✅ 调用resume_focus函数成功")
-        
-    elif msg_type == "stop":
-        print("⏹️  停止专注命令")
-        stop_focus()
-        print("✅ 调用stop_focus函数成功")
-        
-    elif msg_type == "progress":
-        remaining = message.get("remainingSeconds", 0)
-        progress_pct = message.get("progressPercent", 0)
-        print(f"📊 收到专注进度更新 - 剩余: {remaining}秒, 进度: {progress_pct}%")
-        if remaining > 0:
-            remaining_seconds = remaining
-            # 如果收到进度更新，确保状态是running且未暂停
-            current_state = "running"
-            is_paused = False
-            is_break = False
-            display_timer()
-            print(f"   已更新专注剩余时间为: {remaining_seconds}秒")
-            print(f"   当前状态: {current_state}, 暂停状态: {is_paused}, 休息模式: {is_break}")
-            
-    elif msg_type == "complete":
-        print("🎉 完成专注命令")
-        complete_focus()
-        print("✅ 调用complete_focus函数成功")
-        
-    # 休息相关命令处理
-    elif msg_type == "break_start":
-        # 开始休息
-        break_total_seconds = message.get("totalSeconds", 5 * 60)  # 默认5分钟
-        break_duration = message.get("duration", break_total_seconds // 60)
-        
-        print(f"⏰ 开始休息命令: {break_duration}分钟 (总秒数: {break_total_seconds})")
-        
-        # 确保total_seconds是数字
-        if isinstance(break_total_seconds, (int, float)):
-            global focus_duration, remaining_seconds, current_state, is_paused, is_break
-            focus_duration = int(break_total_seconds)
-            remaining_seconds = focus_duration
-            current_state = "break_running"
-            is_paused = False
-            is_break = True
-            
-            display_timer()
-            print(f"📋 休息开始后状态: 当前状态={current_state}, 总时长={focus_duration}秒, 剩余时间={remaining_seconds}秒")
-        else:
-            try:
-                break_total_seconds_num = float(break_total_seconds)
-                focus_duration = int(break_total_seconds_num)
-                remaining_seconds = focus_duration
-                current_state = "break_running"
-                is_paused = False
-                is_break = True
-                
-                display_timer()
-                print(f"📋 休息开始后状态: 当前状态={current_state}, 总时长={focus_duration}秒, 剩余时间={remaining_seconds}秒")
-            except ValueError:
-                print(f"❌ 无法将break_totalSeconds转换为数字: {break_total_seconds}")
-            except Exception as e:
-                print(f"❌ 处理break_start命令时出错: {e}")
-                
-    elif msg_type == "break_progress":
-        # 休息进度更新
-        remaining = message.get("remainingSeconds", 0)
-        progress_pct = message.get("progressPercent", 0)
-        print(f"📊 收到休息进度更新 - 剩余: {remaining}秒, 进度: {progress_pct}%")
-        if remaining > 0:
-            remaining_seconds = remaining
-            # 如果收到进度更新，确保状态是break_running且未暂停
-            current_state = "break_running"
-            is_paused = False
-            is_break = True
-            display_timer()
-            print(f"   已更新休息剩余时间为: {remaining_seconds}秒")
-            print(f"   当前状态: {current_state}, 暂停状态: {is_paused}, 休息模式: {is_break}")
-            
-    elif msg_type == "break_pause":
-        # 暂停休息
-        print("⏸️  暂停休息命令")
-        global pause_remaining
-        if current_state == "break_running":
-            is_paused = True
-            current_state = "break_paused"
-            pause_remaining = remaining_seconds
-            display_timer()
-            print(f"✅ 已暂停休息，剩余: {pause_remaining}秒")
-            
-    elif msg_type == "break_resume":
-        # 继续休息
-        print("▶️  继续休息命令")
-        if current_state == "break_paused":
-            is_paused = False
-            current_state = "break_running"
-            display_timer()
-            print("✅ 已继续休息")
-            
-    elif msg_type == "break_complete":
-        # 完成休息
-        print("🎉 完成休息命令")
-        complete_break()
-        print("✅ 调用complete_break函数成功")
-        
-    elif msg_type == "status":
-        # 状态查询
-        print("📡 收到状态查询消息")
-        if OLED_INITIALIZED:
-            try:
-                oled.fill(0)
-                oled.text("设备在线", 20, 20)
-                oled.text("等待指令", 5, 35)
-                oled.show()
-                print("✅ 更新OLED状态显示")
-            except Exception as e:
-                print("❌ 状态查询显示失败:", e)
+            refresh_timer()
+    elif msg_type in session.EVENTS:
+        log.info("⛔ 忽略当前状态下无效的命令: {} (状态: {})", msg_type, previous)
     else:
-        print(f"❓ 未知消息类型: {msg_type}")
+        log.warning("❓ 未知消息类型: {}", msg_type)
+
+# 保存浏览器推送的任务标题：二进制消息带taskHash和位图，JSON消息带taskId和base64编码的位图，
+# 没有位图时用设备上的字体绘制title文字
+def store_task_title(message):
+    global title_task
+    if task_titles is None:
+        log.debug("没有OLED，忽略任务标题")
+        return
+    if "taskHash" in message:
+        key = message["taskHash"]
+    else:
+        key = binproto.task_hash(message.get("taskId", ""))
+    bitmap = message.get("bitmap")
+    if bitmap is None:
+        task_titles.put_text(key, message.get("title", ""), font)
+    else:
+        if isinstance(bitmap, str):
+            import ubinascii
+            bitmap = ubinascii.a2b_base64(bitmap)
+        task_titles.put_bitmap(key, bitmap)
+    log.debug("🏷️ 已缓存任务标题: {:08x}", key)
+    # 可能是当前任务的新标题，也可能淘汰了正在显示的标题所在的槽，下次绘制时重新查找
+    title_task = None
+    task_title.invalidate()
+    if focus.active():
+        request_frame()
+
+# 状态查询
+def show_status():
+    log.debug("📡 收到状态查询消息")
+    request_frame(ONLINE_LINES)
 
 # 主程序
-if __name__ == "__main__":
+def main():
     try:
         start_websocket_server()
     except KeyboardInterrupt:
-        print("程序结束")
+        log.info("程序结束")
     except Exception as e:
-        print("错误:", e)
+        log.error("错误: {}", e)
         # 重启
         time.sleep(5)
         import machine
-        machine.reset()
\ No newline at end of file
+        machine.reset()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# 运行指标：消息处理、绘制和定时器回调这些热路径上只做整数计数和计时，不分配内存；
+# GET /metrics 以纯文本（Prometheus文本格式）返回这些计数、各模块的统计、堆内存和运行时间，
+# 由网关或 tools/scrape_metrics.py 定期拉取，找出卡顿或内存碎片化的设备
+import gc
+import time
+
+# 按类型统计的消息数；调用方只传入已知的类型（未知类型记为unknown），字典的大小有上限
+messages = {}
+
+# 错误和连接计数
+parse_errors = 0
+frame_errors = 0
+http_requests = 0
+http_errors = 0
+ws_connects = 0
+ws_disconnects = 0
+ws_reconnects = 0
+heartbeat_timeouts = 0
+# 异常断开（心跳超时、出错、没有关闭帧）后还没有新连接补上的次数
+_ws_lost = 0
+
+
+# 一段代码的耗时（ticks_us）和期间新分配的堆内存；begin()和end()之间不能重入。
+# 期间发生垃圾回收时已分配字节数会减少，这时只计入gcs，不计分配量
+class Timing:
+    def __init__(self):
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.alloc_bytes = 0
+        self.gcs = 0
+        self._t0 = 0
+        self._a0 = 0
+
+    def begin(self):
+        self._a0 = gc.mem_alloc()
+        self._t0 = time.ticks_us()
+
+    def end(self):
+        us = time.ticks_diff(time.ticks_us(), self._t0)
+        delta = gc.mem_alloc() - self._a0
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+        if delta >= 0:
+            self.alloc_bytes += delta
+        else:
+            self.gcs += 1
+
+
+handling = Timing()
+rendering = Timing()
+
+# 定时器回调相对于设定的时刻晚到的时间
+late_count = 0
+late_total_us = 0
+late_max_us = 0
+_last_tick_us = None
+
+# 运行时间：ticks_ms每约12天回绕一次，每次读取时把经过的时间累加起来（后台任务至少每10分钟读取一次）
+_uptime_ms = 0
+_uptime_last = time.ticks_ms()
+# 采样到的最小空闲堆内存
+heap_free_min = None
+
+
+def message(msg_type):
+    messages[msg_type] = messages.get(msg_type, 0) + 1
+
+
+# WebSocket连接建立：前面有异常断开的连接时算作一次重连
+def ws_connected():
+    global ws_connects, ws_reconnects, _ws_lost
+    ws_connects += 1
+    if _ws_lost:
+        _ws_lost -= 1
+        ws_reconnects += 1
+
+
+# WebSocket连接断开；clean表示收到了关闭帧，浏览器主动关闭的连接之后再连上不算重连
+def ws_disconnected(clean):
+    global ws_disconnects, _ws_lost
+    ws_disconnects += 1
+    if not clean:
+        _ws_lost += 1
+
+
+# 设定定时器时调用，回调的晚到时间从这里算起
+def timer_started():
+    global _last_tick_us
+    _last_tick_us = time.ticks_us()
+
+
+# 每次定时器回调开始时调用；period_ms为设定的等待时间
+def timer_tick(period_ms):
+    global _last_tick_us, late_count, late_total_us, late_max_us
+    now = time.ticks_us()
+    if _last_tick_us is not None:
+        late = time.ticks_diff(now, _last_tick_us) - period_ms * 1000
+        if late > 0:
+            late_count += 1
+            late_total_us += late
+            if late > late_max_us:
+                late_max_us = late
+    _last_tick_us = now
+
+
+def uptime_ms():
+    global _uptime_ms, _uptime_last
+    now = time.ticks_ms()
+    _uptime_ms += time.ticks_diff(now, _uptime_last)
+    _uptime_last = now
+    return _uptime_ms
+
+
+# 后台任务定期调用：更新运行时间并记录空闲堆内存的最低值
+def sample():
+    global heap_free_min
+    uptime_ms()
+    free = gc.mem_free()
+    if heap_free_min is None or free < heap_free_min:
+        heap_free_min = free
+
+
+# camelCase的统计字段转换为指标名使用的snake_case
+def _snake(name):
+    out = ""
+    for ch in name:
+        if "A" <= ch <= "Z":
+            out += "_" + ch.lower()
+        else:
+            out += ch
+    return out
+
+
+def _line(name, value, labels=""):
+    if value is True or value is False:
+        value = int(value)
+    return "lifeflow_{}{} {}".format(name, labels, value)
+
+
+def _timing(name, timing):
+    yield _line(name + "_count", timing.count)
+    yield _line(name + "_us_total", timing.total_us)
+    yield _line(name + "_us_max", timing.max_us)
+    yield _line(name + "_us_avg", timing.total_us // timing.count if timing.count else 0)
+    yield _line(name + "_alloc_bytes_total", timing.alloc_bytes)
+    yield _line(name + "_gc_total", timing.gcs)
+
+
+# 逐行生成指标文本；gauges是调用方提供的(名称, 值)，sections是(前缀, stats()字典)，
+# phases是启动各阶段的(名称, 微秒)
+def lines(gauges=(), sections=(), phases=()):
+    sample()
+    yield _line("uptime_seconds", _uptime_ms // 1000)
+    yield _line("heap_free_bytes", gc.mem_free())
+    yield _line("heap_alloc_bytes", gc.mem_alloc())
+    yield _line("heap_free_min_bytes", heap_free_min)
+    for msg_type in sorted(messages):
+        yield _line("messages_total", messages[msg_type], '{{type="{}"}}'.format(msg_type))
+    yield _line("parse_errors_total", parse_errors)
+    yield _line("frame_errors_total", frame_errors)
+    yield _line("http_requests_total", http_requests)
+    yield _line("http_errors_total", http_errors)
+    yield _line("ws_connects_total", ws_connects)
+    yield _line("ws_disconnects_total", ws_disconnects)
+    yield _line("ws_reconnects_total", ws_reconnects)
+    yield _line("heartbeat_timeouts_total", heartbeat_timeouts)
+    yield from _timing("handle_message", handling)
+    yield from _timing("render", rendering)
+    yield _line("timer_late_count", late_count)
+    yield _line("timer_late_us_total", late_total_us)
+    yield _line("timer_late_us_max", late_max_us)
+    for name, value in gauges:
+        yield _line(name, value)
+    for prefix, stats in sections:
+        for key in sorted(stats):
+            yield _line(prefix + "_" + _snake(key), stats[key])
+    for name, us in phases:
+        yield _line("boot_phase_us", us, '{{phase="{}"}}'.format(name))
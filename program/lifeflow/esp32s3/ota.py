@@ -0,0 +1,180 @@
+# 在线更新：上传的文件按固定大小的缓冲区边收边写入临时文件（目标文件名加.new），同时计算SHA-256，
+# 全部收到且摘要与上传方给出的一致后用rename替换目标文件；任何一步失败都删除临时文件，原文件不受影响。
+# 更新需要密钥：第一次通过USB把密钥写入设备上的ota.key，之后每次更新在请求头中携带同样的密钥；
+# 没有密钥文件时拒绝所有更新。同一时间只处理一个文件。
+import os
+import time
+
+# 更新文件的根目录（板子上是文件系统根目录，仿真器中指向单独的目录，避免覆盖源码）
+ROOT = ""
+KEY_PATH = "ota.key"
+CHUNK = 1024
+MAX_FILE = 512 * 1024
+# 允许更新的文件类型
+SUFFIXES = (".py", ".mpy", ".bin", ".json")
+TMP_SUFFIX = ".new"
+
+# 接收请求体用的缓冲区，所有更新共用
+buffer = bytearray(CHUNK)
+
+KEY = None
+_file = None
+_hash = None
+_path = None
+_tmp = None
+_expected = None
+_size = 0
+_started = 0
+
+# 统计计数
+updates = 0
+failures = 0
+bytes_written = 0
+
+
+class OtaError(Exception):
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+def _join(path):
+    return ROOT + "/" + path if ROOT else path
+
+
+# 读取设备上的密钥文件，返回是否启用在线更新
+def load_key():
+    global KEY
+    try:
+        with open(_join(KEY_PATH), "rb") as f:
+            KEY = f.read().strip() or None
+    except OSError:
+        KEY = None
+    return KEY is not None
+
+
+# 比较请求携带的密钥；逐字节比较完整个密钥，耗时与哪一位不同无关
+def authorized(token):
+    if KEY is None or token is None or len(token) != len(KEY):
+        return False
+    diff = 0
+    for i in range(len(KEY)):
+        diff |= token[i] ^ KEY[i]
+    return diff == 0
+
+
+# 检查上传的相对路径：不允许绝对路径、上级目录和列表以外的文件类型
+def valid_path(path):
+    if not path or path[0] == "/" or "\\" in path:
+        return False
+    if ".." in path.split("/"):
+        return False
+    for suffix in SUFFIXES:
+        if path.endswith(suffix):
+            return True
+    return False
+
+
+def free_bytes():
+    st = os.statvfs(ROOT or "/")
+    return st[0] * st[3]
+
+
+def _make_dirs(path):
+    parts = path.split("/")
+    for i in range(1, len(parts)):
+        try:
+            os.mkdir("/".join(parts[:i]))
+        except OSError:
+            pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def busy():
+    return _file is not None
+
+
+# 开始接收一个文件：path为相对路径，size为字节数，digest为十六进制SHA-256
+def begin(path, size, digest):
+    global _file, _hash, _path, _tmp, _expected, _size, _started
+    if _file is not None:
+        raise OtaError(409, "已有更新正在进行")
+    if not valid_path(path):
+        raise OtaError(400, "不允许更新的路径")
+    # 只在更新时用到，不在启动时导入
+    import hashlib
+    import ubinascii
+    try:
+        expected = ubinascii.unhexlify(digest)
+    except ValueError:
+        raise OtaError(400, "摘要格式错误")
+    if len(expected) != 32:
+        raise OtaError(400, "摘要格式错误")
+    if size <= 0 or size > MAX_FILE:
+        raise OtaError(413, "文件大小超出限制")
+    if size + CHUNK > free_bytes():
+        raise OtaError(413, "存储空间不足")
+    full = _join(path)
+    _make_dirs(full)
+    _tmp = full + TMP_SUFFIX
+    _file = open(_tmp, "wb")
+    _hash = hashlib.sha256()
+    _path = full
+    _expected = expected
+    _size = size
+    _started = time.ticks_ms()
+
+
+# 写入一块收到的数据（memoryview，来自buffer）
+def write(data):
+    global bytes_written
+    _file.write(data)
+    _hash.update(data)
+    bytes_written += len(data)
+
+
+# 所有数据收到后校验摘要并替换目标文件，返回(字节数, 耗时毫秒)
+def finish():
+    global _file, _tmp, updates
+    _file.close()
+    _file = None
+    if _hash.digest() != _expected:
+        abort()
+        raise OtaError(422, "SHA-256不一致")
+    try:
+        os.rename(_tmp, _path)
+    except OSError:
+        # FAT文件系统不能覆盖已存在的文件（LittleFS的rename直接替换）
+        os.remove(_path)
+        os.rename(_tmp, _path)
+    _tmp = None
+    updates += 1
+    return _size, time.ticks_diff(time.ticks_ms(), _started)
+
+
+# 放弃当前的更新：关闭并删除临时文件，可以重复调用
+def abort():
+    global _file, _tmp, failures
+    if _file is not None:
+        _file.close()
+        _file = None
+    if _tmp is not None:
+        _remove(_tmp)
+        _tmp = None
+        failures += 1
+
+
+def stats():
+    return {
+        "enabled": KEY is not None,
+        "updates": updates,
+        "failures": failures,
+        "bytes": bytes_written,
+    }
@@ -0,0 +1,133 @@
+# 空闲省电策略：没有倒计时时先调暗屏幕，再关闭屏幕，条件允许时让芯片浅睡眠
+# 用户操作（收到命令、建立连接）调用touch()立即点亮屏幕；step()由后台任务调用，
+# 返回下一次需要检查的毫秒数，两次检查之间不产生任何唤醒
+# 计数器记录唤醒次数、定时器节拍和屏幕点亮时长，便于在仿真器和电池供电的设备上比较耗电
+import time
+
+import machine
+
+# 空闲多久后调暗/关闭屏幕（毫秒）
+DIM_AFTER_MS = 60 * 1000
+OFF_AFTER_MS = 5 * 60 * 1000
+FULL_CONTRAST = 0xFF
+DIM_CONTRAST = 0x10
+# 浅睡眠单次时长（毫秒），0表示不使用。浅睡眠期间热点停止广播，
+# 只在没有设备连接热点、屏幕已关闭时使用；需要热点一直可见的场合保持0
+LIGHTSLEEP_MS = 0
+# 计时进行中或屏幕关闭后，两次检查的最长间隔
+MAX_WAIT_MS = 10 * 60 * 1000
+
+OFF = 0
+DIM = 1
+ON = 2
+
+display = None
+level = ON
+last_activity = time.ticks_ms()
+_on_since = last_activity
+
+# 统计计数
+wakeups = 0
+ticks = 0
+dims = 0
+offs = 0
+lightsleeps = 0
+lightsleep_ms = 0
+_display_on_ms = 0
+
+
+# 绑定屏幕（SSD1315对象），之后由本模块控制对比度和开关
+def attach(oled):
+    global display
+    display = oled
+    set_level(ON, True)
+
+
+def set_level(new_level, force=False):
+    global level, dims, offs, _on_since, _display_on_ms
+    if new_level == level and not force:
+        return
+    now = time.ticks_ms()
+    if level != OFF and new_level == OFF:
+        _display_on_ms += time.ticks_diff(now, _on_since)
+    elif level == OFF and new_level != OFF:
+        _on_since = now
+    if new_level == DIM:
+        dims += 1
+    elif new_level == OFF:
+        offs += 1
+    level = new_level
+    if display is None:
+        return
+    try:
+        if new_level == OFF:
+            display.poweroff()
+        else:
+            display.poweron()
+            display.contrast(FULL_CONTRAST if new_level == ON else DIM_CONTRAST)
+    except Exception:
+        pass
+
+
+# 有用户操作：重新开始计算空闲时间并点亮屏幕
+def touch():
+    global last_activity
+    last_activity = time.ticks_ms()
+    if level != ON:
+        set_level(ON)
+
+
+# 执行一次空闲检查；running为True时不调暗屏幕，remaining_ms是到倒计时结束的毫秒数，
+# stations是连接到热点的设备数。返回距下一次检查的毫秒数
+def step(running, remaining_ms=0, stations=0):
+    global wakeups, lightsleeps, lightsleep_ms
+    wakeups += 1
+    if running:
+        if level != ON:
+            set_level(ON)
+        # 倒计时结束后再检查（完成时会调用touch()）
+        return min(remaining_ms + 1, MAX_WAIT_MS)
+    idle = time.ticks_diff(time.ticks_ms(), last_activity)
+    if idle < DIM_AFTER_MS:
+        return DIM_AFTER_MS - idle
+    if idle < OFF_AFTER_MS:
+        if level == ON:
+            set_level(DIM)
+        return OFF_AFTER_MS - idle
+    if level != OFF:
+        set_level(OFF)
+    if LIGHTSLEEP_MS and stations == 0:
+        lightsleeps += 1
+        lightsleep_ms += LIGHTSLEEP_MS
+        machine.lightsleep(LIGHTSLEEP_MS)
+        wakeups += 1
+        return 0
+    return MAX_WAIT_MS
+
+
+# 屏幕累计点亮的秒数（调暗也算点亮）
+def display_on_seconds():
+    ms = _display_on_ms
+    if level != OFF:
+        ms += time.ticks_diff(time.ticks_ms(), _on_since)
+    return ms // 1000
+
+
+def stats():
+    return {
+        "wakeups": wakeups,
+        "ticks": ticks,
+        "dims": dims,
+        "offs": offs,
+        "lightsleeps": lightsleeps,
+        "lightsleepMs": lightsleep_ms,
+        "displayOnSeconds": display_on_seconds(),
+        "displayLevel": level,
+    }
+
+
+def reset_stats():
+    global wakeups, ticks, dims, offs, lightsleeps, lightsleep_ms, _display_on_ms, _on_since
+    wakeups = ticks = dims = offs = lightsleeps = lightsleep_ms = 0
+    _display_on_ms = 0
+    _on_since = time.ticks_ms()
@@ -0,0 +1,233 @@
+# 专注/休息计时会话的状态机
+# 状态转换由 (状态, 事件) -> 处理函数 的转换表驱动，按状态分组成两级dict，
+# 分派时不需要创建元组键，也就不产生堆分配；
+# 表中没有的组合视为非法转换，直接拒绝，不修改任何状态。
+# 处理函数先校验消息内容再修改会话，校验失败同样不留下副作用。
+# 显示和网络由main.py根据转换后的状态处理，这里只维护计时数据
+# 计时以time.ticks_ms()的截止时间为准，剩余时间每次按当前时间计算而不是逐秒递减，
+# 定时器回调迟到或丢失都不会累积误差；暂停时保存剩余的毫秒数，继续时重新计算截止时间
+import time
+
+IDLE = "idle"
+RUNNING = "running"
+PAUSED = "paused"
+COMPLETED = "completed"
+BREAK_RUNNING = "break_running"
+BREAK_PAUSED = "break_paused"
+BREAK_COMPLETED = "break_completed"
+
+DEFAULT_FOCUS_SECONDS = 25 * 60
+DEFAULT_BREAK_SECONDS = 5 * 60
+# 单轮计时的上限；截止时间用ticks_add计算，毫秒数必须远小于ticks_ms回绕周期的一半
+MAX_SECONDS = 24 * 3600
+
+
+class FocusSession:
+    __slots__ = ("state", "total", "remaining", "is_break", "deadline", "budget_ms",
+                 "started", "pauses", "task", "transitions", "rejected")
+
+    def __init__(self):
+        self.state = IDLE
+        self.total = 0  # 总秒数（专注或休息）
+        self.remaining = 0  # 剩余秒数（向上取整，与浏览器显示一致）
+        self.is_break = False
+        self.deadline = 0  # 计时中：结束时刻的ticks_ms
+        self.budget_ms = 0  # 未在计时：剩余毫秒数
+        self.started = 0  # 这一轮开始时的time.time()
+        self.pauses = 0
+        self.task = 0  # 任务ID的哈希，由main.py在开始时设置
+        self.transitions = 0
+        self.rejected = 0
+
+    # 分派一个事件；成功返回True，非法转换或消息内容无效返回False
+    def dispatch(self, event, message=None):
+        handler = TRANSITIONS[self.state].get(event)
+        if handler is None or not handler(self, message):
+            self.rejected += 1
+            return False
+        self.transitions += 1
+        return True
+
+    def allows(self, event):
+        return event in TRANSITIONS[self.state]
+
+    def running(self):
+        return self.state == RUNNING or self.state == BREAK_RUNNING
+
+    # 复制显示需要的字段（状态、剩余秒数、总秒数）到out；复制过程中被定时器回调打断
+    # （转换计数变化）时重新复制，保证几个字段来自同一次转换之后
+    def snapshot(self, out):
+        while True:
+            n = self.transitions
+            out[0] = self.state
+            out[1] = self.remaining
+            out[2] = self.total
+            if n == self.transitions:
+                return out
+
+    # 计时中或暂停中，结束时需要写入会话日志
+    def active(self):
+        return self.state in ACTIVE
+
+    # 按当前时间计算剩余毫秒数
+    def remaining_ms(self):
+        if self.running():
+            ms = time.ticks_diff(self.deadline, time.ticks_ms())
+            return ms if ms > 0 else 0
+        return self.budget_ms
+
+
+# 新的一轮从现在开始
+def _new_round(s):
+    s.started = int(time.time())
+    s.pauses = 0
+    s.task = 0
+
+
+# 从给定的剩余毫秒数开始计时
+def _run_for(s, ms):
+    s.deadline = time.ticks_add(time.ticks_ms(), ms)
+    s.budget_ms = ms
+    s.remaining = (ms + 999) // 1000
+
+
+# 把消息里的秒数转换为0~MAX_SECONDS的整数；前端可能发送浮点数或字符串，
+# 无法转换（包括inf、nan）或超出范围时返回None
+def _seconds(value):
+    if type(value) is not int:
+        try:
+            value = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return value if 0 <= value <= MAX_SECONDS else None
+
+
+def _begin(s, message, state, is_break, default):
+    total = message.get("totalSeconds") if message else None
+    if total is None and message and "duration" in message:
+        minutes = _seconds(message["duration"])
+        total = None if minutes is None else minutes * 60
+    total = _seconds(default if total is None else total)
+    if not total:
+        return False
+    s.state = state
+    s.total = total
+    s.is_break = is_break
+    _new_round(s)
+    _run_for(s, total * 1000)
+    return True
+
+
+def _start(s, message):
+    return _begin(s, message, RUNNING, False, DEFAULT_FOCUS_SECONDS)
+
+
+def _break_start(s, message):
+    return _begin(s, message, BREAK_RUNNING, True, DEFAULT_BREAK_SECONDS)
+
+
+# 前端每秒发送浏览器上的剩余秒数；设备正常计时时两边相差不超过1秒，
+# 只有差得更多（设备重启、错过了命令）时才以浏览器为准重新设定截止时间
+def _sync(s, message, state, is_break):
+    remaining = _seconds(message.get("remainingSeconds", 0)) if message else None
+    if not remaining:
+        return False
+    if s.state == IDLE:
+        # 设备重启或错过了start命令，从这里开始记录这一轮
+        _new_round(s)
+    if s.state != state or abs(s.remaining - remaining) > 1:
+        _run_for(s, remaining * 1000)
+    s.state = state
+    if s.total < remaining:
+        s.total = remaining
+    s.is_break = is_break
+    return True
+
+
+def _progress(s, message):
+    return _sync(s, message, RUNNING, False)
+
+
+def _break_progress(s, message):
+    return _sync(s, message, BREAK_RUNNING, True)
+
+
+# 暂停和继续只在计时中/暂停中的状态下分派，直接读一次时钟，不经过remaining_ms()
+def _pause(s, message):
+    ms = time.ticks_diff(s.deadline, time.ticks_ms())
+    s.budget_ms = ms if ms > 0 else 0
+    s.remaining = (s.budget_ms + 999) // 1000
+    s.state = PAUSED if s.state == RUNNING else BREAK_PAUSED
+    s.pauses += 1
+    return True
+
+
+# 剩余秒数在暂停时已经按budget_ms算好，这里只需要新的截止时间
+def _resume(s, message):
+    s.state = RUNNING if s.state == PAUSED else BREAK_RUNNING
+    s.deadline = time.ticks_add(time.ticks_ms(), s.budget_ms)
+    return True
+
+
+def _complete(s, message):
+    s.state = COMPLETED
+    s.remaining = 0
+    s.budget_ms = 0
+    return True
+
+
+def _break_complete(s, message):
+    s.state = BREAK_COMPLETED
+    s.remaining = 0
+    s.budget_ms = 0
+    s.is_break = False
+    return True
+
+
+def _stop(s, message):
+    s.state = IDLE
+    s.remaining = 0
+    s.budget_ms = 0
+    s.is_break = False
+    return True
+
+
+# 定时器回调：按截止时间重新计算剩余秒数，到时进入完成状态
+def _tick(s, message):
+    ms = s.remaining_ms()
+    if ms == 0:
+        if s.is_break:
+            return _break_complete(s, message)
+        return _complete(s, message)
+    s.remaining = (ms + 999) // 1000
+    return True
+
+
+ACTIVE = (RUNNING, PAUSED, BREAK_RUNNING, BREAK_PAUSED)
+_ALL = (IDLE, RUNNING, PAUSED, COMPLETED, BREAK_RUNNING, BREAK_PAUSED, BREAK_COMPLETED)
+
+# 转换表：状态 -> {事件: 处理函数}
+TRANSITIONS = {}
+for _state in _ALL:
+    TRANSITIONS[_state] = {"start": _start, "break_start": _break_start, "stop": _stop}
+for _state in (IDLE, RUNNING, PAUSED):
+    TRANSITIONS[_state]["progress"] = _progress
+for _state in (IDLE, BREAK_RUNNING, BREAK_PAUSED):
+    TRANSITIONS[_state]["break_progress"] = _break_progress
+for _state in (RUNNING, PAUSED):
+    TRANSITIONS[_state]["complete"] = _complete
+for _state in (BREAK_RUNNING, BREAK_PAUSED):
+    TRANSITIONS[_state]["break_complete"] = _break_complete
+TRANSITIONS[RUNNING]["pause"] = _pause
+TRANSITIONS[PAUSED]["resume"] = _resume
+TRANSITIONS[BREAK_RUNNING]["break_pause"] = _pause
+TRANSITIONS[BREAK_PAUSED]["break_resume"] = _resume
+TRANSITIONS[RUNNING]["tick"] = _tick
+TRANSITIONS[BREAK_RUNNING]["tick"] = _tick
+# 完成画面停留5秒后回到初始状态；期间已经开始下一轮时不再重置
+TRANSITIONS[COMPLETED]["reset"] = _stop
+TRANSITIONS[BREAK_COMPLETED]["reset"] = _stop
+
+EVENTS = set()
+for _events in TRANSITIONS.values():
+    EVENTS.update(_events)
@@ -1,3 +1,4 @@
+import sys
 from micropython import const
 import framebuf
 
@@ -19,26 +20,160 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+# 逐字节比较帧缓冲与上次发送的内容，找出变化的列范围
+# 板子上用viper编译，桌面CPython上退回纯Python实现
+if sys.implementation.name == "micropython":
+    import micropython
+
+    @micropython.viper
+    def _first_diff(a: ptr8, b: ptr8, start: int, end: int) -> int:
+        i = start
+        while i < end:
+            if a[i] != b[i]:
+                return i
+            i += 1
+        return -1
+
+    @micropython.viper
+    def _last_diff(a: ptr8, b: ptr8, start: int, end: int) -> int:
+        i = end - 1
+        while i >= start:
+            if a[i] != b[i]:
+                return i
+            i -= 1
+        return -1
+
+    @micropython.viper
+    def _copy(dst: ptr8, doff: int, src: ptr8, soff: int, n: int):
+        i = 0
+        while i < n:
+            dst[doff + i] = src[soff + i]
+            i += 1
+else:
+    def _first_diff(a, b, start, end):
+        for i in range(start, end):
+            if a[i] != b[i]:
+                return i
+        return -1
+
+    def _last_diff(a, b, start, end):
+        for i in range(end - 1, start - 1, -1):
+            if a[i] != b[i]:
+                return i
+        return -1
+
+    def _copy(dst, doff, src, soff, n):
+        dst[doff:doff + n] = src[soff:soff + n]
+
 class SSD1315(framebuf.FrameBuffer):
-    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False):
+    def __init__(self, width, height, i2c, addr=0x3C, external_vcc=False, cmd_chunk=32, data_chunk=1024):
         self.width = width
         self.height = height
         self.i2c = i2c
         self.addr = addr
         self.external_vcc = external_vcc
         self.pages = self.height // 8
-        self.buffer = bytearray(self.pages * self.width)
+        # 单次I2C传输的最大命令/数据字节数（不含控制字节），按总线缓冲区大小调整
+        self.cmd_chunk = cmd_chunk
+        self.data_chunk = data_chunk
+        # 帧缓冲前预留1字节放数据控制字节0x40，整屏刷新时直接发送，无需拼接复制
+        self._raw = bytearray(1 + self.pages * self.width)
+        self._raw[0] = 0x40
+        self._raw_mv = memoryview(self._raw)
+        self.buffer = self._raw_mv[1:]
+        # 上次真正发送到屏幕的内容，用于计算脏页
+        self.shadow = bytearray(self.pages * self.width)
+        self._shadow_mv = memoryview(self.shadow)
+        self._synced = False
+        # 预分配的命令缓冲区，避免每条命令都创建bytearray
+        self._cmd1 = bytearray(2)
+        self._cmd1[0] = 0x80
+        self._cmdbuf = bytearray(1 + cmd_chunk)
+        self._cmdbuf_mv = memoryview(self._cmdbuf)
+        self._win = bytearray((0x00, SET_COL_ADDR, 0, 0, SET_PAGE_ADDR, 0, 0))
+        self._ctrl = b'\x40'
+        # 局部刷新的暂存区：变化的列复制到控制字节之后，用对应长度的memoryview直接发送；
+        # 每一行的长度最多width种，初始化时全部建好，刷新时不再创建切片对象
+        self._stage = bytearray(1 + width)
+        self._stage[0] = 0x40
+        stage_mv = memoryview(self._stage)
+        self._stage_views = [stage_mv[:n + 1] for n in range(width + 1)]
+        self._vec = [self._ctrl, None]
+        self._has_writevto = hasattr(i2c, "writevto")
+        # 统计计数
+        self.bytes_sent = 0
+        self.transactions = 0
+        self.frames = 0
+        self.frames_skipped = 0
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
     def write_cmd(self, cmd):
-        self.i2c.writeto(self.addr, bytearray([0x80, cmd]))
+        self._cmd1[1] = cmd
+        self.i2c.writeto(self.addr, self._cmd1)
+        self.bytes_sent += 2
+        self.transactions += 1
+
+    def write_cmds(self, cmds):
+        # 控制字节0x00后跟连续的命令流，一次传输发送整组命令
+        buf = self._cmdbuf
+        chunk = self.cmd_chunk
+        n = len(cmds)
+        i = 0
+        while i < n:
+            m = min(chunk, n - i)
+            for j in range(m):
+                buf[1 + j] = cmds[i + j]
+            self.i2c.writeto(self.addr, self._cmdbuf_mv[:m + 1])
+            self.bytes_sent += m + 1
+            self.transactions += 1
+            i += m
 
     def write_data(self, buf):
-        self.i2c.writeto(self.addr, b'\x40'+buf)
+        # 控制字节和数据分开提交给writevto，不拼接复制
+        mv = memoryview(buf)
+        n = len(mv)
+        chunk = self.data_chunk
+        i = 0
+        while i < n:
+            m = min(chunk, n - i)
+            if self._has_writevto:
+                self._vec[1] = mv[i:i + m]
+                self.i2c.writevto(self.addr, self._vec)
+                self._vec[1] = None
+            else:
+                self.i2c.writeto(self.addr, self._ctrl + mv[i:i + m])
+            self.bytes_sent += m + 1
+            self.transactions += 1
+            i += m
+
+    def _write_span(self, start, end):
+        # 发送帧缓冲中[start, end)区间。self.buffer[k]对应self._raw[k + 1]，
+        # 把区间前一个字节临时换成控制字节，直接发送原始缓冲区的切片
+        if self._has_writevto:
+            self.write_data(self.buffer[start:end])
+            return
+        raw = self._raw
+        chunk = self.data_chunk
+        while start < end:
+            stop = min(end, start + chunk)
+            saved = raw[start]
+            raw[start] = 0x40
+            self.i2c.writeto(self.addr, self._raw_mv[start:stop + 1])
+            raw[start] = saved
+            self.bytes_sent += stop - start + 1
+            self.transactions += 1
+            start = stop
+
+    # 发送帧缓冲中从start开始的n字节（不超过一行），经暂存区一次传输
+    def _send_staged(self, start, n):
+        _copy(self._stage, 1, self.buffer, start, n)
+        self.i2c.writeto(self.addr, self._stage_views[n])
+        self.bytes_sent += n + 1
+        self.transactions += 1
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds((
             SET_DISP | 0x00,
             SET_MEM_ADDR, 0x00,
             SET_DISP_START_LINE | 0x00,
@@ -54,16 +189,67 @@ class SSD1315(framebuf.FrameBuffer):
             SET_ENTIRE_ON,
             SET_NORM_INV,
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01):
-            self.write_cmd(cmd)
-
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
\ No newline at end of file
+            SET_DISP | 0x01))
+        # 初始化后屏幕内容未知，下一次show必须整屏刷新
+        self._synced = False
+
+    def poweroff(self):
+        self.write_cmd(SET_DISP | 0x00)
+
+    def poweron(self):
+        self.write_cmd(SET_DISP | 0x01)
+
+    def contrast(self, value):
+        self.write_cmds((SET_CONTRAST, value))
+
+    def set_window(self, x0, x1, p0, p1):
+        win = self._win
+        win[2] = x0
+        win[3] = x1
+        win[5] = p0
+        win[6] = p1
+        self.i2c.writeto(self.addr, win)
+        self.bytes_sent += 7
+        self.transactions += 1
+
+    def show(self, force=False):
+        self.frames += 1
+        if force or not self._synced:
+            self.set_window(0, self.width - 1, 0, self.pages - 1)
+            n = len(self.shadow)
+            if n <= self.data_chunk:
+                # 预留的控制字节和整个帧缓冲一次发出
+                self.i2c.writeto(self.addr, self._raw)
+                self.bytes_sent += n + 1
+                self.transactions += 1
+            else:
+                self._write_span(0, n)
+            self._shadow_mv[:] = self.buffer
+            self._synced = True
+            return
+        # 只刷新内容有变化的页，每页只发送变化的列范围
+        width = self.width
+        buf = self.buffer
+        flushed = False
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            first = _first_diff(buf, self.shadow, start, end)
+            if first < 0:
+                continue
+            last = _last_diff(buf, self.shadow, first, end) + 1
+            self.set_window(first - start, last - start - 1, page, page)
+            if last - first <= self.data_chunk:
+                self._send_staged(first, last - first)
+            else:
+                self._write_span(first, last)
+            _copy(self.shadow, first, buf, first, last - first)
+            flushed = True
+        if not flushed:
+            self.frames_skipped += 1
+
+    def reset_stats(self):
+        self.bytes_sent = 0
+        self.transactions = 0
+        self.frames = 0
+        self.frames_skipped = 0
@@ -0,0 +1,88 @@
+# 任务标题缓存：按任务ID的哈希索引浏览器推送的标题位图，开始计时只发送任务ID，缓存中没有时设备请求浏览器推送，
+# 计时画面在倒计时下方显示缓存的标题。缓存槽全部预先分配，内存上限固定为 槽数 x 位图字节数，
+# 槽用完时淘汰最久未使用的标题
+import framebuf
+
+
+class TitleCache:
+    def __init__(self, width, height, slots=8):
+        self.width = width
+        self.height = height
+        self.slots = slots
+        self.bitmap_bytes = width * ((height + 7) // 8)
+        self._bufs = []
+        self._fbs = []
+        for _ in range(slots):
+            buf = bytearray(self.bitmap_bytes)
+            self._bufs.append(buf)
+            self._fbs.append(framebuf.FrameBuffer(buf, width, height, framebuf.MONO_VLSB))
+        self._slot_key = [None] * slots
+        self._slot_used = [0] * slots
+        self._cached = {}
+        self._clock = 0
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # 已缓存的key沿用原来的槽，否则淘汰最久未使用的槽
+    def _claim(self, key):
+        self._clock += 1
+        self.stores += 1
+        slot = self._cached.get(key)
+        if slot is None:
+            slot = 0
+            oldest = self._slot_used[0]
+            for i in range(1, self.slots):
+                if self._slot_used[i] < oldest:
+                    oldest = self._slot_used[i]
+                    slot = i
+            old = self._slot_key[slot]
+            if old is not None:
+                del self._cached[old]
+                self.evictions += 1
+            self._slot_key[slot] = key
+            self._cached[key] = slot
+        self._slot_used[slot] = self._clock
+        return slot
+
+    # 保存浏览器渲染好的位图（bitmap_bytes字节，MONO_VLSB）
+    def put_bitmap(self, key, bitmap):
+        if len(bitmap) != self.bitmap_bytes:
+            raise ValueError("title bitmap must be {} bytes".format(self.bitmap_bytes))
+        self._bufs[self._claim(key)][:] = bitmap
+
+    # 没有位图时用设备上的字体居中绘制标题（font为glyphs.GlyphAtlas或widgets.ASCII，只能显示字体中有的字符）
+    def put_text(self, key, text, font):
+        fb = self._fbs[self._claim(key)]
+        fb.fill(0)
+        x = (self.width - font.text_width(text)) // 2
+        y = (self.height - font.height) // 2
+        font.draw_text(fb, text, x if x > 0 else 0, y if y > 0 else 0)
+
+    # 是否已缓存key对应的标题；不改变淘汰顺序，也不计入命中/未命中
+    def has(self, key):
+        return key in self._cached
+
+    # 返回key对应标题的FrameBuffer，没有缓存时返回None
+    def get(self, key):
+        slot = self._cached.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._clock += 1
+        self._slot_used[slot] = self._clock
+        return self._fbs[slot]
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "cached": len(self._cached),
+            "bytes": self.slots * self.bitmap_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,186 @@
+# 保留模式的屏幕部件：每个部件记住自己的区域和当前的值，值变化时只把自己标记为需要重绘；
+# 重绘时先清空自己的区域再画，其余像素保持不变，ssd1315.show()只传输变化的列。
+# 完全静态的提示画面第一次显示时绘制到缓存的帧缓冲里，之后整块复制到屏幕的帧缓冲
+import framebuf
+
+# 0-9的单字符字符串；数字逐位绘制，不需要每秒格式化新的字符串
+DIGITS = tuple(str(d) for d in range(10))
+# framebuf自带的8x8字体
+CHAR_W = 8
+CHAR_H = 8
+
+
+# 从x开始绘制非负整数，不足min_digits位时前面补0，返回绘制结束的x
+def draw_number(fb, value, min_digits, x, y):
+    digits = 1
+    limit = 10
+    while limit <= value:
+        digits += 1
+        limit *= 10
+    if digits < min_digits:
+        digits = min_digits
+    end = x + digits * CHAR_W
+    x = end
+    for _ in range(digits):
+        x -= CHAR_W
+        fb.text(DIGITS[value % 10], x, y)
+        value //= 10
+    return end
+
+
+# 没有字形图集时使用的字体，接口与glyphs.GlyphAtlas.draw_text()相同
+class AsciiFont:
+    height = CHAR_H
+
+    def text_width(self, text):
+        return len(text) * CHAR_W
+
+    def draw_text(self, fb, text, x, y, c=1):
+        fb.text(text, x, y, c)
+        return x + len(text) * CHAR_W
+
+
+ASCII = AsciiFont()
+
+
+# 部件基类：区域(x, y, w, h)和当前的值；值为None时区域留空
+class Widget:
+    def __init__(self, x, y, w, h):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.value = None
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    # 设置新的值，只有值变化时才需要重绘
+    def set(self, value):
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def draw(self, fb):
+        fb.fill_rect(self.x, self.y, self.w, self.h, 0)
+        if self.value is not None:
+            self.paint(fb, self.value)
+        self.dirty = False
+
+    def paint(self, fb, value):
+        pass
+
+
+# 一行文字（可以包含中文）；font为glyphs.GlyphAtlas或ASCII
+class Label(Widget):
+    def __init__(self, x, y, w, h, font=ASCII):
+        super().__init__(x, y, w, h)
+        self.font = font
+
+    def paint(self, fb, value):
+        self.font.draw_text(fb, value, self.x, self.y)
+
+
+# 剩余时间（分:秒，各至少两位），值为秒数
+class Countdown(Widget):
+    def paint(self, fb, value):
+        x = draw_number(fb, value // 60, 2, self.x, self.y)
+        fb.text(":", x, self.y)
+        draw_number(fb, value % 60, 2, x + CHAR_W, self.y)
+
+
+# 带边框的进度条，值为填充的像素宽度
+class ProgressBar(Widget):
+    def paint(self, fb, value):
+        fb.fill_rect(self.x, self.y, value, self.h, 1)
+        fb.rect(self.x, self.y, self.w, self.h, 1)
+
+
+# 百分比，值为0-100的整数
+class Percent(Widget):
+    def paint(self, fb, value):
+        fb.text("%", draw_number(fb, value, 1, self.x, self.y), self.y)
+
+
+# 位图（FrameBuffer，例如缓存的任务标题），按对象比较；同一个FrameBuffer的内容变化后需要调用invalidate()
+class Bitmap(Widget):
+    def paint(self, fb, value):
+        fb.blit(value, self.x, self.y)
+
+
+# 由一组互不重叠的部件组成的画面；从别的画面切换过来时整屏重绘，之后只重绘值变化的部件
+class Screen:
+    def __init__(self, *widgets):
+        self.widgets = widgets
+        self.shown = False
+        # 统计计数
+        self.full_draws = 0
+        self.widget_draws = 0
+
+    # 屏幕被其他画面覆盖后调用，下次绘制时整屏重绘
+    def invalidate(self):
+        self.shown = False
+
+    # 绘制需要重绘的部件，返回重绘的部件数
+    def draw(self, fb):
+        if not self.shown:
+            fb.fill(0)
+            for widget in self.widgets:
+                widget.dirty = True
+            self.shown = True
+            self.full_draws += 1
+        drawn = 0
+        for widget in self.widgets:
+            if widget.dirty:
+                widget.draw(fb)
+                drawn += 1
+        self.widget_draws += drawn
+        return drawn
+
+
+# 静态提示画面的缓存：lines为(文字, x, y)元组，以元组本身为键；缓存槽的帧缓冲全部预先分配，
+# 格式与屏幕相同（MONO_VLSB），显示时直接复制字节，不用逐像素的blit()；槽用完时淘汰最久未显示的画面
+class StaticScreens:
+    def __init__(self, width, height, slots=4, font=ASCII):
+        self.font = font
+        self.slots = slots
+        self._bufs = []
+        self._fbs = []
+        for _ in range(slots):
+            buf = bytearray(width * ((height + 7) // 8))
+            self._bufs.append(buf)
+            self._fbs.append(framebuf.FrameBuffer(buf, width, height, framebuf.MONO_VLSB))
+        self._slot_lines = [None] * slots
+        self._slot_used = [0] * slots
+        self._cached = {}
+        self._clock = 0
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+
+    # 把lines对应的画面复制到屏幕的帧缓冲buffer（覆盖整屏）；不在缓存中时先绘制到一个缓存槽
+    def show(self, buffer, lines):
+        self._clock += 1
+        slot = self._cached.get(lines)
+        if slot is None:
+            self.misses += 1
+            slot = 0
+            oldest = self._slot_used[0]
+            for i in range(1, self.slots):
+                if self._slot_used[i] < oldest:
+                    oldest = self._slot_used[i]
+                    slot = i
+            old = self._slot_lines[slot]
+            if old is not None:
+                del self._cached[old]
+            cached = self._fbs[slot]
+            cached.fill(0)
+            for text, x, y in lines:
+                self.font.draw_text(cached, text, x, y)
+            self._slot_lines[slot] = lines
+            self._cached[lines] = slot
+        else:
+            self.hits += 1
+        self._slot_used[slot] = self._clock
+        buffer[:] = self._bufs[slot]
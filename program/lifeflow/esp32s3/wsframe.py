@@ -0,0 +1,280 @@
+# WebSocket帧的流式解码器
+# 接收数据写入预分配的环形缓冲区，每次取出一个完整的消息或控制帧；
+# 支持跨多次读取的帧、一次读取中的多个帧以及分片（continuation）消息
+import sys
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# 按掩码异或，把src[soff:soff+n]解码写入dst[doff:]；phase为掩码起始偏移
+# 板子上用viper按32位字处理，桌面CPython上用大整数一次性异或
+if sys.implementation.name == "micropython":
+    import micropython
+
+    @micropython.viper
+    def _unmask_into(dst: ptr8, doff: int, src: ptr8, soff: int, n: int, mask: ptr8, phase: int):
+        i = 0
+        # 源和目标地址的对齐方式相同时，先逐字节处理到4字节边界，再按32位字异或
+        if ((int(dst) + doff) & 3) == ((int(src) + soff) & 3):
+            while i < n and ((int(dst) + doff + i) & 3) != 0:
+                dst[doff + i] = int(src[soff + i]) ^ int(mask[(phase + i) & 3])
+                i += 1
+            words = (n - i) >> 2
+            if words > 0:
+                p = phase + i
+                m = int(mask[p & 3]) | (int(mask[(p + 1) & 3]) << 8) | (int(mask[(p + 2) & 3]) << 16) | (int(mask[(p + 3) & 3]) << 24)
+                d32 = ptr32(int(dst) + doff + i)
+                s32 = ptr32(int(src) + soff + i)
+                j = 0
+                while j < words:
+                    d32[j] = int(s32[j]) ^ m
+                    j += 1
+                i += words << 2
+        while i < n:
+            dst[doff + i] = int(src[soff + i]) ^ int(mask[(phase + i) & 3])
+            i += 1
+else:
+    def _unmask_into(dst, doff, src, soff, n, mask, phase):
+        if n <= 0:
+            return
+        key = bytes((mask[phase & 3], mask[(phase + 1) & 3], mask[(phase + 2) & 3], mask[(phase + 3) & 3]))
+        key = int.from_bytes(key * ((n + 3) >> 2), "little") & ((1 << (n << 3)) - 1)
+        value = int.from_bytes(src[soff:soff + n], "little") ^ key
+        dst[doff:doff + n] = value.to_bytes(n, "little")
+
+# 把src[0:n]复制到dst[doff:]，不创建切片对象
+if sys.implementation.name == "micropython":
+    @micropython.viper
+    def _copy_into(dst: ptr8, doff: int, src: ptr8, n: int):
+        i = 0
+        while i < n:
+            dst[doff + i] = src[i]
+            i += 1
+else:
+    def _copy_into(dst, doff, src, n):
+        dst[doff:doff + n] = src[:n]
+
+
+class FrameError(Exception):
+    pass
+
+
+# 同一缓冲区按长度缓存的前缀memoryview：同样长度的帧反复出现（确认、状态、进度消息）时
+# 不再创建新的切片对象；缓存个数有上限，超出后按需创建
+class Views:
+    def __init__(self, buf, limit=16):
+        self._mv = memoryview(buf)
+        self._cache = {}
+        self._limit = limit
+
+    def get(self, n):
+        view = self._cache.get(n)
+        if view is None:
+            view = self._mv[:n]
+            if len(self._cache) < self._limit:
+                self._cache[n] = view
+        return view
+
+
+class FrameDecoder:
+    def __init__(self, size=2048, max_message=1024):
+        # 环形缓冲区至少能容纳一个最大消息帧（含14字节帧头）
+        if size < max_message + 14:
+            size = max_message + 14
+        self.size = size
+        self.buf = bytearray(size)
+        self._mv = memoryview(self.buf)
+        self.start = 0
+        self.count = 0
+        # 数据消息（含分片拼接）和控制帧分别解码到各自的预分配缓冲区
+        self.message = bytearray(max_message)
+        self._message_views = Views(self.message)
+        self.control = bytearray(125)
+        self._control_views = Views(self.control)
+        self._mask = bytearray(4)
+        self._msg_opcode = -1
+        self._msg_len = 0
+        self.payload = None
+        # 统计计数
+        self.frames = 0
+        self.messages = 0
+
+    # 返回环形缓冲区中可以直接写入的连续空闲区域，配合commit()实现零拷贝读取
+    def writable(self):
+        end = self.start + self.count
+        if end >= self.size:
+            end -= self.size
+            return self._mv[end:self.start]
+        if self.count == self.size:
+            return self._mv[0:0]
+        return self._mv[end:]
+
+    def commit(self, n):
+        self.count += n
+
+    # 从bytes等对象写入数据，空间不足时抛出FrameError
+    def feed(self, data):
+        n = len(data)
+        if n > self.size - self.count:
+            raise FrameError("receive buffer overflow")
+        off = 0
+        while off < n:
+            region = self.writable()
+            m = min(len(region), n - off)
+            region[:m] = data[off:off + m]
+            self.commit(m)
+            off += m
+
+    def _peek(self, i):
+        i += self.start
+        if i >= self.size:
+            i -= self.size
+        return self.buf[i]
+
+    # 把环形缓冲区中偏移off处的n字节解码到dst[doff:]，处理回绕
+    def _copy_out(self, off, n, dst, doff, masked):
+        pos = self.start + off
+        if pos >= self.size:
+            pos -= self.size
+        first = min(n, self.size - pos)
+        if masked:
+            _unmask_into(dst, doff, self.buf, pos, first, self._mask, 0)
+            _unmask_into(dst, doff + first, self.buf, 0, n - first, self._mask, first)
+        else:
+            dst[doff:doff + first] = self._mv[pos:pos + first]
+            dst[doff + first:doff + n] = self._mv[0:n - first]
+
+    def _consume(self, n):
+        self.count -= n
+        self.start += n
+        if self.start >= self.size:
+            self.start -= self.size
+        if self.count == 0:
+            self.start = 0
+
+    # 解析下一个完整的帧。返回数据消息或控制帧的opcode，内容在self.payload中；
+    # 数据不完整时返回None（分片消息的中间帧被吸收，不单独返回）
+    def next(self):
+        while True:
+            if self.count < 2:
+                return None
+            b0 = self._peek(0)
+            b1 = self._peek(1)
+            fin = b0 & 0x80
+            opcode = b0 & 0x0F
+            masked = b1 & 0x80
+            n = b1 & 0x7F
+            head = 2
+            if n == 126:
+                if self.count < 4:
+                    return None
+                n = (self._peek(2) << 8) | self._peek(3)
+                head = 4
+            elif n == 127:
+                if self.count < 10:
+                    return None
+                n = 0
+                for i in range(2, 10):
+                    n = (n << 8) | self._peek(i)
+                head = 10
+            if masked:
+                if self.count < head + 4:
+                    return None
+                for i in range(4):
+                    self._mask[i] = self._peek(head + i)
+                head += 4
+
+            if opcode >= 0x8:
+                # 控制帧不能分片，负载不超过125字节
+                if n > 125 or not fin:
+                    raise FrameError("invalid control frame")
+                if self.count < head + n:
+                    return None
+                self._copy_out(head, n, self.control, 0, masked)
+                self._consume(head + n)
+                self.frames += 1
+                self.payload = self._control_views.get(n)
+                return opcode
+
+            if opcode == OP_CONT:
+                if self._msg_opcode < 0:
+                    raise FrameError("unexpected continuation frame")
+                offset = self._msg_len
+            elif opcode in (OP_TEXT, OP_BINARY):
+                if self._msg_opcode >= 0:
+                    raise FrameError("interleaved data frames")
+                offset = 0
+            else:
+                raise FrameError("unknown opcode")
+            if offset + n > len(self.message):
+                raise FrameError("message too large")
+            if self.count < head + n:
+                return None
+
+            self._copy_out(head, n, self.message, offset, masked)
+            self._consume(head + n)
+            self.frames += 1
+            if not fin:
+                if opcode != OP_CONT:
+                    self._msg_opcode = opcode
+                self._msg_len = offset + n
+                continue
+            if opcode == OP_CONT:
+                opcode = self._msg_opcode
+            self._msg_opcode = -1
+            self._msg_len = 0
+            self.messages += 1
+            self.payload = self._message_views.get(offset + n)
+            return opcode
+
+
+# 生成服务器发出的帧头（服务器到浏览器的帧不加掩码）
+def frame_header(opcode, length):
+    if length < 126:
+        return bytes((0x80 | opcode, length))
+    if length < 65536:
+        return bytes((0x80 | opcode, 126, length >> 8, length & 0xFF))
+    return bytes((0x80 | opcode, 127, 0, 0, 0, 0,
+                  (length >> 24) & 0xFF, (length >> 16) & 0xFF, (length >> 8) & 0xFF, length & 0xFF))
+
+
+# 发送帧的复用缓冲区：帧头和负载拼接在同一个预分配的bytearray里，一次write()发出。
+# MicroPython的Stream.write()返回前数据已经发出或被复制进写缓冲，所以多个连接可以共用一个编码器；
+# 桌面CPython的传输层可能保留传入的对象，仿真时返回一份副本。
+# 超过缓冲区大小的负载退回frame_header()加单独的负载
+_COPY_OUT = sys.implementation.name != "micropython"
+
+class FrameEncoder:
+    def __init__(self, max_payload=1024):
+        self.max_payload = max_payload
+        self.buf = bytearray(max_payload + 10)
+        self._views = Views(self.buf)
+
+    # 返回一个完整的帧（memoryview或bytes），在下一次调用之前有效
+    def frame(self, opcode, payload):
+        n = len(payload)
+        if n > self.max_payload:
+            return frame_header(opcode, n) + bytes(payload)
+        buf = self.buf
+        buf[0] = 0x80 | opcode
+        if n < 126:
+            buf[1] = n
+            head = 2
+        elif n < 65536:
+            buf[1] = 126
+            buf[2] = n >> 8
+            buf[3] = n & 0xFF
+            head = 4
+        else:
+            buf[1] = 127
+            for i in range(8):
+                buf[2 + i] = (n >> (56 - 8 * i)) & 0xFF
+            head = 10
+        _copy_into(buf, head, payload, n)
+        if _COPY_OUT:
+            return bytes(self._views.get(head + n))
+        return self._views.get(head + n)
@@ -18,12 +18,22 @@ let wsConnection = null;
 let isDeviceConnected = false;
 let isConnecting = false;
 let reconnectTimeoutId = null;
-const DEVICE_PORT = 80;
+// 直接连接设备时为80端口；通过多设备网关（tools/gateway.py，默认8765端口）连接时，
+// 在localStorage中设置 lifeflow_device_port=8765 和 lifeflow_gateway_device=设备ID（网关不支持二进制协议）
+const DEVICE_PORT = parseInt(localStorage.getItem('lifeflow_device_port') || '80', 10);
+const GATEWAY_DEVICE = localStorage.getItem('lifeflow_gateway_device');
+const DEVICE_PATH = GATEWAY_DEVICE ? `/?device=${encodeURIComponent(GATEWAY_DEVICE)}` : '';
 const RECONNECT_INTERVAL = 5000; // 重连间隔5秒
 const CONNECTION_TIMEOUT = 10000; // 连接超时10秒
 let connectionTimeoutId = null;
+// 设备每5秒推送一次heartbeat事件，超过这个时间没有收到任何消息就认为设备已掉线并重连
+const DEVICE_HEARTBEAT_TIMEOUT = 12000;
+let heartbeatTimeoutId = null;
 let esp32IP = localStorage.getItem('esp32IP') || '192.168.4.1'; // 默认ESP32 AP模式IP
 let esp32Connected = false;
+// 二进制设备协议（需固件支持，在localStorage中设置 lifeflow_device_binary=1 开启）
+const DEVICE_BINARY_PROTOCOL = 'lifeflow.bin.v1';
+const DEVICE_BINARY_ENABLED = localStorage.getItem('lifeflow_device_binary') === '1';
 
 
 // 页面加载
@@ -60,7 +70,7 @@ function setupDeviceConnection() {
         return;
     }
     
-    console.log(`🔌 尝试连接到设备: ws://${esp32IP}:${DEVICE_PORT}`);
+    console.log(`🔌 尝试连接到设备: ws://${esp32IP}:${DEVICE_PORT}${DEVICE_PATH}`);
     
     // 清除之前的重连计时器
     if (reconnectTimeoutId) {
@@ -82,7 +92,10 @@ function setupDeviceConnection() {
     }
     
     try {
-        wsConnection = new WebSocket(`ws://${esp32IP}:${DEVICE_PORT}`);
+        wsConnection = DEVICE_BINARY_ENABLED
+            ? new WebSocket(`ws://${esp32IP}:${DEVICE_PORT}${DEVICE_PATH}`, [DEVICE_BINARY_PROTOCOL])
+            : new WebSocket(`ws://${esp32IP}:${DEVICE_PORT}${DEVICE_PATH}`);
+        wsConnection.binaryType = 'arraybuffer';
         
         console.log('🔌 WebSocket对象已创建，连接状态:', wsConnection.readyState === WebSocket.CONNECTING ? 'CONNECTING' : wsConnection.readyState);
         
@@ -109,6 +122,9 @@ function setupDeviceConnection() {
             esp32Connected = true;
             isConnecting = false;
             updateDeviceStatus(true);
+            resetHeartbeatWatchdog();
+            // 新的连接上还没有推送过标题
+            deviceTitles.clear();
             
             // 发送初始状态
             const result = sendToDevice({
@@ -120,7 +136,28 @@ function setupDeviceConnection() {
         };
         
         wsConnection.onmessage = function(event) {
-            console.log('📩 收到设备消息:', event.data);
+            resetHeartbeatWatchdog();
+            if (typeof event.data !== 'string') {
+                const view = new DataView(event.data);
+                if (view.byteLength === 5 && view.getUint8(0) === DEVICE_TITLE_REQUEST) {
+                    onDeviceTitleRequest(view.getUint32(1));
+                }
+                return;
+            }
+            let message;
+            try {
+                message = JSON.parse(event.data);
+            } catch (error) {
+                console.log('📩 收到设备消息:', event.data);
+                return;
+            }
+            if (message.type === 'task_title_request') {
+                onDeviceTitleRequest(message.taskHash);
+            } else if (message.type === 'completed' || message.type === 'break_completed') {
+                console.log('🎉 设备端计时完成:', message.type, message);
+            } else if (message.type !== 'heartbeat') {
+                console.log('📩 收到设备消息:', message);
+            }
         };
         
         wsConnection.onerror = function(error) {
@@ -135,6 +172,7 @@ function setupDeviceConnection() {
                 clearTimeout(connectionTimeoutId);
                 connectionTimeoutId = null;
             }
+            stopHeartbeatWatchdog();
             
             isDeviceConnected = false;
             esp32Connected = false;
@@ -156,6 +194,7 @@ function setupDeviceConnection() {
                 clearTimeout(connectionTimeoutId);
                 connectionTimeoutId = null;
             }
+            stopHeartbeatWatchdog();
             
             isDeviceConnected = false;
             esp32Connected = false;
@@ -185,6 +224,25 @@ function setupDeviceConnection() {
     }
 }
 
+// 心跳看门狗：每收到一条设备消息就重新计时，超时则关闭连接，由onclose安排重连
+function resetHeartbeatWatchdog() {
+    stopHeartbeatWatchdog();
+    heartbeatTimeoutId = setTimeout(() => {
+        console.log('💔 超过' + DEVICE_HEARTBEAT_TIMEOUT / 1000 + '秒未收到设备心跳，重新连接');
+        heartbeatTimeoutId = null;
+        if (wsConnection) {
+            wsConnection.close();
+        }
+    }, DEVICE_HEARTBEAT_TIMEOUT);
+}
+
+function stopHeartbeatWatchdog() {
+    if (heartbeatTimeoutId) {
+        clearTimeout(heartbeatTimeoutId);
+        heartbeatTimeoutId = null;
+    }
+}
+
 // 安排重连
 function scheduleReconnect() {
     if (reconnectTimeoutId) {
@@ -223,6 +281,127 @@ function updateDeviceStatus(connected) {
     }
 }
 
+// 二进制协议的操作码和字段，与固件 esp32s3/binproto.py 保持一致
+const DEVICE_BINARY_LAYOUTS = {
+    start: [0x01, ['totalSeconds', 'remainingSeconds', 'taskHash']],
+    pause: [0x02, ['remainingSeconds']],
+    resume: [0x03, ['totalSeconds', 'remainingSeconds', 'taskHash']],
+    stop: [0x04, []],
+    progress: [0x05, ['remainingSeconds', 'elapsedSeconds', 'progressPercent']],
+    complete: [0x06, []],
+    break_start: [0x11, ['totalSeconds']],
+    break_pause: [0x12, ['remainingSeconds']],
+    break_resume: [0x13, []],
+    break_progress: [0x15, ['remainingSeconds', 'elapsedSeconds', 'progressPercent']],
+    break_complete: [0x16, []],
+    status: [0x20, []],
+    task_title: [0x22, ['taskHash'], 'bitmap']
+};
+
+// 任务标题位图：128x12像素，MONO_VLSB（每字节为一列中纵向的8个像素，每8行一页），与 binproto.py 保持一致
+const DEVICE_TITLE_WIDTH = 128;
+const DEVICE_TITLE_HEIGHT = 12;
+const DEVICE_TITLE_BYTES = DEVICE_TITLE_WIDTH * Math.ceil(DEVICE_TITLE_HEIGHT / 8);
+// 设备缓存中没有开始/继续计时的任务标题时发来的请求：二进制为 0x82 | taskHash(u32)，JSON为 task_title_request
+const DEVICE_TITLE_REQUEST = 0x82;
+// 本次连接推送过的任务标题（taskId -> 标题），只用来发现改过名的任务；每次连接后清空
+const deviceTitles = new Map();
+
+// 任务ID的32位FNV-1a哈希
+function deviceTaskHash(taskId) {
+    let h = 0x811c9dc5;
+    for (const b of new TextEncoder().encode(String(taskId || ''))) {
+        h = Math.imul(h ^ b, 0x01000193) >>> 0;
+    }
+    return h;
+}
+
+// 把命令编码为二进制帧：1字节操作码 + 大端字段（progressPercent为1字节，其余4字节），task_title再附上标题位图
+function encodeDeviceCommand(data) {
+    const layout = DEVICE_BINARY_LAYOUTS[data.type];
+    if (!layout) return null;
+    const [opcode, fields, blob] = layout;
+    const blobBytes = blob ? Uint8Array.from(atob(data[blob]), c => c.charCodeAt(0)) : null;
+    const size = 1 + fields.reduce((n, f) => n + (f === 'progressPercent' ? 1 : 4), 0) + (blobBytes ? blobBytes.length : 0);
+    const view = new DataView(new ArrayBuffer(size));
+    view.setUint8(0, opcode);
+    let offset = 1;
+    for (const field of fields) {
+        const value = field === 'taskHash' ? deviceTaskHash(data.taskId) : Math.max(0, Math.round(data[field] || 0));
+        if (field === 'progressPercent') {
+            view.setUint8(offset, Math.min(255, value));
+            offset += 1;
+        } else {
+            view.setUint32(offset, value);
+            offset += 4;
+        }
+    }
+    if (blobBytes) {
+        new Uint8Array(view.buffer, offset).set(blobBytes);
+    }
+    return view.buffer;
+}
+
+// 用浏览器的字体把任务标题渲染成设备的单色位图（居中，过长时截断并加省略号），返回base64字符串
+function renderDeviceTitle(title) {
+    const canvas = document.createElement('canvas');
+    canvas.width = DEVICE_TITLE_WIDTH;
+    canvas.height = DEVICE_TITLE_HEIGHT;
+    const ctx = canvas.getContext('2d');
+    ctx.fillStyle = '#000';
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    ctx.font = `${DEVICE_TITLE_HEIGHT}px sans-serif`;
+    ctx.textBaseline = 'middle';
+    let text = title;
+    if (ctx.measureText(text).width > canvas.width) {
+        while (text.length > 1 && ctx.measureText(text + '…').width > canvas.width) {
+            text = text.slice(0, -1);
+        }
+        text += '…';
+    }
+    ctx.fillStyle = '#fff';
+    ctx.fillText(text, Math.max(0, (canvas.width - ctx.measureText(text).width) / 2), canvas.height / 2);
+    const pixels = ctx.getImageData(0, 0, canvas.width, canvas.height).data;
+    const bytes = new Uint8Array(DEVICE_TITLE_BYTES);
+    for (let y = 0; y < canvas.height; y++) {
+        for (let x = 0; x < canvas.width; x++) {
+            if (pixels[(y * canvas.width + x) * 4] >= 128) {
+                bytes[(y >> 3) * canvas.width + x] |= 1 << (y & 7);
+            }
+        }
+    }
+    return btoa(String.fromCharCode(...bytes));
+}
+
+// 把任务标题推送到设备的缓存
+function pushTaskTitle(task) {
+    deviceTitles.set(String(task.id), task.title);
+    const taskId = task.id;
+    const bitmap = renderDeviceTitle(task.title);
+    const binary = encodeDeviceCommand({ type: 'task_title', taskId: taskId, bitmap: bitmap });
+    wsConnection.send(wsConnection.protocol === DEVICE_BINARY_PROTOCOL ? binary
+        : JSON.stringify({ type: 'task_title', taskId: taskId, title: task.title, bitmap: bitmap }));
+    console.log('🏷️ 已推送任务标题:', task.title);
+}
+
+// 设备请求任务标题：按taskHash找到任务后推送
+function onDeviceTitleRequest(taskHash) {
+    const task = taskList.find(t => t.title && deviceTaskHash(t.id) === taskHash);
+    if (task && wsConnection && wsConnection.readyState === WebSocket.OPEN) {
+        pushTaskTitle(task);
+    }
+}
+
+// 开始/继续计时前，本次连接推送过的任务改了名时推送新标题，替换设备上缓存的旧标题；
+// 设备上没有的标题由设备发来请求后再推送
+function refreshTaskTitle(taskId) {
+    const task = taskList.find(t => String(t.id) === String(taskId));
+    const pushed = deviceTitles.get(String(taskId));
+    if (task && task.title && pushed !== undefined && pushed !== task.title) {
+        pushTaskTitle(task);
+    }
+}
+
 // 发送数据到设备
 function sendToDevice(data) {
     console.log('🔔 尝试发送数据到设备:', data);
@@ -240,7 +419,11 @@ function sendToDevice(data) {
     
     if (wsConnection && wsConnection.readyState === WebSocket.OPEN) {
         console.log('📤 发送数据:', JSON.stringify(data));
-        wsConnection.send(JSON.stringify(data));
+        if ((data.type === 'start' || data.type === 'resume') && data.taskId) {
+            refreshTaskTitle(data.taskId);
+        }
+        const binary = wsConnection.protocol === DEVICE_BINARY_PROTOCOL ? encodeDeviceCommand(data) : null;
+        wsConnection.send(binary || JSON.stringify(data));
         console.log('✅ 数据已发送到设备');
         return true;
     } else {
@@ -0,0 +1,179 @@
+# 启动时间测试：测量从启动到服务器接受第一个连接的时间，并读取固件 GET /boot 记录的各阶段耗时。
+# - 开发板：--host 指定地址，每一轮先POST /reboot（需要在线更新的密钥），再反复探测/ping直到重新响应；
+#   板子上ticks_us从复位开始计数，/boot中的startedUs加各阶段耗时就是从复位算起的时间。
+#   分别部署.py源码和 tools/build_mpy.py 生成的.mpy各测一次，用--baseline对比
+# - 仿真固件（不指定--host）：每一轮启动一个新的仿真进程，测量从启动进程到/ping响应的时间；
+#   --no-cache 每次使用空的字节码缓存，近似板子上从.py源码编译的情况（对应.mpy预编译）
+# 用法：python tools/bench_boot.py --host 192.168.4.1 --key-file ota.key --runs 5 --out boot_mpy.json --baseline boot_py.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from wsclient import http_get
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(host, port, timeout, interval):
+    # 反复探测/ping，返回第一次成功时的perf_counter
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            status, _ = await http_get(host, port, "/ping", timeout=1.0)
+            if status == 200:
+                return time.perf_counter()
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(interval)
+    raise RuntimeError("{}秒内没有响应".format(timeout))
+
+
+async def wait_down(host, port, timeout, interval):
+    # 等待设备停止响应（重启命令回复后设备会延迟一段时间再复位）
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await http_get(host, port, "/ping", timeout=0.5)
+        except (OSError, asyncio.TimeoutError):
+            return time.perf_counter()
+        await asyncio.sleep(interval)
+    raise RuntimeError("{}秒内没有重启".format(timeout))
+
+
+async def boot_report(host, port):
+    status, body = await http_get(host, port, "/boot", timeout=5.0)
+    return json.loads(body) if status == 200 else None
+
+
+async def reboot(host, port, key):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), 5.0)
+    writer.write(("POST /reboot HTTP/1.1\r\nHost: {}:{}\r\nX-Update-Token: {}\r\n"
+                  "Content-Length: 0\r\nConnection: close\r\n\r\n").format(host, port, key).encode())
+    await writer.drain()
+    data = await asyncio.wait_for(reader.read(), 5.0)
+    writer.close()
+    if b" 200 " not in data.split(b"\r\n", 1)[0]:
+        raise RuntimeError("重启请求失败: {}".format(data.split(b"\r\n", 1)[0].decode()))
+
+
+async def run_device(args, key):
+    runs = []
+    for _ in range(args.runs):
+        await reboot(args.host, args.port, key)
+        down = await wait_down(args.host, args.port, 10.0, 0.05)
+        ready = await wait_ready(args.host, args.port, args.timeout, 0.05)
+        runs.append({"wallMs": round((ready - down) * 1000, 1), "boot": await boot_report(args.host, args.port)})
+    return runs
+
+
+async def run_emulator(args):
+    runs = []
+    for i in range(args.runs):
+        env = dict(os.environ)
+        cache = None
+        if args.no_cache:
+            cache = tempfile.TemporaryDirectory()
+            env["PYTHONPYCACHEPREFIX"] = cache.name
+        port = args.port + i
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "esp32s3.host", "--port", str(port), "--log-level", "error"],
+            cwd=LIFEFLOW_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ready = await wait_ready("127.0.0.1", port, args.timeout, 0.005)
+            runs.append({"wallMs": round((ready - t0) * 1000, 1), "boot": await boot_report("127.0.0.1", port)})
+        finally:
+            proc.terminate()
+            proc.wait()
+            if cache is not None:
+                cache.cleanup()
+    return runs
+
+
+def summarize(runs):
+    # 各阶段取中位数：phases为从main.py开始导入算起的微秒数，sinceReset为加上startedUs后的值
+    result = {"wallMs": statistics.median(r["wallMs"] for r in runs)}
+    boots = [r["boot"] for r in runs if r["boot"]]
+    if boots:
+        names = [name for name, _ in boots[0]["phases"]]
+        result["phasesMs"] = {name: round(statistics.median(
+            dict(b["phases"])[name] for b in boots) / 1000, 2) for name in names}
+        result["startedMs"] = round(statistics.median(b["startedUs"] for b in boots) / 1000, 2)
+        accepts = [b["firstAcceptUs"] for b in boots if b["firstAcceptUs"] is not None]
+        if accepts:
+            result["firstAcceptMs"] = round(statistics.median(accepts) / 1000, 2)
+    return result
+
+
+def print_report(result, baseline=None):
+    base = (baseline or {}).get("summary", {})
+
+    def row(name, value, previous):
+        note = "" if previous is None else "   (基线 {})".format(previous)
+        print("{:<20} {:>10}{}".format(name, value, note))
+
+    summary = result["summary"]
+    print("{:<20} {:>10}".format("中位数(ms)", result["target"]))
+    row("启动到响应/ping", summary["wallMs"], base.get("wallMs"))
+    if "startedMs" in summary:
+        row("开始执行main.py", summary["startedMs"], base.get("startedMs"))
+    for name, value in summary.get("phasesMs", {}).items():
+        row("  " + name, value, base.get("phasesMs", {}).get(name))
+    if "firstAcceptMs" in summary:
+        row("  第一个连接", summary["firstAcceptMs"], base.get("firstAcceptMs"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量固件启动到接受第一个连接的时间")
+    parser.add_argument("--host", default=None, help="设备地址，不指定则测试本机仿真固件")
+    parser.add_argument("--port", type=int, default=None, help="设备端口（默认80，仿真固件从18300开始）")
+    parser.add_argument("--key", default=os.environ.get("LIFEFLOW_OTA_KEY"), help="在线更新密钥，用于重启设备")
+    parser.add_argument("--key-file", default=None)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="等待重新响应的最长秒数")
+    parser.add_argument("--no-cache", action="store_true", help="仿真固件每次从源码编译（不使用字节码缓存）")
+    parser.add_argument("--out", default="bench_boot.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="上一次的结果JSON，输出对比")
+    args = parser.parse_args()
+
+    if args.host is None:
+        args.port = args.port or 18300
+        runs = asyncio.run(run_emulator(args))
+        target = "emulator" + ("-nocache" if args.no_cache else "")
+    else:
+        args.port = args.port or 80
+        key = args.key
+        if args.key_file:
+            with open(args.key_file) as f:
+                key = f.read().strip()
+        if not key:
+            parser.error("测试开发板需要--key或--key-file")
+        runs = asyncio.run(run_device(args, key))
+        target = "{}:{}".format(args.host, args.port)
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": target,
+        "host": platform.node(),
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    with open(args.out, "w") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print("结果已写入 {}".format(args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# 测试文档生成的性能对比：python-docx对象模型构建与流式写入，分别生成不同页数的测试文档和会议记录，
+# 每次在独立的子进程中运行，统计耗时、每秒页数、子进程的内存峰值（RSS）和文件大小。
+# 同时用python-docx读取两种方式生成的同页数文档，逐段比较正文XML（规范化后）是否完全一致
+# 用法：python tools/bench_docx.py --pages 10 100 1000 [--skip-python-docx-above 1000]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATED = datetime(2025, 1, 1, 9, 30, 0)
+
+BUILDERS = {
+    "test": ("generate_test_docx", "build_doc", "write_doc"),
+    "minutes": ("generate_meeting_minutes_docx", "build_minutes", "write_minutes"),
+}
+
+
+def peak_rss_mb():
+    # Linux上读取本进程地址空间的VmHWM（exec后重新计数）；ru_maxrss会继承fork前父进程的峰值
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(kind, method, pages, path):
+    # 在子进程中生成一个文档，输出JSON结果
+    import importlib
+    module_name, build_name, write_name = BUILDERS[kind]
+    module = importlib.import_module(module_name)
+    if method == "python-docx":
+        import docx  # noqa: F401  导入时间不计入
+    t0 = time.perf_counter()
+    if method == "python-docx":
+        getattr(module, build_name)(pages, GENERATED).save(path)
+    else:
+        getattr(module, write_name)(path, pages, GENERATED)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "seconds": elapsed,
+        "peakRssMb": peak_rss_mb(),
+        "bytes": os.path.getsize(path),
+    }))
+
+
+def run_child(kind, method, pages, path):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", kind, method, str(pages), path],
+                            cwd=TOOLS_DIR, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def body_xml(path):
+    # python-docx读取后正文各元素的规范化XML（只保留用到的命名空间声明）
+    from docx import Document
+    from lxml import etree
+    body = Document(path).element.body
+    return [etree.tostring(el, method="c14n", exclusive=True) for el in body.iterchildren()]
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5])
+        return 0
+
+    parser = argparse.ArgumentParser(description="对比python-docx构建与流式写入测试DOCX的性能")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--skip-python-docx-above", type=int, default=None,
+                        help="超过该页数时不运行python-docx（太慢时使用）")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    mismatches = 0
+    print("{:<8} {:>7} {:<12} {:>8} {:>10} {:>10} {:>12}".format(
+        "文档", "页数", "方式", "耗时(s)", "页/秒", "RSS峰值MB", "文件字节"))
+    for kind in BUILDERS:
+        for pages in args.pages:
+            paths = {}
+            for method in ("python-docx", "stream"):
+                if method == "python-docx" and args.skip_python_docx_above and pages > args.skip_python_docx_above:
+                    continue
+                path = os.path.join(tmp.name, "{}_{}_{}.docx".format(kind, pages, method))
+                result = run_child(kind, method, pages, path)
+                paths[method] = path
+                print("{:<8} {:>7} {:<12} {:>8.2f} {:>10.0f} {:>10.1f} {:>12}".format(
+                    kind, pages, method, result["seconds"], pages / result["seconds"], result["peakRssMb"],
+                    result["bytes"]))
+            if len(paths) == 2:
+                expected = body_xml(paths["python-docx"])
+                actual = body_xml(paths["stream"])
+                if expected != actual:
+                    mismatches += 1
+                    diff = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+                    print("  ❌ 正文不一致：{}个元素对{}个，第{}个开始不同".format(len(expected), len(actual), diff))
+                    if diff < min(len(expected), len(actual)):
+                        print("     python-docx: {}\n     stream:      {}".format(expected[diff][:200], actual[diff][:200]))
+            os.remove(paths["stream"])
+            if "python-docx" in paths:
+                os.remove(paths["python-docx"])
+    tmp.cleanup()
+    print("正文XML一致性: {}".format("全部一致" if not mismatches else "{}组不一致".format(mismatches)))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
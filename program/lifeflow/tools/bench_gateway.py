@@ -0,0 +1,207 @@
+# 网关负载测试：在一个进程中运行N份仿真固件作为设备，启动网关连接全部设备，
+# 再由若干个模拟浏览器通过网关控制设备：每台设备start后每秒发送progress（可以有多个浏览器同时发送，
+# 像手机和电脑同时打开页面），最后stop。统计：
+# - 网关连上全部设备的时间、网关进程的CPU占用（来自网关的/stats）
+# - 浏览器发出的命令数、实际转发给设备的消息数、被合并的进度消息数
+# - start/stop命令到浏览器收到对应state_changed事件的延迟
+# - 重启全部设备后网关按退避重连回来的时间
+# 用法：python tools/bench_gateway.py --devices 200 --duration 20
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_ping_latency import percentile
+from wsclient import WebSocketClient, WebSocketClosed, http_get
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(LIFEFLOW_DIR, "tools")
+
+
+def start_farm(base_port, count):
+    return subprocess.Popen(
+        [sys.executable, "-m", "esp32s3.host", "--port", str(base_port), "--instances", str(count),
+         "--no-oled", "--log-level", "error"],
+        cwd=LIFEFLOW_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_gateway(port, devices_file):
+    return subprocess.Popen(
+        [sys.executable, os.path.join(TOOLS_DIR, "gateway.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--devices", devices_file],
+        cwd=TOOLS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop(proc):
+    proc.terminate()
+    proc.wait()
+
+
+async def wait_http(port, path="/ping", timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            status, body = await http_get("127.0.0.1", port, path, timeout=2.0)
+            if status == 200:
+                return body
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("端口{}没有响应".format(port))
+
+
+async def gateway_stats(port):
+    _, body = await http_get("127.0.0.1", port, "/stats", timeout=5.0)
+    return json.loads(body)
+
+
+async def wait_connected(port, count, timeout=180.0):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if (await gateway_stats(port))["connected"] >= count:
+            return time.perf_counter() - t0
+        await asyncio.sleep(0.2)
+    raise RuntimeError("{}秒内没有连上全部设备".format(timeout))
+
+
+class Browser:
+    def __init__(self, ws, owned, watched):
+        self.ws = ws
+        self.owned = owned  # 由这个浏览器start/stop的设备
+        self.watched = watched  # 这个浏览器发送progress的设备
+        self.pending = {}  # (设备ID, 期望的状态) -> 发送时间
+        self.latencies = {"start": [], "stop": []}
+        self.events = 0
+
+    async def reader(self):
+        try:
+            while True:
+                message = await self.ws.recv_json()
+                if "device" not in message:
+                    continue
+                self.events += 1
+                key = (message["device"], message.get("state"))
+                sent = self.pending.pop(key, None)
+                if sent is not None and message.get("type") == "state_changed":
+                    kind = "start" if key[1] == "running" else "stop"
+                    self.latencies[kind].append((time.perf_counter() - sent) * 1000)
+        except WebSocketClosed:
+            pass
+
+    async def command(self, device_id, msg_type, expect, **fields):
+        self.pending[(device_id, expect)] = time.perf_counter()
+        await self.ws.send_json(dict(fields, type=msg_type, device=device_id))
+
+
+async def run_browsers(port, device_ids, browsers, controllers, duration, total_seconds):
+    sessions = []
+    for i in range(browsers):
+        owned = device_ids[i::browsers]
+        watched = [device_ids[(j + k) % len(device_ids)]
+                   for j in range(i, len(device_ids), browsers) for k in range(controllers)]
+        ws = await WebSocketClient.connect("127.0.0.1", port)
+        await ws.send_json({"type": "subscribe", "devices": sorted(set(owned) | set(watched))})
+        await ws.recv_json()
+        sessions.append(Browser(ws, owned, watched))
+    readers = [asyncio.ensure_future(b.reader()) for b in sessions]
+
+    for b in sessions:
+        for device_id in b.owned:
+            await b.command(device_id, "start", "running", totalSeconds=total_seconds, taskId="bench")
+    t0 = time.perf_counter()
+    sent = 0
+    for second in range(1, duration + 1):
+        remaining = total_seconds - second
+        for b in sessions:
+            for device_id in b.watched:
+                await b.ws.send_json({"type": "progress", "device": device_id, "remainingSeconds": remaining,
+                                      "elapsedSeconds": second, "progressPercent": second * 100 // total_seconds,
+                                      "timestamp": int(time.time() * 1000)})
+                sent += 1
+        delay = t0 + second - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    for b in sessions:
+        for device_id in b.owned:
+            await b.command(device_id, "stop", "idle")
+    await asyncio.sleep(2.0)
+    for b in sessions:
+        await b.ws.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+    latencies = {"start": [], "stop": []}
+    for b in sessions:
+        for kind in latencies:
+            latencies[kind] += b.latencies[kind]
+    return latencies, sent, sum(b.events for b in sessions)
+
+
+async def bench(args):
+    base_port = args.base_port
+    device_ids = ["dev{:03d}".format(i) for i in range(args.devices)]
+    tmp = tempfile.TemporaryDirectory()
+    devices_file = os.path.join(tmp.name, "devices.json")
+    with open(devices_file, "w") as f:
+        json.dump({d: "127.0.0.1:{}".format(base_port + i) for i, d in enumerate(device_ids)}, f)
+
+    farm = start_farm(base_port, args.devices)
+    gateway = None
+    try:
+        await wait_http(base_port + args.devices - 1)
+        gateway = start_gateway(args.port, devices_file)
+        await wait_http(args.port)
+        connect_s = await wait_connected(args.port, args.devices)
+        print("网关连上{}台设备用时 {:.2f} 秒".format(args.devices, connect_s))
+
+        before = await gateway_stats(args.port)
+        latencies, sent, events = await run_browsers(
+            args.port, device_ids, args.browsers, args.controllers, args.duration, args.total_seconds)
+        after = await gateway_stats(args.port)
+        wall = after["uptimeSeconds"] - before["uptimeSeconds"]
+        cpu = after["cpuSeconds"] - before["cpuSeconds"]
+        diff = {k: after[k] - before[k] for k in ("commands", "forwarded", "coalesced", "events", "fanout")}
+        print("负载阶段 {:.1f} 秒：浏览器{}个，每台设备{}个浏览器发送进度".format(wall, args.browsers, args.controllers))
+        print("  网关CPU {:.2f} 秒（单核占用 {:.0f}%）".format(cpu, cpu / wall * 100 if wall else 0))
+        print("  浏览器命令 {}（其中进度 {}），转发给设备 {}，合并的进度 {}".format(
+            diff["commands"], sent, diff["forwarded"], diff["coalesced"]))
+        print("  设备事件 {}，转发给浏览器 {}，浏览器收到 {}".format(diff["events"], diff["fanout"], events))
+        for kind in ("start", "stop"):
+            values = latencies[kind]
+            print("  {} -> state_changed 延迟: {}条 p50 {:.1f}ms p95 {:.1f}ms p99 {:.1f}ms".format(
+                kind, len(values), percentile(values, 50), percentile(values, 95), percentile(values, 99)))
+
+        if args.restart:
+            stop(farm)
+            await asyncio.sleep(1.0)
+            t0 = time.perf_counter()
+            farm = start_farm(base_port, args.devices)
+            reconnect_s = await wait_connected(args.port, args.devices)
+            stats = await gateway_stats(args.port)
+            print("重启全部设备后 {:.2f} 秒内全部重连（累计重连{}次）".format(
+                time.perf_counter() - t0, stats["reconnects"]))
+    finally:
+        if gateway is not None:
+            stop(gateway)
+        stop(farm)
+        tmp.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多设备网关负载测试（使用仿真固件）")
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--browsers", type=int, default=20)
+    parser.add_argument("--controllers", type=int, default=2, help="每台设备同时发送进度的浏览器数")
+    parser.add_argument("--duration", type=int, default=20, help="发送进度的秒数")
+    parser.add_argument("--total-seconds", type=int, default=1500)
+    parser.add_argument("--base-port", type=int, default=19000, help="仿真设备的起始端口")
+    parser.add_argument("--port", type=int, default=18765, help="网关端口")
+    parser.add_argument("--no-restart", dest="restart", action="store_false", help="跳过重启设备的重连测试")
+    args = parser.parse_args()
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
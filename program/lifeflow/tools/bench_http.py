@@ -0,0 +1,91 @@
+# 测量/ping的每秒请求数：每个请求新建连接（Connection: close）与在同一连接上keep-alive连续请求
+# 默认启动本机仿真固件；--host/--port指向开发板时直接测试真实设备
+import argparse
+import asyncio
+import time
+
+from bench_ping_latency import percentile, start_emulator
+
+REQUEST = "GET /ping HTTP/1.1\r\nHost: {}\r\nConnection: {}\r\n\r\n"
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    if length:
+        await reader.readexactly(length)
+    return int(head.split(b" ", 2)[1])
+
+
+async def run_close(host, port, requests, latencies):
+    payload = REQUEST.format(host, "close").encode()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(payload)
+        await writer.drain()
+        await read_response(reader)
+        writer.close()
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run_keepalive(host, port, requests, latencies):
+    payload = REQUEST.format(host, "keep-alive").encode()
+    reader, writer = await asyncio.open_connection(host, port)
+    for i in range(requests):
+        # 设备每个连接最多处理一定数量的请求，之后关闭，这里重新连接
+        if reader.at_eof():
+            writer.close()
+            reader, writer = await asyncio.open_connection(host, port)
+        t0 = time.perf_counter()
+        writer.write(payload)
+        await writer.drain()
+        try:
+            await read_response(reader)
+        except asyncio.IncompleteReadError:
+            writer.close()
+            reader, writer = await asyncio.open_connection(host, port)
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+    writer.close()
+
+
+async def measure(mode, host, port, clients, requests):
+    latencies = []
+    runner = run_close if mode == "close" else run_keepalive
+    t0 = time.perf_counter()
+    await asyncio.gather(*[runner(host, port, requests, latencies) for _ in range(clients)])
+    elapsed = time.perf_counter() - t0
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/ping每秒请求数：新建连接 vs keep-alive")
+    parser.add_argument("--host", default=None, help="设备地址，不指定则启动本机仿真固件")
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="每个客户端的请求数")
+    args = parser.parse_args()
+
+    proc = None
+    host = args.host
+    if host is None:
+        host = "127.0.0.1"
+        proc = start_emulator(args.port)
+    try:
+        print("{:<12} {:>10} {:>10} {:>10}".format("连接方式", "请求/秒", "p50(ms)", "p95(ms)"))
+        for mode in ("close", "keep-alive"):
+            rps, latencies = asyncio.run(measure(mode, host, args.port, args.clients, args.requests))
+            print("{:<12} {:>10.0f} {:>10.2f} {:>10.2f}".format(
+                mode, rps, percentile(latencies, 50), percentile(latencies, 95)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
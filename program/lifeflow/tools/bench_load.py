@@ -0,0 +1,317 @@
+# 设备服务器负载测试：按focusInChat.js/chat-new.js发送消息的方式模拟多个浏览器，
+# 每个客户端循环执行 start → 每秒progress → pause → resume → progress → stop，
+# 以及 break_start → break_progress → break_pause → break_resume → break_progress → break_complete，
+# 同时按给定频率发送 /ping 探测，可选定时让一部分客户端同时断开重连（重连风暴）。
+# 统计每类消息的确认延迟分位数、解析错误率、吞吐量和/ping延迟，结果写入JSON文件，
+# 用 --baseline 指定上一次的结果文件时输出对比
+# 默认启动本机仿真固件；--host/--port指向开发板时直接测试真实设备
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+
+from bench_ping_latency import percentile, start_emulator
+from wsclient import WebSocketClient, WebSocketClosed, http_get
+
+PERCENTILES = (50, 90, 99)
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    result = {"count": len(values)}
+    for pct in PERCENTILES:
+        result["p{}".format(pct)] = round(percentile(values, pct), 3)
+    result["max"] = round(max(values), 3)
+    return result
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}  # 消息类型 -> 确认延迟（毫秒）
+        self.sent = 0
+        self.acked = 0
+        self.parse_errors = 0
+        self.lost = 0  # 连接断开时还没有收到确认的消息
+        self.events = {}
+        self.connects = []
+        self.connect_failures = 0
+        self.pings = []
+        self.ping_failures = 0
+
+
+class Client:
+    def __init__(self, index, args, stats):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.rnd = random.Random(args.seed * 1000 + index)
+        self.ws = None
+        self.reader = None
+        self.waiting = []  # 已发送、等待确认的(类型, 发送时间)，设备按顺序确认
+        self.storm = False
+
+    async def connect(self):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                self.ws = await WebSocketClient.connect(self.args.host, self.args.port, timeout=self.args.timeout)
+                self.stats.connects.append((time.perf_counter() - t0) * 1000)
+                self.reader = asyncio.ensure_future(self.read())
+                return
+            except (OSError, asyncio.TimeoutError, ConnectionError):
+                self.stats.connect_failures += 1
+                await asyncio.sleep(0.5)
+
+    async def disconnect(self):
+        if self.ws is None:
+            return
+        await self.ws.close()
+        self.reader.cancel()
+        await asyncio.gather(self.reader, return_exceptions=True)
+        self.stats.lost += len(self.waiting)
+        self.waiting.clear()
+        self.ws = None
+
+    async def read(self):
+        try:
+            while True:
+                opcode, payload = await self.ws.recv_frame()
+                if opcode == 0x9:
+                    await self.ws.send_frame(0xA, payload)
+                    continue
+                if opcode != 0x1:
+                    continue
+                message = json.loads(payload)
+                if "status" not in message:
+                    name = message.get("type")
+                    self.stats.events[name] = self.stats.events.get(name, 0) + 1
+                    continue
+                if not self.waiting:
+                    continue
+                msg_type, sent = self.waiting.pop(0)
+                self.stats.acked += 1
+                if message["status"] == "error":
+                    self.stats.parse_errors += 1
+                    continue
+                self.stats.latencies.setdefault(msg_type, []).append((time.perf_counter() - sent) * 1000)
+        except (WebSocketClosed, OSError):
+            pass
+
+    async def send(self, message):
+        if self.storm:
+            # 重连风暴：断开后立即重连，继续执行脚本（前端重连后下一条进度消息会重新同步设备）
+            self.storm = False
+            await self.disconnect()
+            await self.connect()
+        if self.args.bad_rate and self.rnd.random() < self.args.bad_rate:
+            data = json.dumps(message)[:-3]
+            msg_type = "malformed"
+        else:
+            data = json.dumps(message)
+            msg_type = message["type"]
+        self.waiting.append((msg_type, time.perf_counter()))
+        self.stats.sent += 1
+        try:
+            await self.ws.send_text(data)
+        except (OSError, ConnectionError):
+            self.storm = True
+
+    async def tick(self):
+        await asyncio.sleep(1 / self.args.rate)
+
+    async def progress(self, msg_type, total, remaining, steps):
+        for _ in range(steps):
+            await self.tick()
+            remaining -= 1
+            elapsed = total - remaining
+            await self.send({"type": msg_type, "remainingSeconds": remaining,
+                             "progressPercent": round(elapsed * 100 / total), "elapsedSeconds": elapsed,
+                             "timestamp": int(time.time() * 1000)})
+        return remaining
+
+    # 一轮专注：与startFocus()/pauseFocus()/resetFocus()发送的消息相同
+    async def focus_cycle(self):
+        total = self.args.focus_minutes * 60
+        steps = self.args.phase
+        message = {"type": "start", "duration": self.args.focus_minutes, "totalSeconds": total,
+                   "remainingSeconds": total, "taskId": "load-{}".format(self.index),
+                   "timestamp": int(time.time() * 1000)}
+        await self.send(message)
+        remaining = await self.progress("progress", total, total, steps)
+        await self.send({"type": "pause", "remainingSeconds": remaining, "timestamp": int(time.time() * 1000)})
+        await self.tick()
+        await self.send(dict(message, type="resume", remainingSeconds=remaining, timestamp=int(time.time() * 1000)))
+        await self.progress("progress", total, remaining, steps)
+        await self.send({"type": "stop", "timestamp": int(time.time() * 1000)})
+
+    # 一轮休息：与startBreak()等发送的消息相同
+    async def break_cycle(self):
+        total = self.args.break_minutes * 60
+        steps = self.args.phase
+        await self.send({"type": "break_start", "duration": self.args.break_minutes, "totalSeconds": total,
+                         "remainingSeconds": total, "timestamp": int(time.time() * 1000)})
+        remaining = await self.progress("break_progress", total, total, steps)
+        await self.send({"type": "break_pause", "remainingSeconds": remaining, "timestamp": int(time.time() * 1000)})
+        await self.tick()
+        await self.send({"type": "break_resume", "remainingSeconds": remaining, "timestamp": int(time.time() * 1000)})
+        await self.progress("break_progress", total, remaining, steps)
+        await self.send({"type": "break_complete", "timestamp": int(time.time() * 1000)})
+
+    async def run(self, deadline):
+        # 客户端错开启动，避免所有消息在同一时刻到达
+        await asyncio.sleep(self.rnd.random() / self.args.rate)
+        await self.connect()
+        await self.send({"type": "status", "status": "ready", "message": "设备已连接"})
+        while time.perf_counter() < deadline:
+            if self.args.scenario in ("focus", "mixed"):
+                await self.focus_cycle()
+            if time.perf_counter() >= deadline:
+                break
+            if self.args.scenario in ("break", "mixed"):
+                await self.break_cycle()
+        # 等待最后几条确认
+        for _ in range(50):
+            if not self.waiting:
+                break
+            await asyncio.sleep(0.05)
+        await self.disconnect()
+
+
+async def pinger(args, stats, deadline):
+    if not args.ping_rate:
+        return
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status, _ = await http_get(args.host, args.port, "/ping", timeout=args.timeout)
+            if status == 200:
+                stats.pings.append((time.perf_counter() - t0) * 1000)
+            else:
+                stats.ping_failures += 1
+        except (OSError, asyncio.TimeoutError):
+            stats.ping_failures += 1
+        await asyncio.sleep(max(0.0, 1 / args.ping_rate - (time.perf_counter() - t0)))
+
+
+async def storms(args, clients, deadline):
+    if not args.storm_every:
+        return
+    rnd = random.Random(args.seed)
+    while True:
+        await asyncio.sleep(args.storm_every)
+        if time.perf_counter() >= deadline:
+            return
+        for client in rnd.sample(clients, max(1, int(len(clients) * args.storm_fraction))):
+            client.storm = True
+
+
+async def run(args):
+    stats = Stats()
+    clients = [Client(i, args, stats) for i in range(args.clients)]
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    await asyncio.gather(pinger(args, stats, deadline), storms(args, clients, deadline),
+                         *[client.run(deadline) for client in clients])
+    return stats, time.perf_counter() - t0
+
+
+def report(args, stats, elapsed):
+    all_latencies = [v for values in stats.latencies.values() for v in values]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": "emulator" if args.emulator else "{}:{}".format(args.host, args.port),
+        "host": platform.node(),
+        "config": {k: getattr(args, k) for k in (
+            "clients", "duration", "rate", "scenario", "phase", "ping_rate", "storm_every",
+            "storm_fraction", "bad_rate", "seed")},
+        "elapsedSeconds": round(elapsed, 3),
+        "sent": stats.sent,
+        "acked": stats.acked,
+        "lost": stats.lost,
+        "throughput": round(stats.acked / elapsed, 1) if elapsed else 0,
+        "parseErrors": stats.parse_errors,
+        "parseErrorRate": round(stats.parse_errors / stats.acked, 5) if stats.acked else 0,
+        "ackLatencyMs": summarize(all_latencies),
+        "ackLatencyByType": {k: summarize(v) for k, v in sorted(stats.latencies.items())},
+        "events": stats.events,
+        "connects": len(stats.connects),
+        "connectFailures": stats.connect_failures,
+        "connectLatencyMs": summarize(stats.connects),
+        "pingLatencyMs": summarize(stats.pings),
+        "pingFailures": stats.ping_failures,
+    }
+
+
+def print_report(result, baseline=None):
+    def row(name, current, previous):
+        if previous is None or not current.get("count") or not previous.get("count"):
+            print("{:<16} {:>7} {:>9} {:>9} {:>9}".format(
+                name, current.get("count", 0), current.get("p50", "-"), current.get("p90", "-"), current.get("p99", "-")))
+            return
+        print("{:<16} {:>7} {:>9} {:>9} {:>9}   (基线 p50 {} p99 {})".format(
+            name, current["count"], current["p50"], current["p90"], current["p99"], previous["p50"], previous["p99"]))
+
+    base = baseline or {}
+    print("{:<16} {:>7} {:>9} {:>9} {:>9}".format("确认延迟(ms)", "数量", "p50", "p90", "p99"))
+    row("全部", result["ackLatencyMs"], base.get("ackLatencyMs"))
+    for name, values in result["ackLatencyByType"].items():
+        row(name, values, base.get("ackLatencyByType", {}).get(name))
+    row("/ping", result["pingLatencyMs"], base.get("pingLatencyMs"))
+    print("发送{}条，确认{}条，断开时丢失{}条，吞吐量{}条/秒{}".format(
+        result["sent"], result["acked"], result["lost"], result["throughput"],
+        "（基线{}）".format(base["throughput"]) if "throughput" in base else ""))
+    print("解析错误{}条（{:.3%}），连接{}次（失败{}次），/ping失败{}次".format(
+        result["parseErrors"], result["parseErrorRate"], result["connects"], result["connectFailures"],
+        result["pingFailures"]))
+    print("设备事件: {}".format(", ".join("{} {}".format(k, v) for k, v in sorted(result["events"].items()))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟前端消息的设备服务器负载测试")
+    parser.add_argument("--host", default=None, help="设备地址，不指定则启动本机仿真固件")
+    parser.add_argument("--port", type=int, default=18082)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0, help="测试秒数")
+    parser.add_argument("--rate", type=float, default=1.0, help="每个客户端每秒发送的进度消息数（前端为1）")
+    parser.add_argument("--scenario", choices=("focus", "break", "mixed"), default="mixed")
+    parser.add_argument("--phase", type=int, default=10, help="每个计时阶段发送的进度消息数")
+    parser.add_argument("--focus-minutes", type=int, default=25)
+    parser.add_argument("--break-minutes", type=int, default=5)
+    parser.add_argument("--ping-rate", type=float, default=1.0, help="每秒/ping探测次数，0为不探测")
+    parser.add_argument("--storm-every", type=float, default=0, help="每隔多少秒触发一次重连风暴，0为不触发")
+    parser.add_argument("--storm-fraction", type=float, default=0.5, help="每次重连的客户端比例")
+    parser.add_argument("--bad-rate", type=float, default=0.0, help="发送截断JSON的比例，用于检查解析错误处理")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="bench_load.json", help="结果JSON文件")
+    parser.add_argument("--baseline", default=None, help="上一次的结果JSON，输出对比")
+    args = parser.parse_args()
+
+    args.emulator = args.host is None
+    proc = None
+    if args.emulator:
+        args.host = "127.0.0.1"
+        proc = start_emulator(args.port)
+    try:
+        stats, elapsed = asyncio.run(run(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    result = report(args, stats, elapsed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    with open(args.out, "w") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print("结果已写入 {}".format(args.out))
+
+
+if __name__ == "__main__":
+    main()
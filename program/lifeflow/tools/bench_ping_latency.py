@@ -0,0 +1,107 @@
+# 测量设备服务器在N个WebSocket客户端持续发送progress消息时的/ping延迟
+# 默认启动本机仿真固件；--host/--port指向开发板时直接测试真实设备
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from wsclient import WebSocketClient, http_get
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def streaming_client(host, port, rate, stop, counter):
+    ws = await WebSocketClient.connect(host, port)
+    await ws.send_json({"type": "start", "duration": 25, "totalSeconds": 1500, "taskId": "bench"})
+    remaining = 1500
+    try:
+        while not stop.is_set():
+            remaining -= 1
+            await ws.send_json({
+                "type": "progress",
+                "remainingSeconds": remaining,
+                "progressPercent": (1500 - remaining) * 100 // 1500,
+                "elapsedSeconds": 1500 - remaining,
+                "timestamp": int(time.time() * 1000),
+            })
+            counter[0] += 1
+            await asyncio.sleep(1 / rate)
+    finally:
+        await ws.close()
+
+
+async def run(host, port, clients, rate, duration, ping_interval):
+    stop = asyncio.Event()
+    counter = [0]
+    tasks = [asyncio.create_task(streaming_client(host, port, rate, stop, counter)) for _ in range(clients)]
+    await asyncio.sleep(0.5)
+
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status, _ = await http_get(host, port, "/ping", timeout=5.0)
+            if status != 200:
+                failures += 1
+            else:
+                latencies.append((time.perf_counter() - t0) * 1000)
+        except Exception:
+            failures += 1
+        await asyncio.sleep(ping_interval)
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, failures, counter[0]
+
+
+def start_emulator(port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "esp32s3.host", "--port", str(port)],
+        cwd=LIFEFLOW_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.5)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket负载下的/ping延迟测试")
+    parser.add_argument("--host", default=None, help="设备地址，不指定则启动本机仿真固件")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rate", type=float, default=1.0, help="每个客户端每秒发送的progress消息数")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--ping-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    proc = None
+    host = args.host
+    if host is None:
+        host = "127.0.0.1"
+        proc = start_emulator(args.port)
+    try:
+        print("{:>8} {:>10} {:>10} {:>10} {:>8} {:>10}".format("clients", "p50(ms)", "p95(ms)", "max(ms)", "失败", "消息数"))
+        for n in args.clients:
+            latencies, failures, sent = asyncio.run(
+                run(host, args.port, n, args.rate, args.duration, args.ping_interval))
+            print("{:>8} {:>10.1f} {:>10.1f} {:>10.1f} {:>8} {:>10}".format(
+                n, percentile(latencies, 50), percentile(latencies, 95),
+                max(latencies) if latencies else 0.0, failures, sent))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
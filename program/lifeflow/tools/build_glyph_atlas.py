@@ -0,0 +1,192 @@
+# 生成OLED使用的中文字形图集 esp32s3/glyphs.bin
+# 扫描固件源码中的字符串常量，只栅格化实际用到的非ASCII字符（ASCII仍使用framebuf自带的8x8字体）
+#
+# 用法:
+#   python tools/build_glyph_atlas.py --font wenquanyi_9pt.bdf          # BDF点阵字体，无需额外依赖
+#   python tools/build_glyph_atlas.py --font NotoSansSC-Regular.otf     # TTF/OTF字体，需要安装Pillow
+#
+# 文件格式（小端）:
+#   头部 "<4sBBBH": b"LFGA", 版本, 字宽, 字高, 字形数量
+#   索引: 字形数量 x uint16 码位（升序，运行时二分查找）
+#   位图: 字形数量 x (字宽 * ceil(字高/8)) 字节，MONO_VLSB布局，可直接作为framebuf.FrameBuffer使用
+import argparse
+import ast
+import os
+import struct
+import sys
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRMWARE_DIR = os.path.join(LIFEFLOW_DIR, "esp32s3")
+DEFAULT_OUTPUT = os.path.join(FIRMWARE_DIR, "glyphs.bin")
+MAGIC = b"LFGA"
+VERSION = 1
+
+
+# 显示相关的调用和变量名：draw_text()/text()/led_handler()的参数，以及赋值给 *_text / *_status / *_label
+# 的字符串和 *_LINES / *_lines 的提示画面
+DISPLAY_CALLS = ("draw_text", "text", "led_handler")
+DISPLAY_SUFFIXES = ("_text", "_status", "_label", "_TEXT", "_LABELS", "_LINES", "_lines")
+
+
+def _strings(node):
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+            yield sub.value
+
+
+def _call_name(call):
+    func = call.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return None
+
+
+def collect_chars(paths):
+    # 只收集会显示到OLED上的字符串中的非ASCII字符，日志里的中文不进入图集
+    chars = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            texts = ()
+            if isinstance(node, ast.Call) and _call_name(node) in DISPLAY_CALLS:
+                texts = [s for arg in node.args[:1] for s in _strings(arg)]
+            elif isinstance(node, ast.Assign):
+                names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+                if any(name.endswith(DISPLAY_SUFFIXES) for name in names):
+                    texts = list(_strings(node.value))
+            for text in texts:
+                chars.update(ch for ch in text if 0x7E < ord(ch) <= 0xFFFF)
+    return sorted(chars)
+
+
+def firmware_sources():
+    return sorted(os.path.join(FIRMWARE_DIR, name) for name in os.listdir(FIRMWARE_DIR)
+                  if name.endswith(".py") and not name.startswith("bench_"))
+
+
+def pack_vlsb(pixels, width, height):
+    # pixels[y][x] -> MONO_VLSB字节（每字节为一列中的8个像素，低位在上）
+    pages = (height + 7) // 8
+    out = bytearray(width * pages)
+    for y in range(height):
+        for x in range(width):
+            if pixels[y][x]:
+                out[(y >> 3) * width + x] |= 1 << (y & 7)
+    return bytes(out)
+
+
+def load_bdf(path):
+    # 解析BDF点阵字体，返回 {码位: (bbx_w, bbx_h, x_off, y_off, rows)} 和字体的上升高度
+    glyphs = {}
+    ascent = None
+    with open(path, encoding="latin-1") as f:
+        lines = iter(f.read().splitlines())
+    for line in lines:
+        if line.startswith("FONT_ASCENT"):
+            ascent = int(line.split()[1])
+        elif line.startswith("FONTBOUNDINGBOX") and ascent is None:
+            _, w, h, x, y = line.split()
+            ascent = int(h) + int(y)
+        elif line.startswith("STARTCHAR"):
+            code = None
+            bbx = None
+            for line in lines:
+                if line.startswith("ENCODING"):
+                    code = int(line.split()[1])
+                elif line.startswith("BBX"):
+                    bbx = tuple(int(v) for v in line.split()[1:5])
+                elif line.startswith("BITMAP"):
+                    rows = []
+                    for line in lines:
+                        if line.startswith("ENDCHAR"):
+                            break
+                        rows.append(int(line, 16) if line.strip() else 0)
+                    if code is not None and bbx is not None:
+                        glyphs[code] = (bbx[0], bbx[1], bbx[2], bbx[3], rows)
+                    break
+    return glyphs, ascent or 0
+
+
+def rasterize_bdf(path, chars, width, height):
+    glyphs, ascent = load_bdf(path)
+    result = {}
+    for ch in chars:
+        g = glyphs.get(ord(ch))
+        if g is None:
+            continue
+        bw, bh, bx, by, rows = g
+        row_bits = ((bw + 7) // 8) * 8
+        pixels = [[0] * width for _ in range(height)]
+        top = ascent - (bh + by)
+        for r, bits in enumerate(rows[:bh]):
+            y = top + r
+            if not 0 <= y < height:
+                continue
+            for c in range(bw):
+                x = bx + c
+                if 0 <= x < width and bits & (1 << (row_bits - 1 - c)):
+                    pixels[y][x] = 1
+        result[ch] = pixels
+    return result
+
+
+def rasterize_truetype(path, chars, width, height):
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        sys.exit("栅格化TTF/OTF字体需要Pillow: pip install pillow（或改用BDF点阵字体）")
+    font = ImageFont.truetype(path, height)
+    result = {}
+    for ch in chars:
+        image = Image.new("1", (width, height), 0)
+        draw = ImageDraw.Draw(image)
+        left, top, right, bottom = draw.textbbox((0, 0), ch, font=font)
+        draw.text(((width - (right - left)) // 2 - left, (height - (bottom - top)) // 2 - top), ch, font=font, fill=1)
+        result[ch] = [[image.getpixel((x, y)) for x in range(width)] for y in range(height)]
+    return result
+
+
+def build(chars, glyph_pixels, width, height):
+    present = [ch for ch in chars if ch in glyph_pixels]
+    out = bytearray(struct.pack("<4sBBBH", MAGIC, VERSION, width, height, len(present)))
+    for ch in present:
+        out += struct.pack("<H", ord(ch))
+    for ch in present:
+        out += pack_vlsb(glyph_pixels[ch], width, height)
+    return bytes(out), [ch for ch in chars if ch not in glyph_pixels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成OLED中文字形图集")
+    parser.add_argument("--font", required=True, help="BDF点阵字体，或TTF/OTF字体（需要Pillow）")
+    parser.add_argument("--size", type=int, default=12, help="字形宽高（像素），默认12")
+    parser.add_argument("--extra", default="", help="额外需要包含的字符")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    sources = firmware_sources()
+    chars = sorted(set(collect_chars(sources)) | set(ch for ch in args.extra if ord(ch) > 0x7E))
+    if args.font.lower().endswith(".bdf"):
+        pixels = rasterize_bdf(args.font, chars, args.size, args.size)
+    else:
+        pixels = rasterize_truetype(args.font, chars, args.size, args.size)
+    data, missing = build(chars, pixels, args.size, args.size)
+    with open(args.output, "wb") as f:
+        f.write(data)
+
+    glyph_bytes = args.size * ((args.size + 7) // 8)
+    count = len(chars) - len(missing)
+    print("扫描源文件: {}".format(", ".join(os.path.basename(p) for p in sources)))
+    print("字符: {}".format("".join(chars)))
+    print("字形数量: {}, 每个字形 {} 字节".format(count, glyph_bytes))
+    print("Flash占用: {} 字节 ({})".format(len(data), args.output))
+    print("常驻内存: 索引 {} 字节 + 缓存每槽 {} 字节".format(count * 2, glyph_bytes))
+    if missing:
+        print("⚠️ 字体中缺少: {}".format("".join(missing)))
+
+
+if __name__ == "__main__":
+    main()
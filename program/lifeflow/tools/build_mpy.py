@@ -0,0 +1,86 @@
+# 把固件预编译为.mpy字节码：板子上导入.mpy时不需要解析和编译源码，启动更快、占用内存更少。
+# 输出目录的结构与板子上的文件系统一致：
+#   main.py            根目录入口，只导入 esp32s3.main 并运行
+#   esp32s3/*.mpy      固件各模块（不含bench_*和仿真器）
+#   esp32s3/glyphs.bin 字形图集（存在时复制）
+# 需要与固件版本一致的mpy-cross（pip install mpy-cross==固件版本号）。
+# 板子上同名的.py优先于.mpy导入，第一次部署时要删除板子上 esp32s3/ 下的.py文件
+# 用法：python tools/build_mpy.py [--out build/mpy] [--mpy-cross mpy-cross]
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRMWARE_DIR = os.path.join(LIFEFLOW_DIR, "esp32s3")
+
+ENTRY = "import esp32s3.main as firmware\nfirmware.main()\n"
+
+
+def firmware_modules():
+    for name in sorted(os.listdir(FIRMWARE_DIR)):
+        if name.endswith(".py") and not name.startswith("bench_") and name != "__init__.py":
+            yield name
+
+
+def find_mpy_cross(path):
+    if path:
+        return [path]
+    if shutil.which("mpy-cross"):
+        return ["mpy-cross"]
+    try:
+        import mpy_cross  # noqa: F401
+    except ImportError:
+        return None
+    return [sys.executable, "-m", "mpy_cross"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把固件预编译为.mpy字节码")
+    parser.add_argument("--out", default=os.path.join(LIFEFLOW_DIR, "build", "mpy"), help="输出目录")
+    parser.add_argument("--mpy-cross", default=None, help="mpy-cross可执行文件路径")
+    parser.add_argument("--opt", type=int, default=0, help="mpy-cross优化级别（-O），大于0时去掉assert和行号信息")
+    args = parser.parse_args()
+
+    command = find_mpy_cross(args.mpy_cross)
+    if command is None:
+        print("❌ 找不到mpy-cross，请先安装与固件版本一致的 mpy-cross（pip install mpy-cross）")
+        return 1
+
+    out_dir = os.path.join(args.out, "esp32s3")
+    os.makedirs(out_dir, exist_ok=True)
+    source_total = mpy_total = 0
+    print("{:<16} {:>8} {:>8}".format("模块", ".py", ".mpy"))
+    for name in firmware_modules():
+        source = os.path.join(FIRMWARE_DIR, name)
+        target = os.path.join(out_dir, name[:-3] + ".mpy")
+        # -s 指定源文件名，出错时的回溯显示板子上的路径
+        result = subprocess.run(command + ["-O{}".format(args.opt), "-s", "esp32s3/" + name, "-o", target, source],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print("❌ 编译{}失败:\n{}".format(name, result.stderr))
+            return 1
+        source_size = os.path.getsize(source)
+        mpy_size = os.path.getsize(target)
+        source_total += source_size
+        mpy_total += mpy_size
+        print("{:<16} {:>8} {:>8}".format(name, source_size, mpy_size))
+    print("{:<16} {:>8} {:>8}".format("合计", source_total, mpy_total))
+
+    with open(os.path.join(args.out, "main.py"), "w") as f:
+        f.write(ENTRY)
+    atlas = os.path.join(FIRMWARE_DIR, "glyphs.bin")
+    if os.path.exists(atlas):
+        shutil.copy(atlas, out_dir)
+
+    files = sorted(os.path.relpath(os.path.join(root, name), args.out).replace(os.sep, "/")
+                   for root, _, names in os.walk(args.out) for name in names)
+    print("已输出到 {}，在线更新：".format(args.out))
+    print("python tools/push_update.py --key-file ota.key --host 设备地址 --reboot " + " ".join(
+        "{}={}".format(os.path.join(args.out, name), name) for name in files))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# 检查会话日志：用虚拟时钟跑几千轮专注/休息（随机暂停、提前停止、到点完成），
+# 按固件后台任务的方式批量写入临时目录，然后通过 /journal 的处理函数导出，
+# 核对每条记录的字段、序号连续、段轮转后保留的范围、游标续传和重新启动后的恢复，
+# 并统计Flash写入次数和导出过程中的内存峰值
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIFEFLOW_DIR)
+
+from esp32s3 import host  # noqa: E402
+
+
+class Request:
+    def __init__(self, query):
+        self.query = query
+
+
+class CountWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+    async def drain(self):
+        pass
+
+
+class CollectWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+def export(firmware, since):
+    writer = CollectWriter()
+    asyncio.run(firmware.http_journal(Request("since={}".format(since).encode()), writer))
+    head, body = bytes(writer.data).split(b"\r\n\r\n", 1)
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查会话日志的批量写入、轮转和流式导出")
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    clock = host.install()
+    import esp32s3.log as log
+    log.set_level(log.WARNING)
+    import esp32s3.main as firmware
+    import esp32s3.journal as journal
+    import esp32s3.binproto as binproto
+
+    rnd = random.Random(args.seed)
+    tmp = tempfile.TemporaryDirectory()
+    journal.DIR = os.path.join(tmp.name, "journal")
+    journal.open_journal()
+
+    expected = []
+    for i in range(args.sessions):
+        is_break = rnd.random() < 0.3
+        total = rnd.randint(5, 40)
+        task_id = "task-{}".format(i % 17)
+        firmware.handle_message({"type": "break_start" if is_break else "start", "totalSeconds": total,
+                                 "taskId": task_id, "timestamp": 1700000000000 + i * 60000})
+        elapsed = 0
+        pauses = 0
+        if rnd.random() < 0.4:
+            run = rnd.randint(1, total - 1)
+            clock.advance(run * 1000)
+            elapsed += run
+            firmware.handle_message({"type": "break_pause" if is_break else "pause"})
+            clock.advance(rnd.randint(1, 30) * 1000)
+            firmware.handle_message({"type": "break_resume" if is_break else "resume"})
+            pauses += 1
+        ending = rnd.random()
+        if ending < 0.3:
+            run = rnd.randint(0, total - elapsed - 1)
+            clock.advance(run * 1000)
+            elapsed += run
+            firmware.handle_message({"type": "stop"})
+            completed = False
+        elif ending < 0.6:
+            # 到点由设备定时器完成
+            clock.advance((total - elapsed) * 1000 + firmware.TICK_MS)
+            elapsed = total
+            completed = True
+        else:
+            clock.advance((total - elapsed) * 1000)
+            elapsed = total
+            firmware.handle_message({"type": "break_complete" if is_break else "complete"})
+            completed = True
+        expected.append({
+            "plannedSeconds": total,
+            "actualSeconds": elapsed,
+            "taskHash": binproto.task_hash(task_id),
+            "pauses": pauses,
+            "completed": completed,
+            "isBreak": is_break,
+        })
+        if journal.flush_in_ms() == 0:
+            firmware.flush_journal()
+        # 完成画面结束，回到初始状态
+        clock.advance(firmware.COMPLETED_HOLD_MS)
+
+    # 导出的内存峰值：写出的数据直接丢弃，只统计导出过程本身的分配
+    loop = asyncio.new_event_loop()
+    counter = CountWriter()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    loop.run_until_complete(firmware.http_journal(Request(b"since=0"), counter))
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    loop.close()
+
+    body = export(firmware, 0)
+
+    records = [journal.decode(body[i:i + journal.RECORD_SIZE]) for i in range(0, len(body), journal.RECORD_SIZE)]
+    errors = 0
+    first = records[0]["seq"]
+    if first != journal.segments[0]:
+        errors += 1
+        print("导出的第一条序号{}，最旧的段从{}开始".format(first, journal.segments[0]))
+    for n, record in enumerate(records):
+        if record["seq"] != first + n:
+            errors += 1
+            continue
+        want = expected[record["seq"] - 1]
+        for key, value in want.items():
+            if record[key] != value:
+                errors += 1
+                if errors <= 5:
+                    print("序号{} {}: 记录{} 预期{}".format(record["seq"], key, record[key], value))
+        if not record["wallClock"]:
+            errors += 1
+    if records[-1]["seq"] != args.sessions:
+        errors += 1
+
+    cursor = records[len(records) // 2]["seq"]
+    tail = export(firmware, cursor)
+    if tail != body[(len(records) // 2 + 1) * journal.RECORD_SIZE:]:
+        errors += 1
+        print("since={} 的导出与完整导出的后半部分不一致".format(cursor))
+
+    pending = journal._pending_count
+    firmware.flush_journal()
+    next_seq = journal.next_seq
+    journal.open_journal()
+    if journal.next_seq != next_seq:
+        errors += 1
+        print("重新打开后下一条序号{}，预期{}".format(journal.next_seq, next_seq))
+
+    stats = journal.stats()
+    print("会话{}轮，写入Flash {}次（逐条写入需{}次），内存中待写入{}条".format(
+        args.sessions, stats["flushes"], stats["appended"], pending))
+    print("保留{}段共{}条（序号{}~{}），{}字节".format(
+        stats["segments"], len(records), records[0]["seq"], records[-1]["seq"], len(body)))
+    print("导出{}字节时的内存峰值: {}字节".format(counter.bytes, peak))
+    print("since={} 续传{}条".format(cursor, len(tail) // journal.RECORD_SIZE))
+    print("字段不一致: {}".format(errors))
+    tmp.cleanup()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# 用虚拟时钟模拟一天中的典型使用，统计空闲省电策略的效果：
+# 开机空闲、连接后专注25分钟、休息5分钟、再长时间空闲。
+# 按固件后台任务的方式循环调用power_step()并推进时钟，脚本中的用户操作在对应时刻插入，
+# 最后与最初的固件对比唤醒次数和屏幕点亮时长：原实现的定时器从启动起一直以1秒周期运行，
+# 主循环阻塞在accept()上、没有轮询，屏幕常亮，每次节拍就是一次唤醒
+import argparse
+import os
+import sys
+import tempfile
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIFEFLOW_DIR)
+
+from esp32s3 import host  # noqa: E402
+
+# (分钟, 消息)
+SCRIPT = (
+    (10, {"type": "status"}),
+    (11, {"type": "start", "totalSeconds": 25 * 60}),
+    (36.5, {"type": "break_start", "totalSeconds": 5 * 60}),
+)
+# 原实现的定时器周期（毫秒）
+LEGACY_TICK_MS = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计空闲省电策略的唤醒次数和屏幕点亮时长")
+    parser.add_argument("--hours", type=float, default=2.0, help="模拟总时长（小时）")
+    parser.add_argument("--lightsleep", type=int, default=0, help="浅睡眠单次时长（毫秒），0为不使用")
+    args = parser.parse_args()
+
+    clock = host.install()
+    import esp32s3.log as log
+    log.set_level(log.WARNING)
+    import esp32s3.main as firmware
+    firmware.init_display()
+    import esp32s3.power as power
+    import esp32s3.journal as journal
+    import machine
+
+    power.LIGHTSLEEP_MS = args.lightsleep
+    tmp = tempfile.TemporaryDirectory()
+    journal.DIR = os.path.join(tmp.name, "journal")
+    journal.open_journal()
+    firmware.start_access_point()
+    power.reset_stats()
+
+    start_us = clock.now_us()
+    end_us = start_us + int(args.hours * 3600 * 1000000)
+    pending = [(start_us + int(minute * 60 * 1000000), message) for minute, message in SCRIPT]
+    while clock.now_us() < end_us:
+        if journal.flush_in_ms() == 0:
+            firmware.flush_journal()
+        delay_us = firmware.power_step() * 1000
+        # 睡到下一次检查、下一次用户操作或模拟结束，以先到者为准
+        now = clock.now_us()
+        target = min(now + delay_us, end_us, pending[0][0] if pending else end_us)
+        if target > now:
+            clock.advance_us(target - now)
+        if pending and clock.now_us() >= pending[0][0]:
+            firmware.handle_message(pending.pop(0)[1])
+
+    total_s = (end_us - start_us) / 1000000
+    stats = power.stats()
+    legacy_ticks = int(total_s * 1000 / LEGACY_TICK_MS)
+    legacy_wakeups = legacy_ticks
+    print("模拟时长: {:.1f}小时，屏幕{}秒后调暗、{}秒后关闭，浅睡眠{}".format(
+        args.hours, power.DIM_AFTER_MS // 1000, power.OFF_AFTER_MS // 1000,
+        "{}ms".format(args.lightsleep) if args.lightsleep else "关闭"))
+    print("{:<14} {:>10} {:>10}".format("", "原实现", "空闲策略"))
+    print("{:<14} {:>10} {:>10}".format("定时器节拍", legacy_ticks, stats["ticks"]))
+    print("{:<14} {:>10} {:>10}".format("唤醒次数", legacy_wakeups, stats["wakeups"]))
+    print("{:<14} {:>10} {:>10}".format("屏幕点亮(秒)", int(total_s), stats["displayOnSeconds"]))
+    print("调暗{}次，关闭{}次，浅睡眠{}次共{}秒（仿真machine.lightsleep调用{}次）".format(
+        stats["dims"], stats["offs"], stats["lightsleeps"], stats["lightsleepMs"] // 1000, machine.lightsleeps))
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# 检查渲染队列：用虚拟时钟跑一轮专注，定时器每TICK_MS回调一次，几个浏览器每秒发送progress，
+# 偶尔连续发送状态查询（像页面重连时），主循环按FRAME_MS的间隔处理绘制请求。统计：
+# - 请求重绘次数（原来的实现每次请求都在回调或消息处理中立即绘制并传输一帧）与实际绘制的帧数
+# - 定时器回调和消息处理的耗时（不再包含I2C传输）与单帧绘制的耗时
+# - 每帧绘制时复制的会话状态与当时的会话是否一致
+import argparse
+import os
+import random
+import sys
+import time
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIFEFLOW_DIR)
+
+from esp32s3 import host  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查渲染队列的合并效果和回调耗时")
+    parser.add_argument("--minutes", type=int, default=25, help="专注时长（分钟）")
+    parser.add_argument("--browsers", type=int, default=3, help="每秒发送progress的浏览器数")
+    parser.add_argument("--burst-every", type=int, default=30, help="每隔多少秒连续发送一批状态查询")
+    parser.add_argument("--burst-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    clock = host.install()
+    import esp32s3.log as log
+    log.set_level(log.WARNING)
+    import esp32s3.main as firmware
+    firmware.init_display()
+
+    if not firmware.OLED_INITIALIZED:
+        print("OLED未初始化，无法检查")
+        return 1
+
+    rnd = random.Random(args.seed)
+    focus = firmware.focus
+    total = args.minutes * 60
+    firmware.handle_message({"type": "start", "totalSeconds": total})
+    firmware.render_pending()
+    requested0 = firmware.frames_requested
+    rendered0 = firmware.frames_rendered
+    frames0 = firmware.oled.frames
+    origin_us = clock.now_us()
+
+    def advance_to(ms):
+        clock.advance_us(origin_us + ms * 1000 - clock.now_us())
+
+    # 事件按虚拟时间（毫秒）排序：定时器节拍、浏览器进度、状态查询
+    events = []
+    for t in range(firmware.TICK_MS, total * 1000 + firmware.TICK_MS, firmware.TICK_MS):
+        events.append((t + rnd.randint(0, 40), "tick"))
+    for second in range(1, total):
+        for _ in range(args.browsers):
+            events.append((second * 1000 + rnd.randint(0, 900), ("progress", total - second)))
+    for second in range(args.burst_every, total, args.burst_every):
+        for i in range(args.burst_size):
+            events.append((second * 1000 + 500 + i * 15, "status"))
+    events.sort(key=lambda e: e[0])
+
+    handler_s = render_s = 0.0
+    handler_max = 0.0
+    handled = inconsistent = 0
+    next_frame = 0
+    now = 0
+    for at, event in events:
+        # 在下一个事件之前，主循环按帧间隔处理待绘制的请求
+        while firmware.frame_dirty and max(now, next_frame) <= at:
+            now = max(now, next_frame)
+            advance_to(now)
+            t0 = time.perf_counter()
+            firmware.render_pending()
+            render_s += time.perf_counter() - t0
+            if (firmware.frame_state[0] != focus.state or firmware.frame_state[1] != focus.remaining
+                    or firmware.frame_state[2] != focus.total):
+                inconsistent += 1
+            next_frame = now + firmware.FRAME_MS
+        now = at
+        advance_to(now)
+        t0 = time.perf_counter()
+        if event == "tick":
+            firmware.update_timer()
+        elif event == "status":
+            firmware.handle_message({"type": "status"})
+        else:
+            firmware.handle_message({"type": "progress", "remainingSeconds": event[1]})
+        elapsed = time.perf_counter() - t0
+        handler_s += elapsed
+        handler_max = max(handler_max, elapsed)
+        handled += 1
+        if focus.state != "running":
+            break
+    firmware.render_pending()
+
+    requested = firmware.frames_requested - requested0
+    rendered = firmware.frames_rendered - rendered0
+    transmitted = firmware.oled.frames - frames0
+    frame_ms = render_s * 1000 / rendered if rendered else 0
+    print("会话: {}分钟专注，{}个浏览器每秒发送进度，每{}秒{}次状态查询".format(
+        args.minutes, args.browsers, args.burst_every, args.burst_size))
+    print("回调和消息: {}次，平均{:.1f}us，最长{:.1f}us（不含绘制）".format(
+        handled, handler_s * 1e6 / handled, handler_max * 1e6))
+    print("重绘请求: {}次（原来的实现绘制{}帧），实际绘制{}帧，传输{}帧，帧间隔不小于{}ms".format(
+        requested, requested, rendered, transmitted, firmware.FRAME_MS))
+    print("单帧绘制: 平均{:.2f}ms，原来的实现在回调中共花费约{:.0f}ms，渲染队列{:.0f}ms".format(
+        frame_ms, frame_ms * requested, render_s * 1000))
+    print("快照与会话不一致: {}帧".format(inconsistent))
+    ok = inconsistent == 0 and rendered <= requested and focus.state == "completed"
+    print("结果: {}".format("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
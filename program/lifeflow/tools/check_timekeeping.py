@@ -0,0 +1,112 @@
+# 用虚拟时钟检查固件计时：2小时专注（中途暂停5分钟），定时器按固件设定的下一秒边界回调，随机迟到并偶尔停顿数秒，
+# 每次回调后比较设备显示的剩余秒数与真实剩余时间，要求全程零误差、到点即完成。
+# 同时按原来"每次回调减1秒"的方式模拟一遍，给出对比的累计误差。
+# 时钟从ticks_ms回绕点前1小时开始，顺带检查回绕处理。
+import argparse
+import os
+import random
+import sys
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIFEFLOW_DIR)
+
+from esp32s3 import host  # noqa: E402
+from esp32s3.host.clock import TICKS_PERIOD  # noqa: E402
+
+
+def ceil_seconds(ms):
+    return (ms + 999) // 1000 if ms > 0 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查截止时间计时在回调抖动下的误差")
+    parser.add_argument("--minutes", type=int, default=120, help="专注时长（分钟）")
+    parser.add_argument("--pause-at", type=int, default=30, help="第几分钟暂停")
+    parser.add_argument("--pause-for", type=int, default=5, help="暂停多少分钟")
+    parser.add_argument("--max-late", type=int, default=200, help="回调最多迟到的毫秒数")
+    parser.add_argument("--stall-rate", type=float, default=0.01, help="回调前发生1~4秒停顿的概率")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    clock = host.install()
+    clock.advance_us((TICKS_PERIOD - 3600 * 1000) * 1000)
+    import esp32s3.log as log
+    log.set_level(log.WARNING)
+    import esp32s3.main as firmware
+    firmware.init_display()
+
+    rnd = random.Random(args.seed)
+    focus = firmware.focus
+    total_ms = args.minutes * 60 * 1000
+    pause_at = args.pause_at * 60 * 1000
+    pause_ms = args.pause_for * 60 * 1000
+    frames0 = firmware.oled.frames if firmware.OLED_INITIALIZED else 0
+
+    start_us = clock.now_us()
+    firmware.handle_message({"type": "start", "totalSeconds": args.minutes * 60})
+    true_end_us = start_us + total_ms * 1000
+    paused = resumed = False
+
+    # 原来的实现：1秒周期的回调每次减1秒，迟到的回调把下一次也推后，停顿期间的回调直接丢失
+    legacy_remaining = args.minutes * 60
+    legacy_next_us = start_us + 1000 * 1000
+
+    callbacks = mismatches = max_error = 0
+    completed_us = None
+    while completed_us is None:
+        delay_ms = firmware.next_tick_ms() + rnd.randint(0, args.max_late)
+        if rnd.random() < args.stall_rate:
+            delay_ms += rnd.randint(1000, 4000)
+        clock.advance(delay_ms)
+        now_us = clock.now_us()
+        elapsed_ms = (now_us - start_us) // 1000
+
+        if not paused and elapsed_ms >= pause_at:
+            firmware.handle_message({"type": "pause"})
+            pause_start_us = now_us
+            paused = True
+        if paused and not resumed and now_us - pause_start_us >= pause_ms:
+            firmware.handle_message({"type": "resume"})
+            # 暂停时间以实际收到命令的时刻为准
+            true_end_us += now_us - pause_start_us
+            resumed = True
+
+        firmware.update_timer()
+        # 主循环中的渲染任务
+        firmware.render_pending()
+        callbacks += 1
+        if focus.state == "completed":
+            completed_us = now_us
+            break
+
+        if paused and not resumed:
+            expected = ceil_seconds((true_end_us - pause_start_us) // 1000)
+        else:
+            expected = ceil_seconds((true_end_us - now_us) // 1000)
+        error = abs(focus.remaining - expected)
+        if error:
+            mismatches += 1
+            max_error = max(max_error, error)
+
+        if not paused or resumed:
+            while legacy_next_us <= now_us and legacy_remaining > 0:
+                legacy_remaining -= 1
+                legacy_next_us = now_us + 1000 * 1000
+
+    late_ms = (completed_us - true_end_us) / 1000
+    frames = (firmware.oled.frames if firmware.OLED_INITIALIZED else 0) - frames0
+    print("会话: {}分钟专注，第{}分钟暂停{}分钟".format(args.minutes, args.pause_at, args.pause_for))
+    print("定时器回调: {}次（设在显示秒数变化的时刻，最长{}ms），最多迟到{}ms，停顿概率{:.1%}".format(
+        callbacks, firmware.TICK_MS, args.max_late, args.stall_rate))
+    print("显示误差: {}次回调不一致，最大误差{}秒".format(mismatches, max_error))
+    print("完成时刻: 比真实结束晚{:.0f}ms（不超过一次回调间隔）".format(late_ms))
+    print("屏幕重绘: 请求{}次，绘制{}次，传输{}帧".format(
+        firmware.frames_requested, firmware.frames_rendered, frames))
+    print("原来的逐秒递减: 到点时还剩{}秒".format(legacy_remaining))
+    ok = mismatches == 0 and 0 <= late_ms <= firmware.TICK_MS + args.max_late + 4000
+    print("结果: {}".format("通过" if ok else "失败"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
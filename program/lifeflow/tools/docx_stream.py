@@ -0,0 +1,207 @@
+# 流式DOCX写入：不经过python-docx的对象模型，把段落XML直接写进zip中的word/document.xml，
+# 内存占用只取决于写缓冲区大小，与页数无关。段落的格式部分（pPr/rPr）按格式组合预先生成并缓存，
+# 每个段落只需要转义文本再拼接；整页不变的内容可以先用paragraph()生成一次再反复写入。
+# 生成的段落XML与python-docx对应调用（add_paragraph、run.bold、font.size、alignment、
+# space_after、add_page_break）产生的结构一致，python-docx读取时得到相同的段落和格式
+import functools
+import zipfile
+from datetime import datetime, timezone
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# 写入zip前攒够的字符数
+BUFFER_CHARS = 64 * 1024
+
+CONTENT_TYPES = XML_DECL + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>')
+
+PACKAGE_RELS = XML_DECL + (
+    '<Relationships xmlns="{}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>').format(REL_NS)
+
+DOCUMENT_RELS = XML_DECL + (
+    '<Relationships xmlns="{}">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>').format(REL_NS)
+
+STYLES = XML_DECL + (
+    '<w:styles xmlns:w="{}">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="SimSun" w:cs="Times New Roman"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="en-US" w:eastAsia="zh-CN"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    '</w:styles>').format(W_NS)
+
+CORE = XML_DECL + (
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:title>{title}</dc:title><dc:creator>LifeFlow</dc:creator>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{created}</dcterms:modified>'
+    '</cp:coreProperties>')
+
+DOCUMENT_START = XML_DECL + '<w:document xmlns:w="{}" xmlns:r="{}"><w:body>'.format(W_NS, R_NS)
+# 与python-docx默认模板相同的节属性（Letter纸，上下1英寸、左右1.25英寸边距，修订ID也相同）
+DOCUMENT_END = (
+    '<w:sectPr w:rsidR="00FC693F" w:rsidRPr="0006063C" w:rsidSect="00034616"><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" w:header="720" w:footer="720" w:gutter="0"/>'
+    '<w:cols w:space="720"/><w:docGrid w:linePitch="360"/></w:sectPr>'
+    '</w:body></w:document>')
+
+PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+EMPTY_PARAGRAPH = '<w:p/>'
+
+_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_BREAKS = {"\n": "<w:br/>", "\t": "<w:tab/>"}
+
+
+def escape(text):
+    return text.translate(_ESCAPES)
+
+
+@functools.lru_cache(maxsize=None)
+def _template(bold, size, align, space_after):
+    # 返回(段落开头到run属性, run结尾到段落结尾)；元素顺序按WordprocessingML的schema
+    ppr = ""
+    if space_after is not None:
+        ppr += '<w:spacing w:after="{}"/>'.format(int(space_after * 20))
+    if align is not None:
+        ppr += '<w:jc w:val="{}"/>'.format(align)
+    rpr = ""
+    if bold:
+        rpr += "<w:b/>"
+    if size is not None:
+        rpr += '<w:sz w:val="{}"/>'.format(int(size * 2))
+    head = "<w:p>"
+    if ppr:
+        head += "<w:pPr>" + ppr + "</w:pPr>"
+    head += "<w:r>"
+    if rpr:
+        head += "<w:rPr>" + rpr + "</w:rPr>"
+    return head, "</w:r></w:p>"
+
+
+# 与python-docx相同：首尾有空白时才加xml:space="preserve"
+def _text(text):
+    if text[0].isspace() or text[-1].isspace():
+        return '<w:t xml:space="preserve">' + text + "</w:t>"
+    return "<w:t>" + text + "</w:t>"
+
+
+# run的内容：换行和制表符与python-docx一样写成<w:br/>和<w:tab/>
+def _run_content(text):
+    if "\n" not in text and "\t" not in text:
+        return _text(text)
+    parts = []
+    start = 0
+    for i, ch in enumerate(text):
+        if ch in _BREAKS:
+            if i > start:
+                parts.append(_text(text[start:i]))
+            parts.append(_BREAKS[ch])
+            start = i + 1
+    if start < len(text):
+        parts.append(_text(text[start:]))
+    return "".join(parts)
+
+
+# 一个只有一个文本run的段落；size和space_after的单位是磅，align为left/center/right/both
+def paragraph(text, bold=False, size=None, align=None, space_after=None):
+    head, tail = _template(bold, size, align, space_after)
+    if not text:
+        # python-docx的add_paragraph("")不创建run
+        prefix = head[:head.index("<w:r>")]
+        return EMPTY_PARAGRAPH if prefix == "<w:p>" else prefix + "</w:p>"
+    return head + _run_content(escape(text)) + tail
+
+
+# created同时用作文档属性中的创建时间和zip条目的修改时间，指定created时相同内容生成的文件逐字节相同
+class DocxWriter:
+    def __init__(self, path, title="", created=None, compression=zipfile.ZIP_DEFLATED):
+        self._file = open(path, "wb")
+        self._zip = zipfile.ZipFile(self._file, "w")
+        self._compression = compression
+        created = created or datetime.now(timezone.utc)
+        self._date_time = created.timetuple()[:6]
+        self._zip.writestr(self._entry("[Content_Types].xml"), CONTENT_TYPES)
+        self._zip.writestr(self._entry("_rels/.rels"), PACKAGE_RELS)
+        self._zip.writestr(self._entry("docProps/core.xml"),
+                           CORE.format(title=escape(title), created=created.strftime("%Y-%m-%dT%H:%M:%SZ")))
+        self._zip.writestr(self._entry("word/_rels/document.xml.rels"), DOCUMENT_RELS)
+        self._zip.writestr(self._entry("word/styles.xml"), STYLES)
+        self._stream = self._zip.open(self._entry("word/document.xml"), "w", force_zip64=True)
+        self._pending = [DOCUMENT_START]
+        self._pending_chars = len(DOCUMENT_START)
+        self.xml_bytes = 0
+
+    def _entry(self, name):
+        info = zipfile.ZipInfo(name, date_time=self._date_time)
+        info.compress_type = self._compression
+        return info
+
+    # 追加一段或多段预先生成的段落XML
+    def add(self, xml):
+        self._pending.append(xml)
+        self._pending_chars += len(xml)
+        if self._pending_chars >= BUFFER_CHARS:
+            self._flush()
+
+    def extend(self, blocks):
+        for xml in blocks:
+            self.add(xml)
+
+    def _flush(self):
+        data = "".join(self._pending).encode("utf-8")
+        self._stream.write(data)
+        self.xml_bytes += len(data)
+        self._pending = []
+        self._pending_chars = 0
+
+    # 已经写入磁盘的字节数（压缩后），用于按目标文件大小生成
+    @property
+    def size(self):
+        return self._file.tell()
+
+    def close(self):
+        if self._zip is None:
+            return
+        self._pending.append(DOCUMENT_END)
+        self._flush()
+        self._stream.close()
+        self._zip.close()
+        self._file.close()
+        self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 把段落XML的生成器写成一个docx文件，返回写入的document.xml字节数
+def write_docx(path, blocks, title="", created=None, **kwargs):
+    with DocxWriter(path, title=title, created=created, **kwargs) as writer:
+        writer.extend(blocks)
+    return writer.xml_bytes
@@ -0,0 +1,404 @@
+# 设备网关：为每台设备保持一个WebSocket长连接（协议与esp32s3/main.py相同），浏览器只需要连接网关
+# - 浏览器消息用"device"字段指定设备ID、ID列表或"*"，不带时发往连接时 ?device= 指定的设备；
+#   消息原样转发给设备（设备忽略多出的device字段），网关立即按设备的格式回复确认
+# - 设备推送的事件（state_changed/completed/break_completed/heartbeat）加上"device"字段后转发给订阅了该设备的浏览器；
+#   前端靠心跳判断连接是否有效，网关空闲时也按设备的心跳周期转发
+# - 同一设备待发送的progress/break_progress只保留最新一条，每台设备每PROGRESS_INTERVAL秒最多转发一次；
+#   之后到达的控制命令使尚未发送的进度作废，避免旧进度在stop之后重新启动计时
+# - 设备断线或超过DEVICE_TIMEOUT秒没有任何帧时断开，按指数退避重连；断线期间的命令最多缓存MAX_QUEUE条
+# 用法：python tools/gateway.py --device desk1=192.168.1.50:80 --device desk2=192.168.1.51:80 --port 8765
+#      python tools/gateway.py --devices devices.json   （{"设备ID": "地址:端口", ...}）
+# HTTP接口：GET /devices 设备列表和状态，GET /stats 计数和CPU时间，GET /ping
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import random
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from wsclient import WebSocketClient, WebSocketClosed
+
+PROGRESS_TYPES = ("progress", "break_progress")
+PROGRESS_INTERVAL = 1.0
+MAX_QUEUE = 32
+DEVICE_TIMEOUT = 15.0
+CONNECT_TIMEOUT = 5.0
+BACKOFF_MIN = 0.5
+BACKOFF_MAX = 30.0
+# 浏览器接收缓慢、发送缓冲区超过这个大小时断开它，不影响其他浏览器
+BROWSER_BUFFER_LIMIT = 256 * 1024
+WS_MAGIC = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class Stats:
+    def __init__(self):
+        self.commands = 0  # 浏览器发来的设备命令（按目标设备计）
+        self.forwarded = 0  # 实际发给设备的消息
+        self.coalesced = 0  # 被合并或作废的进度消息
+        self.dropped = 0  # 断线期间队列满而丢弃的命令
+        self.events = 0  # 设备推送的事件（不含心跳）
+        self.heartbeats = 0  # 转发的设备心跳
+        self.bad_frames = 0  # 设备发来的无法解析的文本帧
+        self.fanout = 0  # 转发给浏览器的帧
+        self.reconnects = 0
+
+
+stats = Stats()
+
+
+class DeviceLink:
+    def __init__(self, gateway, device_id, host, port):
+        self.gateway = gateway
+        self.id = device_id
+        self.host = host
+        self.port = port
+        self.ws = None
+        self.commands = collections.deque()
+        self.progress = None
+        self.last_progress = 0.0
+        self.wakeup = asyncio.Event()
+        self.state = None
+        self.connected_at = None
+        self.failures = 0
+        # 转发事件时把 {"type": ...} 改写为 {"device": "ID", "type": ...}，不重新编码JSON
+        self.prefix = ('{"device": ' + json.dumps(device_id) + ", ").encode()
+
+    def enqueue(self, msg_type, payload):
+        stats.commands += 1
+        if msg_type in PROGRESS_TYPES:
+            if self.progress is not None:
+                stats.coalesced += 1
+            self.progress = payload
+        else:
+            if self.progress is not None:
+                stats.coalesced += 1
+                self.progress = None
+            if len(self.commands) >= MAX_QUEUE:
+                self.commands.popleft()
+                stats.dropped += 1
+            self.commands.append(payload)
+        self.wakeup.set()
+
+    def info(self):
+        return {
+            "id": self.id,
+            "address": "{}:{}".format(self.host, self.port),
+            "connected": self.ws is not None,
+            "state": self.state,
+            "queued": len(self.commands) + (self.progress is not None),
+            "failures": self.failures,
+        }
+
+    async def run(self):
+        # 启动时错开连接时间，几百台设备不会同时握手
+        await asyncio.sleep(random.random())
+        while True:
+            try:
+                self.ws = await WebSocketClient.connect(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            except (OSError, asyncio.TimeoutError, ConnectionError):
+                await self._backoff()
+                continue
+            self.failures = 0
+            self.connected_at = time.monotonic()
+            tasks = [asyncio.ensure_future(self._receive()), asyncio.ensure_future(self._send())]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.ws.writer.close()
+                self.ws = None
+            stats.reconnects += 1
+            await self._backoff()
+
+    async def _backoff(self):
+        delay = min(BACKOFF_MAX, BACKOFF_MIN * (2 ** self.failures))
+        self.failures += 1
+        await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    async def _receive(self):
+        try:
+            while True:
+                opcode, payload = await asyncio.wait_for(self.ws.recv_frame(), DEVICE_TIMEOUT)
+                if opcode == 0x9:
+                    await self.ws.send_frame(0xA, payload)
+                elif opcode == 0x1:
+                    self._event(payload)
+        except (WebSocketClosed, asyncio.TimeoutError, OSError):
+            return
+
+    # 设备的确认（带status字段）由网关消化，事件更新设备状态后转发；
+    # 心跳同样转发，浏览器据此判断连接有效。无法解析的帧记录后忽略，不断开设备连接
+    def _event(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            event = None
+        if not isinstance(event, dict):
+            stats.bad_frames += 1
+            print("设备{}发来无法解析的消息: {!r}".format(self.id, payload[:64]), flush=True)
+            return
+        if "status" in event:
+            return
+        self.state = event.get("state")
+        if event.get("type") == "heartbeat":
+            stats.heartbeats += 1
+        else:
+            stats.events += 1
+        self.gateway.publish(self.id, self.prefix + payload[1:])
+
+    async def _send(self):
+        while True:
+            if self.commands:
+                payload = self.commands.popleft()
+            elif self.progress is not None:
+                wait = self.last_progress + PROGRESS_INTERVAL - time.monotonic()
+                if wait > 0:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                payload = self.progress
+                self.progress = None
+                self.last_progress = time.monotonic()
+            else:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            await self.ws.send_frame(0x1, payload)
+            stats.forwarded += 1
+
+
+# 设备ID列表：浏览器消息中的"device"/"devices"字段
+def valid_ids(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+class BrowserSocket(WebSocketClient):
+    # 服务器发出的帧不加掩码；转发事件时只写入缓冲区，不等待drain，慢的浏览器不拖慢其他浏览器
+    def write_frame(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        self.writer.write(header + payload)
+
+    async def send_frame(self, opcode, payload):
+        self.write_frame(opcode, payload)
+        await self.writer.drain()
+
+    def overloaded(self):
+        return self.writer.transport.get_write_buffer_size() > BROWSER_BUFFER_LIMIT
+
+
+class Gateway:
+    def __init__(self, devices):
+        self.devices = {}
+        for device_id, (host, port) in devices.items():
+            self.devices[device_id] = DeviceLink(self, device_id, host, port)
+        self.subscribers = collections.defaultdict(set)  # 设备ID -> 浏览器
+        self.everything = set()  # 订阅了全部设备的浏览器
+        self.browsers = 0
+        self.started = time.monotonic()
+
+    def publish(self, device_id, frame):
+        for browsers in (self.subscribers.get(device_id, ()), self.everything):
+            for ws in list(browsers):
+                if ws.overloaded():
+                    ws.writer.close()
+                    continue
+                ws.write_frame(0x1, frame)
+                stats.fanout += 1
+
+    def subscribe(self, ws, devices):
+        self.unsubscribe(ws)
+        if devices == "*" or devices is None:
+            self.everything.add(ws)
+            return
+        for device_id in devices:
+            self.subscribers[device_id].add(ws)
+
+    def unsubscribe(self, ws):
+        self.everything.discard(ws)
+        for browsers in self.subscribers.values():
+            browsers.discard(ws)
+
+    # 目标设备：ID、ID列表或"*"；格式不对时返回None
+    def targets(self, target):
+        if target == "*":
+            return list(self.devices.values())
+        if target is None:
+            return []
+        if isinstance(target, str):
+            target = (target,)
+        elif not valid_ids(target):
+            return None
+        return [self.devices[t] for t in target if t in self.devices]
+
+    def stats(self):
+        return {
+            "uptimeSeconds": round(time.monotonic() - self.started, 3),
+            "cpuSeconds": round(time.process_time(), 3),
+            "devices": len(self.devices),
+            "connected": sum(1 for link in self.devices.values() if link.ws is not None),
+            "browsers": self.browsers,
+            "commands": stats.commands,
+            "forwarded": stats.forwarded,
+            "coalesced": stats.coalesced,
+            "dropped": stats.dropped,
+            "events": stats.events,
+            "heartbeats": stats.heartbeats,
+            "badFrames": stats.bad_frames,
+            "fanout": stats.fanout,
+            "reconnects": stats.reconnects,
+        }
+
+    async def handle_client(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, OSError):
+            writer.close()
+            return
+        lines = head.decode(errors="replace").split("\r\n")
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        url = urlsplit(parts[1] if len(parts) > 1 else "/")
+        if headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+            await self.browser_session(reader, writer, headers, parse_qs(url.query))
+        else:
+            await self.http(writer, url.path)
+
+    async def http(self, writer, path):
+        if path == "/devices":
+            status, body = 200, [link.info() for link in self.devices.values()]
+        elif path == "/stats":
+            status, body = 200, self.stats()
+        elif path == "/ping":
+            status, body = 200, {"status": "online", "message": "网关在线"}
+        else:
+            status, body = 404, {"error": "not found"}
+        data = json.dumps(body, ensure_ascii=False).encode()
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n"
+                     "Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".format(
+                         status, "OK" if status == 200 else "Not Found", len(data)).encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def browser_session(self, reader, writer, headers, query):
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WS_MAGIC).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        ws = BrowserSocket(reader, writer)
+        default = query.get("device", [None])[0]
+        self.subscribe(ws, [default] if default else "*")
+        self.browsers += 1
+        try:
+            while True:
+                opcode, payload = await ws.recv_frame()
+                if opcode == 0x9:
+                    await ws.send_frame(0xA, payload)
+                elif opcode == 0x1:
+                    await self.browser_message(ws, payload, default)
+        except (WebSocketClosed, OSError):
+            pass
+        finally:
+            self.browsers -= 1
+            self.unsubscribe(ws)
+            writer.close()
+
+    async def browser_message(self, ws, payload, default):
+        try:
+            message = json.loads(payload)
+            msg_type = message["type"]
+        except (ValueError, KeyError, TypeError):
+            await ws.send_frame(0x1, b'{"status": "error", "type": "parse_error"}')
+            return
+        if msg_type == "subscribe":
+            devices = message.get("devices", "*")
+            if devices == "*" or valid_ids(devices):
+                self.subscribe(ws, devices)
+                reply = {"status": "received", "type": msg_type}
+            else:
+                reply = {"status": "error", "type": "bad_device"}
+        elif msg_type == "devices":
+            reply = {"type": "devices", "devices": [link.info() for link in self.devices.values()]}
+        else:
+            links = self.targets(message.get("device", default))
+            if links is None:
+                await ws.send_frame(0x1, b'{"status": "error", "type": "bad_device"}')
+                return
+            for link in links:
+                link.enqueue(msg_type, payload)
+            if links:
+                reply = {"status": "received", "type": msg_type, "devices": len(links)}
+            else:
+                reply = {"status": "error", "type": "unknown_device"}
+        await ws.send_frame(0x1, json.dumps(reply).encode())
+
+
+def parse_address(address, default_port=80):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+def load_devices(args):
+    devices = {}
+    if args.devices:
+        with open(args.devices) as f:
+            for device_id, address in json.load(f).items():
+                devices[device_id] = parse_address(address)
+    for item in args.device:
+        device_id, _, address = item.partition("=")
+        devices[device_id] = parse_address(address)
+    return devices
+
+
+async def serve(gateway, host, port):
+    server = await asyncio.start_server(gateway.handle_client, host, port, backlog=256)
+    for link in gateway.devices.values():
+        asyncio.ensure_future(link.run())
+    print("网关监听 ws://{}:{}/，设备{}台".format(host, port, len(gateway.devices)), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    global PROGRESS_INTERVAL
+    parser = argparse.ArgumentParser(description="多设备WebSocket网关")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--device", action="append", default=[], help="设备ID=地址:端口，可重复")
+    parser.add_argument("--devices", help='JSON文件：{"设备ID": "地址:端口", ...}')
+    parser.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL,
+                        help="每台设备转发进度消息的最短间隔（秒）")
+    args = parser.parse_args()
+
+    PROGRESS_INTERVAL = args.progress_interval
+    devices = load_devices(args)
+    if not devices:
+        parser.error("至少需要一台设备（--device 或 --devices）")
+    try:
+        asyncio.run(serve(Gateway(devices), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
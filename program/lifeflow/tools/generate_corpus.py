@@ -0,0 +1,329 @@
+# 生成摘要/任务生成流程的基准测试语料：按种子、数量和页数分布生成DOCX/TXT/PDF文件，
+# 内容为会议记录（minutes）、会议议程（agenda）或Lorem测试文本（lorem），多进程并行生成，
+# 并写出清单manifest.json（路径、字节数、页数、SHA-256、文档时间和生成耗时），便于原样重放导入基准。
+# 同一个种子和参数生成的文件逐字节相同：每个文件的格式、内容、页数和文档时间都只由种子和序号决定，
+# 与进程数和生成顺序无关（清单中只有耗时相关的字段会变化）。
+# 页数分布：
+#   10                固定10页
+#   uniform:1,50      1到50页均匀分布
+#   lognormal:8,1.0   对数正态分布，中位数8页，sigma为1.0（少数文件很大，接近真实上传）
+#   choice:1,10,100   从给出的页数中随机选取
+# 用法：python tools/generate_corpus.py --out corpus --seed 1 --count 200 --pages lognormal:8,1.0
+#       python tools/generate_corpus.py --check corpus/manifest.json
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from docx_stream import PAGE_BREAK, DocxWriter, paragraph
+from generate_meeting_minutes_docx import ACTIONS, AGENDA, ATTENDEES, DECISIONS, LOREM_CN, UPLOAD_LIMIT_MB
+from generate_test_docx import lorem
+from pdf_stream import PdfWriter
+
+FORMATS = ("docx", "txt", "pdf")
+KINDS = ("minutes", "agenda", "lorem")
+# 文档时间从这一天开始，按种子随机往后推最多一年
+BASE_DATE = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+# 段落样式，参数与docx_stream.paragraph、PdfWriter.add相同
+STYLES = {
+    "title": dict(bold=True, size=20, align="center"),
+    "heading": dict(bold=True, size=14),
+    "subheading": dict(bold=True, size=12),
+    "meta": dict(space_after=12),
+    "body": dict(space_after=8),
+    "item": dict(space_after=6),
+}
+
+SENTENCES_CN = [s + "。" for s in LOREM_CN.split("。") if s] + [
+    "与会人员对当前方案的可行性进行了确认，并补充了监控指标与告警阈值。",
+    "针对上一轮测试中发现的问题，团队给出了根因分析与修复计划。",
+    "会议要求各模块负责人在周会前同步进度，未按期完成的事项需说明原因。",
+    "专注计时与休息提醒的数据需要与任务列表打通，便于统计每日有效时长。",
+]
+SENTENCES_EN = [s.strip() + "." for s in lorem.split(".") if s.strip()]
+SLOTS = ["09:00", "09:30", "10:00", "10:30", "11:00", "14:00", "14:30", "15:00", "15:30", "16:00"]
+
+
+def parse_pages(spec):
+    name, _, args = spec.partition(":")
+    try:
+        if not args:
+            pages = int(name)
+            if pages < 1:
+                raise ValueError
+            return ("fixed", (pages,))
+        values = tuple(float(v) for v in args.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("无效的页数分布: " + spec)
+    if name == "uniform" and len(values) == 2 and 1 <= values[0] <= values[1]:
+        return (name, values)
+    if name == "lognormal" and len(values) == 2 and values[0] >= 1 and values[1] >= 0:
+        return (name, values)
+    if name == "choice" and values and min(values) >= 1:
+        return (name, values)
+    raise argparse.ArgumentTypeError("无效的页数分布: " + spec)
+
+
+# 形如 docx=2,txt=1,pdf=1 的加权列表，不写权重时为1
+def parse_weights(spec, choices):
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in choices:
+            raise argparse.ArgumentTypeError("未知的取值 {}，可选: {}".format(name, ", ".join(choices)))
+        try:
+            weights[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError("无效的权重: " + part)
+    return weights
+
+
+def sample_pages(rng, distribution, max_pages):
+    name, values = distribution
+    if name == "fixed":
+        pages = values[0]
+    elif name == "uniform":
+        pages = rng.randint(int(values[0]), int(values[1]))
+    elif name == "lognormal":
+        pages = round(rng.lognormvariate(math.log(values[0]), values[1]))
+    else:
+        pages = int(rng.choice(values))
+    return max(1, min(int(pages), max_pages))
+
+
+def weighted(rng, weights):
+    names = sorted(weights)
+    return rng.choices(names, weights=[weights[name] for name in names])[0]
+
+
+# 每个文件的生成参数只由种子和序号决定
+def plan(seed, count, distribution, formats, kinds, max_pages):
+    specs = []
+    for index in range(count):
+        rng = random.Random("{}/{}".format(seed, index))
+        kind = weighted(rng, kinds)
+        fmt = weighted(rng, formats)
+        pages = sample_pages(rng, distribution, max_pages)
+        created = BASE_DATE + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        specs.append({
+            "index": index,
+            "format": fmt,
+            "kind": kind,
+            "pages": pages,
+            "seed": "{}/{}/content".format(seed, index),
+            "generatedAt": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "path": "{:05d}_{}_{}p.{}".format(index, kind, pages, fmt),
+        })
+    return specs
+
+
+# 内容生成器：依次产出每一页的段落列表[(样式, 文本)]，标题和元信息放在第一页开头
+def minutes_pages(rng, pages, created):
+    for i in range(1, pages + 1):
+        blocks = []
+        if i == 1:
+            blocks += [("title", "LifeFlow 项目会议记录（{}页）".format(pages)),
+                       ("meta", "会议时间：{}\n会议主题：阶段性回顾与计划\n会议地点：线上\n记录人：系统自动生成".format(
+                           created.strftime("%Y-%m-%d %H:%M")))]
+            blocks.append(("heading", "参会人员"))
+            blocks += [("item", "• " + a) for a in rng.sample(ATTENDEES, rng.randint(3, len(ATTENDEES)))]
+            blocks.append(("heading", "会议议程"))
+            blocks += [("item", "• " + a) for a in rng.sample(AGENDA, rng.randint(3, len(AGENDA)))]
+        blocks.append(("heading", "第 {} 页 - 讨论要点".format(i)))
+        for j in range(1, rng.randint(3, 5) + 1):
+            blocks.append(("body", "讨论点 {}：{}".format(j, "".join(rng.sample(SENTENCES_CN, 3)))))
+        blocks.append(("subheading", "会议决定"))
+        blocks += [("item", "• " + d) for d in rng.sample(DECISIONS, rng.randint(1, len(DECISIONS)))]
+        blocks.append(("subheading", "行动项"))
+        blocks += [("item", "• " + a) for a in rng.sample(ACTIONS, rng.randint(1, len(ACTIONS)))]
+        yield blocks
+
+
+def agenda_pages(rng, pages, created):
+    for i in range(1, pages + 1):
+        day = created + timedelta(days=i - 1)
+        blocks = []
+        if i == 1:
+            blocks += [("title", "LifeFlow 会议议程（{}天）".format(pages)),
+                       ("meta", "开始日期：{}\n会议地点：线上\n主持人：{}".format(
+                           day.strftime("%Y-%m-%d"), rng.choice(ATTENDEES).split(" - ")[1]))]
+        blocks.append(("heading", "第 {} 天（{}）".format(i, day.strftime("%Y-%m-%d"))))
+        for slot in sorted(rng.sample(SLOTS, rng.randint(4, len(SLOTS)))):
+            blocks.append(("item", "{} {}（主持：{}）".format(
+                slot, rng.choice(AGENDA), rng.choice(ATTENDEES).split(" - ")[1])))
+        blocks.append(("subheading", "准备材料"))
+        blocks.append(("body", "".join(rng.sample(SENTENCES_CN, 2))))
+        yield blocks
+
+
+def lorem_pages(rng, pages, created):
+    for i in range(1, pages + 1):
+        blocks = []
+        if i == 1:
+            blocks += [("title", "LifeFlow 测试文档（{}页）".format(pages)),
+                       ("meta", "生成时间: {}\n用途: 文件解析/摘要提取测试".format(
+                           created.strftime("%Y-%m-%d %H:%M:%S")))]
+        blocks.append(("heading", "第 {} 页 - 测试段落".format(i)))
+        for j in range(6):
+            blocks.append(("body", "段落 {}: {}".format(j + 1, " ".join(rng.sample(SENTENCES_EN, rng.randint(6, 12))))))
+        yield blocks
+
+
+CONTENT = {"minutes": minutes_pages, "agenda": agenda_pages, "lorem": lorem_pages}
+
+
+def write_docx_file(path, title, created, pages):
+    with DocxWriter(path, title=title, created=created) as writer:
+        for i, blocks in enumerate(pages):
+            if i:
+                writer.add(PAGE_BREAK)
+            writer.add("".join(paragraph(text, **STYLES[style]) for style, text in blocks))
+    return i + 1
+
+
+# 纯文本：段落之间空一行，页与页之间用换页符分隔
+def write_txt_file(path, title, created, pages):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for i, blocks in enumerate(pages):
+            if i:
+                f.write("\f")
+            f.write("\n\n".join(text for _, text in blocks))
+            f.write("\n")
+    return i + 1
+
+
+# PDF按实际排版分页，一页内容放不下时会占用多个PDF页面，返回PDF的页数
+def write_pdf_file(path, title, created, pages):
+    with PdfWriter(path, title=title, created=created) as writer:
+        for blocks in pages:
+            writer.page_break()
+            for style, text in blocks:
+                writer.add(text, **STYLES[style])
+    return writer.pages
+
+
+WRITERS = {"docx": write_docx_file, "txt": write_txt_file, "pdf": write_pdf_file}
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 在工作进程中生成一个文件，返回清单中的一项
+def build(spec, out_dir):
+    t0 = time.perf_counter()
+    rng = random.Random(spec["seed"])
+    created = datetime.strptime(spec["generatedAt"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    path = os.path.join(out_dir, spec["path"])
+    pages = CONTENT[spec["kind"]](rng, spec["pages"], created)
+    title = "LifeFlow {} {:05d}".format(spec["kind"], spec["index"])
+    physical = WRITERS[spec["format"]](path, title, created, pages)
+    entry = dict(spec)
+    entry["physicalPages"] = physical
+    entry["bytes"] = os.path.getsize(path)
+    entry["sha256"] = sha256_file(path)
+    entry["seconds"] = round(time.perf_counter() - t0, 4)
+    return entry
+
+
+def generate(args):
+    os.makedirs(args.out, exist_ok=True)
+    specs = plan(args.seed, args.count, args.pages, args.formats, args.kinds, args.max_pages)
+    workers = args.workers or os.cpu_count() or 1
+    entries = [None] * len(specs)
+    t0 = time.perf_counter()
+    # 大文件先提交，减少最后只剩一个进程在生成大文件的情况
+    order = sorted(specs, key=lambda spec: -spec["pages"])
+    if workers == 1:
+        for spec in order:
+            entries[spec["index"]] = build(spec, args.out)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(build, spec, args.out) for spec in order]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries[entry["index"]] = entry
+    elapsed = time.perf_counter() - t0
+
+    total_bytes = sum(entry["bytes"] for entry in entries)
+    total_pages = sum(entry["pages"] for entry in entries)
+    manifest = {
+        "seed": args.seed,
+        "count": args.count,
+        "pages": args.pages_spec,
+        "formats": args.formats,
+        "kinds": args.kinds,
+        "maxPages": args.max_pages,
+        "totalBytes": total_bytes,
+        "totalPages": total_pages,
+        "workers": workers,
+        "elapsedSeconds": round(elapsed, 3),
+        "files": entries,
+    }
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    oversize = [entry["path"] for entry in entries if entry["bytes"] > UPLOAD_LIMIT_MB * 1048576]
+    print("✅ 生成{}个文件，共{}页、{:.1f}MB，{}个进程，耗时{:.2f}s（{:.1f}文件/s，{:.1f}MB/s）".format(
+        len(entries), total_pages, total_bytes / 1048576, workers, elapsed,
+        len(entries) / elapsed, total_bytes / 1048576 / elapsed))
+    if oversize:
+        print("⚠️ {}个文件超过上传上限{}MB: {}".format(len(oversize), UPLOAD_LIMIT_MB, ", ".join(oversize[:5])))
+    return 0
+
+
+# 按清单校验目录中的文件（重放基准前确认语料没有变化）
+def check(manifest_path):
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    root = os.path.dirname(os.path.abspath(manifest_path))
+    bad = 0
+    for entry in manifest["files"]:
+        path = os.path.join(root, entry["path"])
+        if not os.path.exists(path):
+            print("❌ 缺少文件: " + entry["path"])
+            bad += 1
+        elif sha256_file(path) != entry["sha256"]:
+            print("❌ 校验和不一致: " + entry["path"])
+            bad += 1
+    print("{}个文件，{}".format(len(manifest["files"]), "全部一致" if not bad else "{}个不一致".format(bad)))
+    return 1 if bad else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成摘要/任务生成基准测试用的多格式语料")
+    parser.add_argument("--out", default="corpus", help="输出目录")
+    parser.add_argument("--seed", default="1", help="随机种子（任意字符串）")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--pages", dest="pages_spec", default="lognormal:8,1.0",
+                        help="页数分布：N、uniform:最小,最大、lognormal:中位数,sigma、choice:页数,...")
+    parser.add_argument("--max-pages", type=int, default=2000, help="单个文件的页数上限")
+    parser.add_argument("--formats", default="docx,txt,pdf", help="格式及权重，如 docx=2,txt=1,pdf=1")
+    parser.add_argument("--kinds", default="minutes,agenda,lorem", help="内容类型及权重，如 minutes=3,lorem=1")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--check", metavar="MANIFEST", default=None, help="按清单校验已生成的语料")
+    args = parser.parse_args()
+
+    if args.check:
+        return check(args.check)
+    try:
+        args.pages = parse_pages(args.pages_spec)
+        args.formats = parse_weights(args.formats, FORMATS)
+        args.kinds = parse_weights(args.kinds, KINDS)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    return generate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,9 @@
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime
+import argparse
 import os
+import zipfile
+
+from docx_stream import PAGE_BREAK, DocxWriter, paragraph
 
 OUTPUT_PATH = r"c:\Users\29705\Desktop\plan4\test_docs\LifeFlow_会议记录_10页.docx"
 
@@ -44,8 +45,27 @@ ACTIONS = [
     "运维：完善启动脚本与日志采集（负责人：周八，截止：本周五）",
 ]
 
+# 上传接口允许的单文件大小（见DECISIONS）
+UPLOAD_LIMIT_MB = 100
+
+
+def title_text(pages):
+    return f"LifeFlow 项目会议记录（{pages}页）"
+
+
+def meta_text(generated):
+    return (
+        f"会议时间：{generated.strftime('%Y-%m-%d %H:%M')}\n"
+        f"会议主题：阶段性回顾与计划\n"
+        f"会议地点：线上\n"
+        f"记录人：系统自动生成"
+    )
+
+
+def add_heading(doc, text: str, size: int = 16, center: bool = False):
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
 
-def add_heading(doc: Document, text: str, size: int = 16, center: bool = False):
     p = doc.add_paragraph(text)
     if center:
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
@@ -54,23 +74,25 @@ def add_heading(doc: Document, text: str, size: int = 16, center: bool = False):
     run.font.size = Pt(size)
 
 
-def add_list(doc: Document, items):
+def add_list(doc, items):
+    from docx.shared import Pt
+
     for item in items:
         p = doc.add_paragraph(f"• {item}")
         p.paragraph_format.space_after = Pt(6)
 
 
-def build_minutes(pages: int = 10):
+# python-docx对象模型构建（整个文档留在内存中），用于对比和校验流式写入的结果
+def build_minutes(pages: int = 10, generated=None):
+    from docx import Document
+    from docx.shared import Pt
+
+    generated = generated or datetime.now()
     doc = Document()
 
     # 标题与元信息
-    add_heading(doc, "LifeFlow 项目会议记录（10页）", size=20, center=True)
-    meta = doc.add_paragraph(
-        f"会议时间：{datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-        f"会议主题：阶段性回顾与计划\n"
-        f"会议地点：线上\n"
-        f"记录人：系统自动生成"
-    )
+    add_heading(doc, title_text(pages), size=20, center=True)
+    meta = doc.add_paragraph(meta_text(generated))
     meta.paragraph_format.space_after = Pt(12)
 
     # 参会人员
@@ -102,11 +124,58 @@ def build_minutes(pages: int = 10):
     return doc
 
 
+def heading_xml(text, size=16, center=False):
+    return paragraph(text, bold=True, size=size, align="center" if center else None)
+
+
+def list_xml(items):
+    return "".join(paragraph(f"• {item}", space_after=6) for item in items)
+
+
+# 流式写入：与build_minutes相同的内容，每页不变的段落只生成一次XML；
+# target_bytes不为空时不限页数，写到文件大小达到target_bytes为止；compress为False时不压缩，
+# 同样的文件大小包含的页数少得多。返回写入的页数
+def write_minutes(path, pages: int = 10, generated=None, target_bytes=None, compress=True):
+    generated = generated or datetime.now()
+    title = title_text(pages) if not target_bytes else f"LifeFlow 项目会议记录（约{target_bytes // 1048576}MB）"
+    body = "".join(paragraph(f"讨论点 {j}：{LOREM_CN}", space_after=8) for j in range(1, 5))
+    body += heading_xml("会议决定", size=12) + list_xml(DECISIONS)
+    body += heading_xml("行动项", size=12) + list_xml(ACTIONS)
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with DocxWriter(path, title=title, compression=compression) as writer:
+        writer.add(heading_xml(title, size=20, center=True))
+        writer.add(paragraph(meta_text(generated), space_after=12))
+        writer.add(heading_xml("参会人员", size=14) + list_xml(ATTENDEES))
+        writer.add(heading_xml("会议议程", size=14) + list_xml(AGENDA))
+        i = 0
+        while writer.size < target_bytes if target_bytes else i < pages:
+            i += 1
+            if i > 1:
+                writer.add(PAGE_BREAK)
+            writer.add(heading_xml(f"第 {i} 页 - 讨论要点", size=14))
+            writer.add(body)
+    return i
+
+
 def main():
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    doc = build_minutes(10)
-    doc.save(OUTPUT_PATH)
-    print(f"✅ 生成完成: {OUTPUT_PATH}")
+    parser = argparse.ArgumentParser(description="生成会议记录格式的测试DOCX")
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--target-mb", type=float, default=None,
+                        help=f"不限页数，生成到指定的文件大小（MB），如接近上传上限的{UPLOAD_LIMIT_MB - 1}")
+    parser.add_argument("--store", action="store_true", help="不压缩document.xml（按文件大小生成时页数接近真实文档）")
+    parser.add_argument("--python-docx", action="store_true", help="使用python-docx对象模型构建（较慢，占用内存随页数增长）")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    if args.python_docx:
+        doc = build_minutes(args.pages)
+        doc.save(args.out)
+        pages = args.pages
+    else:
+        target = int(args.target_mb * 1048576) if args.target_mb else None
+        pages = write_minutes(args.out, args.pages, target_bytes=target, compress=not args.store)
+    print(f"✅ 生成完成: {args.out}（{pages}页，{os.path.getsize(args.out)}字节）")
 
 
 if __name__ == "__main__":
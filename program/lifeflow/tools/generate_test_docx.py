@@ -1,8 +1,10 @@
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+import argparse
+import os
+import zipfile
 from datetime import datetime
 
+from docx_stream import EMPTY_PARAGRAPH, PAGE_BREAK, DocxWriter, paragraph
+
 # 输出路径
 OUTPUT_PATH = r"c:\Users\29705\Desktop\plan4\test_docs\LifeFlow_Test_10pages.docx"
 
@@ -16,18 +18,32 @@ lorem = (
 )
 
 
-def build_doc(pages: int = 10):
+def title_text(pages):
+    return f"LifeFlow 测试文档（{pages}页）"
+
+
+def meta_text(generated):
+    return f"生成时间: {generated.strftime('%Y-%m-%d %H:%M:%S')}\n用途: 文件解析/摘要提取测试"
+
+
+# python-docx对象模型构建（整个文档留在内存中），用于对比和校验流式写入的结果
+def build_doc(pages: int = 10, generated=None):
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    generated = generated or datetime.now()
     doc = Document()
 
     # 标题
-    title = doc.add_paragraph("LifeFlow 测试文档（10页）")
+    title = doc.add_paragraph(title_text(pages))
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
     run = title.runs[0]
     run.bold = True
     run.font.size = Pt(20)
 
     # 元信息
-    meta = doc.add_paragraph(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n用途: 文件解析/摘要提取测试")
+    meta = doc.add_paragraph(meta_text(generated))
     meta.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
     for i in range(1, pages + 1):
@@ -49,12 +65,46 @@ def build_doc(pages: int = 10):
     return doc
 
 
+# 流式写入：与build_doc相同的内容，每页的正文段落只生成一次XML；
+# target_bytes不为空时不限页数，写到文件大小达到target_bytes为止；compress为False时不压缩，
+# 同样的文件大小包含的页数少得多。返回写入的页数
+def write_doc(path, pages: int = 10, generated=None, target_bytes=None, compress=True):
+    generated = generated or datetime.now()
+    title = title_text(pages) if not target_bytes else f"LifeFlow 测试文档（约{target_bytes // 1048576}MB）"
+    body = "".join(paragraph(f"段落 {j+1}: {lorem} "*3, space_after=12) for j in range(6))
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with DocxWriter(path, title=title, compression=compression) as writer:
+        writer.add(paragraph(title, bold=True, size=20, align="center"))
+        writer.add(paragraph(meta_text(generated), align="left"))
+        i = 0
+        while writer.size < target_bytes if target_bytes else i < pages:
+            i += 1
+            if i > 1:
+                writer.add(PAGE_BREAK)
+            writer.add(EMPTY_PARAGRAPH)
+            writer.add(paragraph(f"第 {i} 页 - 测试段落", bold=True, size=14))
+            writer.add(body)
+    return i
+
+
 def main():
-    import os
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    doc = build_doc(10)
-    doc.save(OUTPUT_PATH)
-    print(f"✅ 生成完成: {OUTPUT_PATH}")
+    parser = argparse.ArgumentParser(description="生成文件解析/摘要提取用的测试DOCX")
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--target-mb", type=float, default=None, help="不限页数，生成到指定的文件大小（MB）")
+    parser.add_argument("--store", action="store_true", help="不压缩document.xml（按文件大小生成时页数接近真实文档）")
+    parser.add_argument("--python-docx", action="store_true", help="使用python-docx对象模型构建（较慢，占用内存随页数增长）")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    if args.python_docx:
+        doc = build_doc(args.pages)
+        doc.save(args.out)
+        pages = args.pages
+    else:
+        target = int(args.target_mb * 1048576) if args.target_mb else None
+        pages = write_doc(args.out, args.pages, target_bytes=target, compress=not args.store)
+    print(f"✅ 生成完成: {args.out}（{pages}页，{os.path.getsize(args.out)}字节）")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+# 流式PDF写入：不依赖第三方库，逐页排版并立即写入文件，内存占用与页数无关。
+# 中文使用阅读器内置的Adobe标准中文字体STSong-Light（UniGB-UCS2-H编码，不嵌入字体），
+# 文本按UCS-2写入，pdfminer等解析器可以直接提取出原文。排版只做最简单的按字符宽度折行：
+# ASCII字符半角、其余字符全角，段落的参数与docx_stream.paragraph相同（size和space_after的单位是磅）。
+# 指定created时相同内容生成的文件逐字节相同
+import hashlib
+import re
+import zlib
+from datetime import datetime, timezone
+
+# A4纸，单位为磅
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 56
+DEFAULT_SIZE = 11
+# 与docx_stream中样式的默认值一致：段后10磅、1.15倍行距
+DEFAULT_SPACE_AFTER = 10
+LINE_SPACING = 1.15
+
+FONT_OBJECTS = (
+    "<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /UniGB-UCS2-H /DescendantFonts [{cid} 0 R] >>",
+    "<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+    "/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> "
+    "/FontDescriptor {descriptor} 0 R /DW 1000 /W [1 95 500] >>",
+    "<< /Type /FontDescriptor /FontName /STSong-Light /Flags 6 /FontBBox [-25 -254 1000 880] "
+    "/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>",
+)
+
+
+# 连续的可见ASCII字符（一个英文单词）或者单个其它字符
+_TOKENS = re.compile(r"[!-~]+|.")
+
+
+def char_width(ch):
+    return 0.5 if ch < "\x80" else 1.0
+
+
+# 按宽度折行：英文单词尽量不拆开，中文逐字折行；返回行的列表（宽度以字号为单位）
+def wrap(text, max_em):
+    lines = []
+    for raw in text.split("\n"):
+        line, width = "", 0.0
+        for token in _TOKENS.findall(raw):
+            token_width = sum(char_width(ch) for ch in token)
+            if width + token_width > max_em and line:
+                lines.append(line.rstrip())
+                line, width = "", 0.0
+                if token == " ":
+                    continue
+            while token_width > max_em:
+                # 超过整行宽度的长单词强行拆开（只会是ASCII，每个字符半角）
+                cut = int(max_em * 2)
+                lines.append(token[:cut])
+                token = token[cut:]
+                token_width = len(token) * 0.5
+            line += token
+            width += token_width
+        lines.append(line.rstrip())
+    return lines
+
+
+def _hex(text):
+    return text.encode("utf-16-be", "replace").hex().upper()
+
+
+def _info_string(text):
+    return "<FEFF{}>".format(_hex(text))
+
+
+class PdfWriter:
+    def __init__(self, path, title="", created=None):
+        self._file = open(path, "wb")
+        self._offsets = {}
+        self._kids = []
+        # 1: Catalog, 2: Pages（最后写入）, 3-5: 字体, 6: Info
+        self._next_id = 7
+        self._ops = []
+        self._y = None
+        self.pages = 0
+        created = created or datetime.now(timezone.utc)
+        self._id = hashlib.md5("{}|{}".format(title, created.isoformat()).encode("utf-8")).hexdigest().upper()
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(3, FONT_OBJECTS[0].format(cid=4))
+        self._object(4, FONT_OBJECTS[1].format(descriptor=5))
+        self._object(5, FONT_OBJECTS[2])
+        self._object(6, "<< /Title {} /Producer (LifeFlow) /CreationDate (D:{}Z) >>".format(
+            _info_string(title), created.strftime("%Y%m%d%H%M%S")))
+
+    def _object(self, number, body, stream=None):
+        self._offsets[number] = self._file.tell()
+        self._file.write("{} 0 obj\n{}\n".format(number, body).encode("latin-1"))
+        if stream is not None:
+            self._file.write(b"stream\n" + stream + b"\nendstream\n")
+        self._file.write(b"endobj\n")
+
+    # 一个段落：超出页面底部时自动换页
+    def add(self, text, bold=False, size=None, align=None, space_after=None):
+        size = size or DEFAULT_SIZE
+        leading = size * LINE_SPACING
+        width_em = (PAGE_WIDTH - 2 * MARGIN) / size
+        for line in wrap(text, width_em) if text else [""]:
+            if self._y is None or self._y - leading < MARGIN:
+                self._start_page()
+            self._y -= leading
+            if not line:
+                continue
+            x = MARGIN
+            if align in ("center", "right"):
+                free = (width_em - sum(char_width(ch) for ch in line)) * size
+                x += free / 2 if align == "center" else free
+            # 标准字体没有粗体，用填充加描边模拟
+            self._ops.append("BT /F1 {} Tf {} Tr 1 0 0 1 {:.1f} {:.1f} Tm <{}> Tj ET".format(
+                size, 2 if bold else 0, x, self._y, _hex(line)))
+        if self._y is not None:
+            self._y -= DEFAULT_SPACE_AFTER if space_after is None else space_after
+
+    def page_break(self):
+        if self._y is not None:
+            self._finish_page()
+
+    def _start_page(self):
+        self._finish_page()
+        self._ops = ["0.3 w"]
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _finish_page(self):
+        if self._y is None:
+            return
+        content = zlib.compress("\n".join(self._ops).encode("latin-1"), 6)
+        content_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._object(content_id, "<< /Length {} /Filter /FlateDecode >>".format(len(content)), content)
+        self._object(page_id, "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {} {}] "
+                              "/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>".format(
+                                  PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        self._kids.append(page_id)
+        self.pages += 1
+        self._ops = []
+        self._y = None
+
+    # 已经写入磁盘的字节数
+    @property
+    def size(self):
+        return self._file.tell()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._finish_page()
+        if not self._kids:
+            self._start_page()
+            self._finish_page()
+        self._object(2, "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join("{} 0 R".format(kid) for kid in self._kids), len(self._kids)))
+        xref = self._file.tell()
+        lines = ["xref", "0 {}".format(self._next_id), "0000000000 65535 f "]
+        lines += ["{:010d} 00000 n ".format(self._offsets[number]) for number in range(1, self._next_id)]
+        lines += ["trailer", "<< /Size {} /Root 1 0 R /Info 6 0 R /ID [<{id}> <{id}>] >>".format(
+            self._next_id, id=self._id), "startxref", str(xref), "%%EOF", ""]
+        self._file.write("\n".join(lines).encode("latin-1"))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,67 @@
+# 从设备拉取会话日志：GET /journal?since=游标，边接收边解码，每条记录追加一行JSON到输出文件，
+# 最后一条的序号保存为下一次的游标，重复运行只拉取新增的记录
+# 用法：python tools/pull_journal.py --host 192.168.4.1 --out sessions.jsonl
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIFEFLOW_DIR)
+
+from esp32s3.journal import RECORD_SIZE, decode  # noqa: E402
+
+READ_RECORDS = 256
+
+
+def read_cursor(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量拉取设备上的会话日志")
+    parser.add_argument("--host", default="192.168.4.1")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--out", default="sessions.jsonl", help="追加写入的JSON Lines文件")
+    parser.add_argument("--cursor", default=None, help="游标文件，默认为输出文件名加.cursor")
+    parser.add_argument("--since", type=int, default=None, help="忽略游标文件，从指定序号之后开始")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    cursor_path = args.cursor or args.out + ".cursor"
+    since = args.since if args.since is not None else read_cursor(cursor_path)
+    url = "http://{}:{}/journal?since={}".format(args.host, args.port, since)
+
+    count = 0
+    last = since
+    with urllib.request.urlopen(url, timeout=args.timeout) as response, open(args.out, "a") as out:
+        buf = b""
+        while True:
+            data = response.read(RECORD_SIZE * READ_RECORDS)
+            if not data:
+                break
+            buf += data
+            usable = len(buf) - len(buf) % RECORD_SIZE
+            for i in range(0, usable, RECORD_SIZE):
+                record = decode(buf[i:i + RECORD_SIZE])
+                out.write(json.dumps(record) + "\n")
+                last = record["seq"]
+                count += 1
+            buf = buf[usable:]
+    if buf:
+        print("⚠️ 连接在记录中间断开，丢弃{}字节，下次从序号{}之后重新拉取".format(len(buf), last))
+    if last != since:
+        with open(cursor_path, "w") as f:
+            f.write(str(last))
+    if count and last - since != count:
+        print("⚠️ 序号{}~{}之间有{}条记录已被轮转删除".format(since + 1, last, last - since - count))
+    print("拉取{}条记录，游标 {} -> {}".format(count, since, last))
+
+
+if __name__ == "__main__":
+    main()
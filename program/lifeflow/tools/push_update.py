@@ -0,0 +1,169 @@
+# 在线更新：把一个或多个文件并行推送到多台设备（PUT /update），全部成功后可选重启（POST /reboot）。
+# 文件边读边发送，设备按固定大小的缓冲区写入临时文件并校验SHA-256后替换；每台设备依次发送各文件，
+# 不同设备之间并行。输出每台设备的结果、设备报告的吞吐量和总体用时
+# 用法：python tools/push_update.py --key-file ota.key --host 192.168.4.1 esp32s3/main.py esp32s3/ssd1315.py
+#      python tools/push_update.py --key-file ota.key --devices devices.json --parallel 16 --reboot esp32s3/main.py
+# 文件参数是program/lifeflow下的相对路径，设备上使用同样的路径；也可以写成 本地路径=设备路径
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+
+LIFEFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEND_CHUNK = 4096
+
+
+class UpdateFile:
+    def __init__(self, spec):
+        local, _, remote = spec.partition("=")
+        if not remote:
+            remote = local
+            local = os.path.join(LIFEFLOW_DIR, local)
+        self.local = local
+        self.remote = remote.replace(os.sep, "/")
+        self.size = os.path.getsize(local)
+        digest = hashlib.sha256()
+        with open(local, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        self.digest = digest.hexdigest()
+
+
+def load_devices(args):
+    devices = []
+    if args.devices:
+        with open(args.devices) as f:
+            for device_id, address in json.load(f).items():
+                host, _, port = address.rpartition(":")
+                devices.append((device_id, host, int(port)))
+    for address in args.hosts:
+        host, _, port = address.partition(":")
+        devices.append((address, host, int(port) if port else 80))
+    return devices
+
+
+async def request(host, port, head, body_file=None, timeout=10.0):
+    # 发送一个请求（可选边读文件边发送请求体），返回(状态码, JSON响应)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(head)
+        try:
+            if body_file is not None:
+                with open(body_file, "rb") as f:
+                    for chunk in iter(lambda: f.read(SEND_CHUNK), b""):
+                        writer.write(chunk)
+                        await asyncio.wait_for(writer.drain(), timeout)
+            await asyncio.wait_for(writer.drain(), timeout)
+        except (ConnectionError, BrokenPipeError):
+            # 设备提前拒绝（如密钥错误）时会直接关闭连接，响应仍可读取
+            pass
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else 0
+    try:
+        return status, json.loads(body)
+    except ValueError:
+        return status, {"message": body.decode(errors="replace").strip()}
+
+
+async def push_device(device, files, key, args):
+    device_id, host, port = device
+    results = []
+    t0 = time.perf_counter()
+    for item in files:
+        head = ("PUT /update?path={}&sha256={} HTTP/1.1\r\nHost: {}:{}\r\nX-Update-Token: {}\r\n"
+                "Content-Length: {}\r\nConnection: close\r\n\r\n").format(
+            item.remote, item.digest, host, port, key, item.size).encode()
+        for attempt in range(args.retries + 1):
+            try:
+                status, body = await request(host, port, head, item.local, args.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                status, body = 0, {"message": str(e) or type(e).__name__}
+            # 连接失败或设备正忙时重试，其余错误（密钥、摘要、空间）重试也不会成功
+            if status not in (0, 409):
+                break
+            await asyncio.sleep(0.5 * (attempt + 1))
+        results.append((item, status, body))
+        if status != 200:
+            return device_id, results, time.perf_counter() - t0, None
+    rebooted = None
+    if args.reboot:
+        head = ("POST /reboot HTTP/1.1\r\nHost: {}:{}\r\nX-Update-Token: {}\r\n"
+                "Content-Length: 0\r\nConnection: close\r\n\r\n").format(host, port, key).encode()
+        try:
+            status, _ = await request(host, port, head, timeout=args.timeout)
+            rebooted = status == 200
+        except (OSError, asyncio.TimeoutError):
+            rebooted = False
+    return device_id, results, time.perf_counter() - t0, rebooted
+
+
+async def push_all(devices, files, key, args):
+    semaphore = asyncio.Semaphore(args.parallel)
+
+    async def limited(device):
+        async with semaphore:
+            return await push_device(device, files, key, args)
+
+    return await asyncio.gather(*[limited(device) for device in devices])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行在线更新多台设备上的文件")
+    parser.add_argument("files", nargs="+", help="要更新的文件（相对program/lifeflow，或 本地路径=设备路径）")
+    parser.add_argument("--host", dest="hosts", action="append", default=[], help="设备地址 host[:port]，可以重复")
+    parser.add_argument("--devices", default=None, help="设备列表JSON（与网关相同的格式：{设备ID: \"host:port\"}）")
+    parser.add_argument("--key", default=os.environ.get("LIFEFLOW_OTA_KEY"), help="更新密钥（也可用环境变量LIFEFLOW_OTA_KEY）")
+    parser.add_argument("--key-file", default=None, help="从文件读取更新密钥")
+    parser.add_argument("--parallel", type=int, default=8, help="同时更新的设备数")
+    parser.add_argument("--retries", type=int, default=2, help="连接失败或设备正忙时的重试次数")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--reboot", action="store_true", help="全部文件更新成功后重启设备")
+    args = parser.parse_args()
+
+    key = args.key
+    if args.key_file:
+        with open(args.key_file) as f:
+            key = f.read().strip()
+    if not key:
+        parser.error("需要--key或--key-file")
+    devices = load_devices(args)
+    if not devices:
+        parser.error("需要--host或--devices")
+    files = [UpdateFile(spec) for spec in args.files]
+    total_bytes = sum(item.size for item in files)
+    print("推送{}个文件（共{}字节）到{}台设备，并行{}".format(len(files), total_bytes, len(devices), args.parallel))
+
+    t0 = time.perf_counter()
+    outcomes = asyncio.run(push_all(devices, files, key, args))
+    wall = time.perf_counter() - t0
+
+    ok = 0
+    rates = []
+    for device_id, results, elapsed, rebooted in outcomes:
+        failed = [(item, status, body) for item, status, body in results if status != 200]
+        if failed:
+            item, status, body = failed[0]
+            print("❌ {}: {} -> {} {}".format(device_id, item.remote, status, body.get("message", "")))
+            continue
+        ok += 1
+        device_rates = [body["bytesPerSecond"] for _, _, body in results]
+        rates += device_rates
+        note = "" if rebooted is None else ("，已重启" if rebooted else "，重启请求失败")
+        print("✅ {}: {}字节，{:.2f}秒，设备写入 {:.1f} KB/s{}".format(
+            device_id, total_bytes, elapsed, sum(device_rates) / len(device_rates) / 1024, note))
+    print("成功{}台，失败{}台，用时{:.2f}秒，总吞吐量{:.1f} KB/s".format(
+        ok, len(devices) - ok, wall, ok * total_bytes / wall / 1024 if wall else 0))
+    if rates:
+        rates.sort()
+        print("设备报告的写入吞吐量: 最低{:.1f} KB/s，中位数{:.1f} KB/s".format(rates[0] / 1024, rates[len(rates) // 2] / 1024))
+    return 0 if ok == len(devices) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
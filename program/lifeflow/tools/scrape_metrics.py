@@ -0,0 +1,141 @@
+# 并行拉取多台设备的运行指标（GET /metrics），汇总成表格，并标出可能有问题的设备：
+# - 卡顿：定时器回调最多晚到超过--late-ms毫秒，或消息处理最长超过--slow-ms毫秒
+# - 内存：多轮拉取之间空闲堆内存的最低值持续下降（可能有泄漏或碎片化）
+# 用法：python tools/scrape_metrics.py --host 192.168.4.1
+#      python tools/scrape_metrics.py --devices devices.json --rounds 10 --interval 60 [--json out.json]
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from push_update import load_devices
+
+COLUMNS = (
+    ("运行(s)", "uptime_seconds", 1),
+    ("空闲堆KB", "heap_free_bytes", 1024),
+    ("最低堆KB", "heap_free_min_bytes", 1024),
+    ("消息", "handle_message_count", 1),
+    ("处理均值us", "handle_message_us_avg", 1),
+    ("处理最长us", "handle_message_us_max", 1),
+    ("绘制最长us", "render_us_max", 1),
+    ("晚到最长ms", "timer_late_us_max", 1000),
+    ("解析错误", "parse_errors_total", 1),
+    ("重连", "ws_reconnects_total", 1),
+)
+
+
+# 解析Prometheus文本格式；带标签的指标以 名称{标签} 为键
+def parse_metrics(text):
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        if name.startswith("lifeflow_"):
+            name = name[len("lifeflow_"):]
+        try:
+            values[name] = float(value) if "." in value else int(value)
+        except ValueError:
+            continue
+    return values
+
+
+async def scrape(host, port, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write("GET /metrics HTTP/1.1\r\nHost: {}:{}\r\nConnection: close\r\n\r\n".format(host, port).encode())
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else 0
+    if status != 200:
+        raise OSError("HTTP {}".format(status))
+    return parse_metrics(body.decode("utf-8", "replace"))
+
+
+async def scrape_all(devices, args):
+    semaphore = asyncio.Semaphore(args.parallel)
+
+    async def one(device):
+        device_id, host, port = device
+        async with semaphore:
+            try:
+                return device_id, await scrape(host, port, args.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                return device_id, {"error": str(e) or type(e).__name__}
+
+    return await asyncio.gather(*[one(device) for device in devices])
+
+
+def problems(history, args):
+    latest = history[-1]
+    found = []
+    if latest.get("timer_late_us_max", 0) > args.late_ms * 1000:
+        found.append("定时器晚到{:.0f}ms".format(latest["timer_late_us_max"] / 1000))
+    if latest.get("handle_message_us_max", 0) > args.slow_ms * 1000:
+        found.append("消息处理最长{:.0f}ms".format(latest["handle_message_us_max"] / 1000))
+    if latest.get("uptime_seconds", 0) < history[0].get("uptime_seconds", 0):
+        found.append("期间重启过")
+    lows = [h["heap_free_min_bytes"] for h in history if "heap_free_min_bytes" in h]
+    if len(lows) >= 3 and all(b < a for a, b in zip(lows, lows[1:])):
+        found.append("最低空闲堆持续下降{}KB".format((lows[0] - lows[-1]) // 1024))
+    return found
+
+
+def print_table(device_ids, histories, args):
+    print("{:<16}".format("设备") + "".join("{:>12}".format(title) for title, _, _ in COLUMNS))
+    flagged = 0
+    for device_id in device_ids:
+        history = [h for h in histories[device_id] if "error" not in h]
+        if not history:
+            print("{:<16} ❌ {}".format(device_id, histories[device_id][-1]["error"]))
+            flagged += 1
+            continue
+        latest = history[-1]
+        cells = ["{:>12}".format(latest[key] // scale if key in latest else "-") for _, key, scale in COLUMNS]
+        print("{:<16}".format(device_id) + "".join(cells))
+        found = problems(history, args)
+        if found:
+            flagged += 1
+            print("  ⚠️ " + "；".join(found))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行拉取设备的运行指标并找出卡顿或内存异常的设备")
+    parser.add_argument("--host", dest="hosts", action="append", default=[], help="设备地址 host[:port]，可以重复")
+    parser.add_argument("--devices", default=None, help="设备列表JSON（与网关相同的格式：{设备ID: \"host:port\"}）")
+    parser.add_argument("--rounds", type=int, default=1, help="拉取轮数，多轮时比较最低空闲堆的变化")
+    parser.add_argument("--interval", type=float, default=30.0, help="两轮之间的秒数")
+    parser.add_argument("--parallel", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--late-ms", type=float, default=50.0, help="定时器晚到超过该毫秒数时标出")
+    parser.add_argument("--slow-ms", type=float, default=20.0, help="消息处理超过该毫秒数时标出")
+    parser.add_argument("--json", default=None, help="把每轮的原始指标写入JSON文件")
+    args = parser.parse_args()
+
+    devices = load_devices(args)
+    if not devices:
+        parser.error("需要--host或--devices")
+    device_ids = [device[0] for device in devices]
+    histories = {device_id: [] for device_id in device_ids}
+    for round_index in range(args.rounds):
+        if round_index:
+            time.sleep(args.interval)
+        t0 = time.perf_counter()
+        for device_id, values in asyncio.run(scrape_all(devices, args)):
+            histories[device_id].append(values)
+        print("第{}轮：{}台设备，用时{:.2f}秒".format(round_index + 1, len(devices), time.perf_counter() - t0))
+    flagged = print_table(device_ids, histories, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(histories, f, ensure_ascii=False, indent=2)
+    print("共{}台设备，{}台需要关注".format(len(devices), flagged))
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
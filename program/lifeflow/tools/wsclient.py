@@ -0,0 +1,111 @@
+# 基于asyncio的最小WebSocket/HTTP客户端，供设备相关的测试工具使用（仅依赖标准库）
+import asyncio
+import base64
+import json
+import os
+import struct
+
+
+class WebSocketClosed(Exception):
+    pass
+
+
+class WebSocketClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port, path="/", timeout=5.0, subprotocols=None):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        lines = [
+            "GET {} HTTP/1.1".format(path),
+            "Host: {}:{}".format(host, port),
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            "Sec-WebSocket-Key: {}".format(key),
+            "Sec-WebSocket-Version: 13",
+        ]
+        if subprotocols:
+            lines.append("Sec-WebSocket-Protocol: {}".format(", ".join(subprotocols)))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        if b" 101 " not in head.split(b"\r\n", 1)[0]:
+            writer.close()
+            raise ConnectionError("WebSocket握手失败: {!r}".format(head[:80]))
+        client = cls(reader, writer)
+        client.handshake = head.decode(errors="replace")
+        return client
+
+    async def send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", n)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", n)
+        mask = os.urandom(4)
+        header += mask
+        masked = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+        self.writer.write(bytes(header) + masked)
+        await self.writer.drain()
+
+    async def send_text(self, text):
+        await self.send_frame(0x1, text.encode())
+
+    async def send_json(self, obj):
+        await self.send_text(json.dumps(obj))
+
+    async def send_binary(self, data):
+        await self.send_frame(0x2, data)
+
+    # 读取一个完整的消息帧，返回(opcode, payload)
+    async def recv_frame(self):
+        try:
+            head = await self.reader.readexactly(2)
+            n = head[1] & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", await self.reader.readexactly(2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+            mask = await self.reader.readexactly(4) if head[1] & 0x80 else None
+            payload = await self.reader.readexactly(n)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            raise WebSocketClosed() from e
+        if mask:
+            payload = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+        opcode = head[0] & 0x0F
+        if opcode == 0x8:
+            raise WebSocketClosed()
+        return opcode, payload
+
+    async def recv_json(self):
+        while True:
+            opcode, payload = await self.recv_frame()
+            if opcode == 0x1:
+                return json.loads(payload.decode())
+
+    async def close(self):
+        try:
+            await self.send_frame(0x8, struct.pack("!H", 1000))
+        except Exception:
+            pass
+        self.writer.close()
+
+
+async def http_get(host, port, path, timeout=5.0):
+    # 发送一次HTTP GET，返回(状态码, 响应体)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    writer.write("GET {} HTTP/1.1\r\nHost: {}:{}\r\nConnection: close\r\n\r\n".format(path, host, port).encode())
+    await writer.drain()
+    data = await asyncio.wait_for(reader.read(), timeout)
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1]) if head else 0
+    return status, body